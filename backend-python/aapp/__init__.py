@@ -1,8 +1,29 @@
 # ReplyGuy API module for the backend
 
-from aapp.main import app
-from aapp.routers import tweets, replies
-from aapp.aagents import TweetFinderAgent, ReplyGeneratorAgent
-from aapp.utils import calculate_viral_potential, generate_completion, validate_tweet, validate_tweets, validate_reply, validate_replies
+# Exports are resolved on first access, so importing a submodule such as
+# aapp.config does not load the app, the agents and the OpenAI client
+import importlib
 
-__all__ = ["app", "tweets", "replies", "TweetFinderAgent", "ReplyGeneratorAgent", "calculate_viral_potential", "generate_completion", "validate_tweet", "validate_tweets", "validate_reply", "validate_replies"]
\ No newline at end of file
+_exports = {
+    "app": "aapp.main",
+    "tweets": "aapp.routers.tweets",
+    "replies": "aapp.routers.replies",
+    "TweetFinderAgent": "aapp.aagents",
+    "ReplyGeneratorAgent": "aapp.aagents",
+    "calculate_viral_potential": "aapp.utils",
+    "generate_completion": "aapp.utils",
+    "validate_tweet": "aapp.utils",
+    "validate_tweets": "aapp.utils",
+    "validate_reply": "aapp.utils",
+    "validate_replies": "aapp.utils",
+}
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_exports[name])
+    value = module if module.__name__.rsplit(".", 1)[-1] == name else getattr(module, name)
+    globals()[name] = value
+    return value
+
+__all__ = ["app", "tweets", "replies", "TweetFinderAgent", "ReplyGeneratorAgent", "calculate_viral_potential", "generate_completion", "validate_tweet", "validate_tweets", "validate_reply", "validate_replies"]
@@ -1,24 +1,138 @@
-from openai import OpenAI
-from agents import Agent, Runner, function_tool
+from agents import Agent, function_tool
 import asyncio
 import json
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+import time
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple, Union
+from pydantic import BaseModel, ValidationError
 
 from aapp.models import Reply, ReplyRequest
-from aapp.config import OPENAI_API_KEY, OPENAI_MODEL, MAX_REPLIES_TO_GENERATE
-
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+from aapp.config import (
+    OPENAI_MODEL,
+    MAX_REPLIES_TO_GENERATE,
+    MAX_TWEET_CONTENT_TOKENS,
+    MAX_CUSTOM_INSTRUCTIONS_TOKENS,
+    TOKEN_BUDGET_MODE,
+    REPLY_BATCH_MAX_CONCURRENCY,
+    REPLY_GENERATION_MODE,
+    REPLY_CANDIDATES_PER_REPLY,
+    REPLY_DUPLICATE_SIMILARITY,
+    REPLY_CACHE_ENABLED,
+    REPLY_CACHE_MAX_ENTRIES,
+    REPLY_CACHE_TTL_SECONDS,
+    REPLY_CACHE_SNAPSHOT_PATH,
+    REPLY_SIMILARITY_CACHE_ENABLED,
+    REPLY_SIMILARITY_THRESHOLD,
+    REPLY_SIMILARITY_MAX_ENTRIES,
+    REPLY_SIMILARITY_MIN_SHINGLES,
+    REPLY_SIMILARITY_RERANK,
+)
+from aapp.utils.cache import TTLCache, normalize_text
+from aapp.utils.json_stream import JSONArrayItemParser
+from aapp.utils.reply_utils import evaluate_reply as score_reply, evaluate_replies, select_diverse_replies
+from aapp.utils.scheduler import LLMUnavailable, Priority, llm_priority
+from aapp.store import get_history_store
+from aapp.utils.similarity import SimilarityCache
+from aapp.utils.singleflight import SingleFlight
+from aapp.utils.tokens import TokenBudgetExceeded, bound_text
+from aapp.dependencies import get_bulk_executor
+from aapp.aagents.runner import run_agent, run_agent_streamed, record_run_metrics, record_run_usage
+from aapp.utils.llm_client import configure_agents_client
+from aapp.utils.logging import logger
+from aapp.utils.metrics import tool_timer
+from aapp.utils.openai_utils import generate_structured_model_output
 
 class ReplyData(BaseModel):
     content: str
     strengths: List[str]
     estimated_engagement: int
 
+class ReplyTexts(BaseModel):
+    replies: List[str]
+
+# System message for fast mode, which skips the agent and its tools
+FAST_MODE_SYSTEM_MESSAGE = """
+You are a Reply Guy expert, specialized in creating high-engagement replies to tweets.
+
+Guidelines for high-quality replies:
+- Ask thoughtful questions related to the tweet
+- Add additional value or insights
+- Use appropriate humor when suitable
+- Be authentic and conversational
+- Keep replies concise (under 280 characters)
+- Avoid generic comments or empty praise
+- Tailor the tone to match the original tweet
+- Create different types of replies (questions, insights, related experiences)
+"""
+
 class ReplyGeneratorAgent:
     def __init__(self):
+        # Agent runs share the pooled async client with openai_utils
+        configure_agents_client()
         self.agent = self._create_agent()
+        self.cache = self._create_cache()
+        self.similar = self._create_similarity_cache()
+        self.inflight = SingleFlight("replies")
+        self.history = get_history_store()
+
+    def _create_cache(self) -> Optional[TTLCache]:
+        """Create the reply cache and warm it from the snapshot, if configured."""
+        if not REPLY_CACHE_ENABLED:
+            return None
+
+        cache = TTLCache(
+            max_entries=REPLY_CACHE_MAX_ENTRIES,
+            ttl_seconds=REPLY_CACHE_TTL_SECONDS,
+            snapshot_path=REPLY_CACHE_SNAPSHOT_PATH,
+            encode=lambda replies: [reply.model_dump() for reply in replies],
+            decode=lambda data: [Reply.model_validate(reply) for reply in data],
+        )
+
+        try:
+            cache.load_snapshot()
+        except Exception as e:
+            logger.error("Error loading reply cache snapshot: %s", e)
+
+        return cache
+
+    def _create_similarity_cache(self) -> Optional[SimilarityCache]:
+        """Create the near-duplicate reply cache, if enabled."""
+        if not REPLY_SIMILARITY_CACHE_ENABLED:
+            return None
+        
+        return SimilarityCache(
+            max_entries=REPLY_SIMILARITY_MAX_ENTRIES,
+            threshold=REPLY_SIMILARITY_THRESHOLD,
+            ttl_seconds=REPLY_CACHE_TTL_SECONDS,
+            min_shingles=REPLY_SIMILARITY_MIN_SHINGLES,
+        )
+    
+    def save_cache_snapshot(self) -> None:
+        """Persist the reply cache so a restarted worker starts warm."""
+        if self.cache is None:
+            return
+
+        try:
+            self.cache.save_snapshot()
+        except Exception as e:
+            logger.error("Error saving reply cache snapshot: %s", e)
+
+    @staticmethod
+    def _cache_key(request: ReplyRequest, num_replies: int) -> Tuple[str, str, str, int, str, str]:
+        """Build the normalized cache key for a reply request."""
+        return (
+            normalize_text(request.tweet_content),
+            normalize_text(request.tweet_author).lstrip("@").lower(),
+            normalize_text(request.custom_instructions),
+            num_replies,
+            OPENAI_MODEL,
+            ReplyGeneratorAgent._mode(request),
+        )
+    
+    @staticmethod
+    def _mode(request: ReplyRequest) -> str:
+        """Resolve the generation mode for a request ("agent", "fast" or "rerank")."""
+        mode = request.mode or REPLY_GENERATION_MODE
+        return mode if mode in ("agent", "fast", "rerank") else "agent"
 
     def _create_agent(self):
         """Create an OpenAI Agent for generating high-quality tweet replies."""
@@ -38,12 +152,13 @@ class ReplyGeneratorAgent:
             """
             # In a real implementation, this would use NLP to analyze the tweet
             # For now, we'll let the agent determine this
-            return {
-                "topics": [],
-                "tone": "",
-                "question_present": False,
-                "engagement_factors": []
-            }
+            with tool_timer("analyze_tweet"):
+                return {
+                    "topics": [],
+                    "tone": "",
+                    "question_present": False,
+                    "engagement_factors": []
+                }
 
         @function_tool
         def evaluate_reply(reply_content: str, original_tweet: str) -> Dict[str, Any]:
@@ -58,53 +173,8 @@ class ReplyGeneratorAgent:
                 Evaluation details including strengths and estimated engagement score
             """
             # This performs real evaluation of reply quality
-            
-            # Generate strengths based on content
-            strengths = []
-            
-            if "?" in reply_content:
-                strengths.append("Asks an open-ended question")
-                
-            if len(reply_content) < 140:
-                strengths.append("Concise and direct")
-                
-            if "consider" in reply_content.lower():
-                strengths.append("Encourages deeper thinking")
-                
-            if any(phrase in reply_content.lower() for phrase in ["i've", "i'd", "i think", "in my experience"]):
-                strengths.append("Personal and authentic tone")
-                
-            if len(reply_content.split()) > 5 and len(reply_content) < 280:
-                strengths.append("Appropriate length for platform")
-            
-            # More sophisticated engagement score calculation
-            score = 50  # Base score
-            
-            # Adjust for length (prefer 80-150 chars)
-            length = len(reply_content)
-            if 80 <= length <= 150:
-                score += 20
-            elif length > 200:
-                score -= 10
-                
-            # Bonus for questions
-            if "?" in reply_content:
-                score += 15
-                
-            # Bonus for relevant content
-            original_words = set(original_tweet.lower().split())
-            reply_words = set(reply_content.lower().split())
-            overlap = len(original_words.intersection(reply_words))
-            if overlap > 0:
-                score += min(overlap * 2, 15)  # Maximum 15 points for relevance
-                
-            # Ensure score is in range
-            score = min(max(score, 0), 100)
-                
-            return {
-                "strengths": strengths[:3],  # Limit to top 3 strengths
-                "estimated_engagement": score
-            }
+            with tool_timer("evaluate_reply"):
+                return score_reply(reply_content, original_tweet)
 
         # Create the agent with our custom tools
         agent = Agent(
@@ -149,13 +219,24 @@ class ReplyGeneratorAgent:
         
         return agent
     
-    async def generate_replies(self, request: ReplyRequest) -> List[Reply]:
-        """Generate high-quality replies to a tweet using AI agent."""
-        # Determine number of replies to generate
-        num_replies = min(request.num_replies or MAX_REPLIES_TO_GENERATE, MAX_REPLIES_TO_GENERATE)
-        
-        # Craft the prompt for the agent
-        prompt = f"""
+    def _num_replies(self, request: ReplyRequest) -> int:
+        """Determine number of replies to generate."""
+        return min(request.num_replies or MAX_REPLIES_TO_GENERATE, MAX_REPLIES_TO_GENERATE)
+    
+    def _bound_request(self, request: ReplyRequest) -> ReplyRequest:
+        """Bound the user-supplied fields to their token limits (trim or reject)."""
+        return request.model_copy(update={
+            "tweet_content": bound_text(
+                request.tweet_content, MAX_TWEET_CONTENT_TOKENS, "tweet_content", TOKEN_BUDGET_MODE
+            ),
+            "custom_instructions": bound_text(
+                request.custom_instructions, MAX_CUSTOM_INSTRUCTIONS_TOKENS, "custom_instructions", TOKEN_BUDGET_MODE
+            ),
+        })
+    
+    def _build_prompt(self, request: ReplyRequest, num_replies: int) -> str:
+        """Craft the prompt for the agent."""
+        return f"""
         Generate {num_replies} high-quality, diverse replies to this tweet by @{request.tweet_author}:
         
         "{request.tweet_content}"
@@ -171,31 +252,277 @@ class ReplyGeneratorAgent:
         
         Return a structured list of replies with all required fields.
         """
+    
+    def _build_fast_prompt(self, request: ReplyRequest, num_replies: int) -> str:
+        """Craft the single-shot prompt used in fast mode."""
+        return f"""
+        Write {num_replies} high-quality, diverse replies to this tweet by @{request.tweet_author}:
+        
+        "{request.tweet_content}"
+        
+        {request.custom_instructions or ''}
+        
+        Keep each reply under 280 characters, make it engaging and likely to get
+        a response, and be authentic and add value.
+        
+        Return the reply texts as a list of strings in "replies".
+        """
+    
+    def _get_cached(self, cache_key: Tuple) -> Optional[List[Reply]]:
+        """
+        Return copies of the cached replies for a key, if any.
+        
+        Falls back to the replies for a near-duplicate of the tweet (same
+        instructions, reply count, model and mode; any author), rescored
+        against this tweet and reordered when REPLY_SIMILARITY_RERANK is set.
+        Tweets with too little text for that (link-only, emoji-only) only
+        use the exact cache.
+        """
+        cached = self.cache.get(cache_key) if self.cache is not None else None
+        if cached is not None:
+            return [reply.model_copy() for reply in cached]
+        
+        tweet_content, context = cache_key[0], cache_key[2:]
+        if self.similar is None or not self.similar.indexable(tweet_content):
+            return None
+        
+        cached = self.similar.get(tweet_content, context)
+        if cached is None:
+            return None
         
+        replies = [reply.model_copy() for reply in cached]
+        if REPLY_SIMILARITY_RERANK:
+            evaluations = evaluate_replies([reply.content for reply in replies], tweet_content)
+            for reply, evaluation in zip(replies, evaluations):
+                reply.strengths = evaluation["strengths"]
+                reply.estimated_engagement = evaluation["estimated_engagement"]
+            replies.sort(key=lambda reply: -reply.estimated_engagement)
+        return replies
+    
+    def _store_cached(self, cache_key: Tuple, replies: List[Reply]) -> None:
+        # Only successful generations are cached
+        if not replies:
+            return
+        if self.cache is not None:
+            self.cache.set(cache_key, [reply.model_copy() for reply in replies])
+        if self.similar is not None and self.similar.indexable(cache_key[0]):
+            self.similar.set(cache_key[0], [reply.model_copy() for reply in replies], cache_key[2:])
+    
+    def _record(self, request: ReplyRequest, replies: List[Reply]) -> None:
+        """Queue generated replies for the history store (written in the background)."""
+        if self.history is not None:
+            self.history.add_replies(request.tweet_id, request.tweet_author, replies, self._mode(request))
+    
+    async def generate_replies(self, request: ReplyRequest) -> List[Reply]:
+        """Generate high-quality replies to a tweet using AI agent."""
         try:
-            # Run the agent using the Runner
-            result = await Runner.run(
-                self.agent,
-                input=prompt,
-                max_turns=5  # Limit the number of turns to prevent infinite loops
+            return await self._generate_replies(request)
+        except (TokenBudgetExceeded, LLMUnavailable):
+            raise
+        except Exception as e:
+            logger.exception("Error generating replies: %s", e)
+            return []
+    
+    async def generate_replies_batch(
+        self,
+        requests: List[ReplyRequest],
+        max_concurrency: int = REPLY_BATCH_MAX_CONCURRENCY
+    ) -> List[Union[List[Reply], BaseException]]:
+        """
+        Generate replies for many tweets concurrently.
+        
+        At most max_concurrency agent runs are in flight at once, and their
+        LLM calls queue behind interactive requests. Results are returned in
+        request order; a failed item yields its exception instead of a reply
+        list so one failure doesn't sink the whole batch.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run_one(request: ReplyRequest) -> List[Reply]:
+            async with semaphore:
+                with llm_priority(Priority.BATCH):
+                    return await self._generate_replies(request)
+        
+        return await asyncio.gather(
+            *(run_one(request) for request in requests),
+            return_exceptions=True
+        )
+    
+    async def _generate_replies(self, request: ReplyRequest) -> List[Reply]:
+        """Generate replies for one request, raising on failure."""
+        request = self._bound_request(request)
+        num_replies = self._num_replies(request)
+        
+        # Serve repeat requests for the same tweet from the cache
+        cache_key = self._cache_key(request, num_replies)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Fast and rerank modes skip the agent's tool loop: one LLM call, local scoring
+        mode = self._mode(request)
+        if mode == "fast":
+            run = lambda: self._run_fast(request, num_replies, cache_key)
+        elif mode == "rerank":
+            run = lambda: self._run_fast(request, num_replies, cache_key, REPLY_CANDIDATES_PER_REPLY)
+        else:
+            run = lambda: self._run_agent(request, num_replies, cache_key)
+        
+        # Identical concurrent requests share one run
+        replies_data = await self.inflight.do(cache_key, run)
+        return [reply.model_copy() for reply in replies_data]
+    
+    async def _run_agent(self, request: ReplyRequest, num_replies: int, cache_key: Tuple) -> List[Reply]:
+        """Run the agent for one request and cache its replies."""
+        prompt = self._build_prompt(request, num_replies)
+        
+        # Run the agent with budget checks and usage accounting
+        result = await run_agent(
+            self.agent,
+            prompt,
+            max_turns=5  # Limit the number of turns to prevent infinite loops
+        )
+        
+        # Parse the generated replies from the final output
+        reply_data_list = result.final_output
+        
+        # Convert to Reply model objects
+        replies_data = []
+        
+        for reply_data in reply_data_list:
+            reply = Reply(
+                content=reply_data.content,
+                strengths=reply_data.strengths,
+                estimated_engagement=reply_data.estimated_engagement
             )
+            replies_data.append(reply)
+        
+        self._store_cached(cache_key, replies_data)
+        self._record(request, replies_data)
             
-            # Parse the generated replies from the final output
-            reply_data_list = result.final_output
-            
-            # Convert to Reply model objects
-            replies_data = []
-            
-            for reply_data in reply_data_list:
-                reply = Reply(
-                    content=reply_data.content,
-                    strengths=reply_data.strengths,
-                    estimated_engagement=reply_data.estimated_engagement
-                )
-                replies_data.append(reply)
+        return replies_data
+    
+    async def _run_fast(
+        self,
+        request: ReplyRequest,
+        num_replies: int,
+        cache_key: Tuple,
+        candidates_per_reply: int = 1
+    ) -> List[Reply]:
+        """
+        Generate reply texts in one structured-output call and score them locally.
+        
+        With candidates_per_reply > 1 (rerank mode) the call asks for that many
+        candidates per reply, and the best-scoring ones that aren't
+        near-duplicates of each other are kept.
+        """
+        candidates_per_reply = max(candidates_per_reply, 1)
+        reply_texts = await generate_structured_model_output(
+            prompt=self._build_fast_prompt(request, num_replies * candidates_per_reply),
+            model_class=ReplyTexts,
+            model=OPENAI_MODEL,
+            system_message=FAST_MODE_SYSTEM_MESSAGE
+        )
+        
+        texts = [content.strip() for content in reply_texts.replies]
+        texts = [content for content in texts if content]
+        if candidates_per_reply == 1:
+            texts = texts[:num_replies]
+        
+        # Same heuristics the agent's evaluate_reply tool uses, in one pass
+        # (on the CPU worker pool if there are enough candidates)
+        evaluations = await get_bulk_executor().evaluate_replies(texts, request.tweet_content)
+        if candidates_per_reply == 1:
+            chosen = range(len(texts))
+        else:
+            chosen = select_diverse_replies(
+                texts,
+                [evaluation["estimated_engagement"] for evaluation in evaluations],
+                num_replies,
+                REPLY_DUPLICATE_SIMILARITY
+            )
+        
+        replies_data = [
+            Reply(
+                content=texts[i],
+                strengths=evaluations[i]["strengths"],
+                estimated_engagement=evaluations[i]["estimated_engagement"]
+            )
+            for i in chosen
+        ]
+        
+        self._store_cached(cache_key, replies_data)
+        self._record(request, replies_data)
+        
+        return replies_data
+    
+    async def stream_replies(self, request: ReplyRequest) -> AsyncIterator[Reply]:
+        """
+        Generate replies and yield each one as soon as the model has finished it.
+        
+        The agent run is streamed and its structured output is parsed
+        incrementally. Closing the generator early (e.g. because the client
+        disconnected) cancels the upstream run.
+        """
+        request = self._bound_request(request)
+        num_replies = self._num_replies(request)
+        
+        cache_key = self._cache_key(request, num_replies)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            for reply in cached:
+                yield reply
+            return
+        
+        # Fast and rerank runs are a single call, so there is nothing to stream incrementally
+        if self._mode(request) != "agent":
+            for reply in await self._generate_replies(request):
+                yield reply
+            return
+        
+        started = time.perf_counter()
+        result = run_agent_streamed(
+            self.agent,
+            self._build_prompt(request, num_replies),
+            max_turns=5  # Limit the number of turns to prevent infinite loops
+        )
+        parser = JSONArrayItemParser()
+        replies_data = []
+        status = "cancelled"
+        
+        try:
+            async for event in result.stream_events():
+                if event.type != "raw_response_event":
+                    continue
                 
-            return replies_data
+                # Each model turn starts a new output document
+                if event.data.type == "response.created":
+                    parser.reset()
+                elif event.data.type == "response.output_text.delta":
+                    for item in parser.feed(event.data.delta):
+                        try:
+                            reply_data = ReplyData.model_validate(item)
+                            reply = Reply(
+                                content=reply_data.content,
+                                strengths=reply_data.strengths,
+                                estimated_engagement=reply_data.estimated_engagement
+                            )
+                        except ValidationError as e:
+                            logger.warning("Skipping malformed streamed reply: %s", e)
+                            continue
+                        
+                        replies_data.append(reply)
+                        yield reply
             
-        except Exception as e:
-            print(f"Error generating replies: {e}")
-            return []
\ No newline at end of file
+            self._store_cached(cache_key, replies_data)
+            self._record(request, replies_data)
+            status = "ok"
+            
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            if not result.is_complete:
+                result.cancel()
+            record_run_metrics(self.agent, started, status, result)
+            record_run_usage(result)
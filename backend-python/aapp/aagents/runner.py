@@ -0,0 +1,193 @@
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from agents import Agent, AgentOutputSchema, RunConfig, Runner
+from agents.items import ModelResponse, ToolCallItem
+from agents.models.interface import Model, ModelProvider
+from agents.models.multi_provider import MultiProvider
+from agents.result import RunResult, RunResultBase, RunResultStreaming
+
+from aapp.config import REQUEST_TOKEN_BUDGET
+from aapp.utils.metrics import agent_run_duration_seconds, agent_run_turns, agent_runs_total
+from aapp.utils.scheduler import DEFAULT_COMPLETION_TOKENS, llm_scheduler
+from aapp.utils.tokens import count_tokens, enforce_budget, usage_tracker
+
+# Static prompt overhead (instructions + tool and output schemas) per agent
+_overhead_tokens: Dict[int, int] = {}
+
+def agent_overhead_tokens(agent: Agent) -> int:
+    """
+    Tokens an agent sends on every run before the user input
+
+    Counts the instructions plus the JSON schemas of its tools and its
+    structured output type. Computed once per agent.
+    """
+    key = id(agent)
+    if key not in _overhead_tokens:
+        parts = [agent.instructions if isinstance(agent.instructions, str) else ""]
+        for tool in agent.tools:
+            schema = getattr(tool, "params_json_schema", {})
+            parts.append(f"{tool.name} {getattr(tool, 'description', '')} {json.dumps(schema)}")
+        if agent.output_type is not None:
+            parts.append(json.dumps(AgentOutputSchema(agent.output_type, strict_json_schema=False).json_schema()))
+        _overhead_tokens[key] = count_tokens("\n".join(parts), str(agent.model))
+    return _overhead_tokens[key]
+
+def check_prompt_budget(agent: Agent, prompt: str) -> int:
+    """
+    Reject a run whose first-turn prompt would exceed REQUEST_TOKEN_BUDGET
+
+    Returns:
+        The estimated prompt tokens
+    """
+    tokens = agent_overhead_tokens(agent) + count_tokens(prompt, str(agent.model))
+    enforce_budget(tokens, REQUEST_TOKEN_BUDGET, f"{agent.name} prompt")
+    return tokens
+
+def _turn_tokens(system_instructions: Optional[str], input: Any, model_settings: Any, tools: List[Any], output_schema: Any) -> int:
+    """Estimate the prompt plus completion tokens of one model turn"""
+    parts = [system_instructions or "", input if isinstance(input, str) else json.dumps(input, default=str)]
+    for tool in tools:
+        parts.append(f"{getattr(tool, 'name', '')} {getattr(tool, 'description', '')} {json.dumps(getattr(tool, 'params_json_schema', {}))}")
+    if output_schema is not None:
+        parts.append(json.dumps(output_schema.json_schema()))
+    completion = getattr(model_settings, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS
+    return count_tokens("\n".join(parts)) + completion
+
+# Stream events carrying generated text or tool call arguments
+_DELTA_EVENTS = frozenset({"response.output_text.delta", "response.function_call_arguments.delta"})
+
+def _streamed_tokens(tokens: int, model_settings: Any, usage: Any, deltas: List[str]) -> int:
+    """
+    Tokens a streamed turn used: the usage of its response.completed event,
+    or for a stream closed before that, the prompt estimate plus the tokens
+    streamed so far
+    """
+    if usage is not None:
+        return usage.input_tokens + usage.output_tokens
+    completion = getattr(model_settings, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS
+    return tokens - completion + count_tokens("".join(deltas))
+
+class ScheduledModel(Model):
+    """
+    A model whose turns go through the LLM scheduler
+
+    Each turn of an agent run is paced, prioritized and retried like any
+    other LLM call, and the token bucket is settled with its real usage.
+    A streamed turn is only retried if it failed before its first event.
+    """
+
+    def __init__(self, model: Model):
+        self._model = model
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs) -> ModelResponse:
+        tokens = _turn_tokens(system_instructions, input, model_settings, tools, output_schema)
+        response = await llm_scheduler.run(
+            lambda: self._model.get_response(
+                system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+            ),
+            tokens=tokens,
+        )
+        llm_scheduler.settle(tokens, response.usage.input_tokens + response.usage.output_tokens)
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs) -> AsyncIterator[Any]:
+        tokens = _turn_tokens(system_instructions, input, model_settings, tools, output_schema)
+        attempt = 0
+        while True:
+            await llm_scheduler.acquire(tokens)
+            started = False
+            usage = None
+            deltas: List[str] = []
+            try:
+                async for event in self._model.stream_response(
+                    system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+                ):
+                    started = True
+                    event_type = getattr(event, "type", None)
+                    if event_type == "response.completed":
+                        usage = event.response.usage
+                    elif event_type in _DELTA_EVENTS:
+                        deltas.append(event.delta)
+                    yield event
+                return
+            except Exception as e:
+                if started:
+                    raise
+                await llm_scheduler.backoff(e, attempt)
+                attempt += 1
+            finally:
+                # Also runs when the consumer closes the stream early
+                if started:
+                    llm_scheduler.settle(tokens, _streamed_tokens(tokens, model_settings, usage, deltas))
+
+class ScheduledModelProvider(ModelProvider):
+    """Resolves models like the SDK's default provider, wrapped in ScheduledModel"""
+
+    def __init__(self, provider: Optional[ModelProvider] = None):
+        self._provider = provider or MultiProvider()
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return ScheduledModel(self._provider.get_model(model_name))
+
+def _run_config() -> RunConfig:
+    # A fresh provider per run, like RunConfig's default, so it picks up the current shared client
+    return RunConfig(model_provider=ScheduledModelProvider())
+
+def record_run_usage(result: RunResultBase) -> Dict[str, Any]:
+    """Record the token usage, model round trips and tool calls of a finished run"""
+    usage = result.context_wrapper.usage
+    tool_calls = sum(1 for item in result.new_items if isinstance(item, ToolCallItem))
+    usage_tracker.record(
+        prompt_tokens=usage.input_tokens,
+        completion_tokens=usage.output_tokens,
+        llm_requests=usage.requests,
+        tool_calls=tool_calls,
+    )
+    return {
+        "prompt_tokens": usage.input_tokens,
+        "completion_tokens": usage.output_tokens,
+        "llm_requests": usage.requests,
+        "tool_calls": tool_calls,
+    }
+
+def record_run_metrics(agent: Agent, started: float, status: str, result: Optional[RunResultBase] = None) -> None:
+    """Record the duration, outcome and (for finished runs) turn count of an agent run"""
+    agent_run_duration_seconds.observe(time.perf_counter() - started, agent=agent.name)
+    agent_runs_total.inc(agent=agent.name, status=status)
+    if result is not None:
+        agent_run_turns.observe(result.context_wrapper.usage.requests, agent=agent.name)
+
+async def run_agent(agent: Agent, prompt: str, max_turns: int) -> RunResult:
+    """
+    Run an agent with budget enforcement, usage accounting and scheduled model turns
+
+    Args:
+        agent: The agent to run
+        prompt: The user input
+        max_turns: Maximum number of model turns
+
+    Returns:
+        The finished RunResult
+    """
+    check_prompt_budget(agent, prompt)
+    started = time.perf_counter()
+    try:
+        result = await Runner.run(agent, input=prompt, max_turns=max_turns, run_config=_run_config())
+    except BaseException:
+        record_run_metrics(agent, started, "error")
+        raise
+    record_run_metrics(agent, started, "ok", result)
+    record_run_usage(result)
+    return result
+
+def run_agent_streamed(agent: Agent, prompt: str, max_turns: int) -> RunResultStreaming:
+    """
+    Start a streamed agent run after checking the prompt budget
+
+    Call record_run_usage and record_run_metrics on the result once the
+    stream has finished.
+    """
+    check_prompt_budget(agent, prompt)
+    return Runner.run_streamed(agent, input=prompt, max_turns=max_turns, run_config=_run_config())
@@ -1,17 +1,35 @@
-from openai import OpenAI
-from agents import Agent, Runner, function_tool
+from agents import Agent, function_tool
 import uuid
 import time
 import json
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from pydantic import BaseModel
 
 from aapp.models import Tweet, TweetAuthor, TweetMetrics, TweetFilterRequest
-from aapp.config import OPENAI_API_KEY, OPENAI_MODEL, MAX_TWEETS_TO_FETCH
-
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+from aapp.config import (
+    OPENAI_MODEL,
+    MAX_TWEETS_TO_FETCH,
+    TWEET_CACHE_ENABLED,
+    TWEET_CACHE_MAX_ENTRIES,
+    TWEET_CACHE_FRESH_SECONDS,
+    TWEET_CACHE_STALE_SECONDS,
+    TWEET_STORE_ENABLED,
+    TWEET_STORE_REFRESH_SECONDS,
+)
+from aapp.dependencies import get_bulk_executor
+from aapp.sources import create_tweet_source, parse_search_query
+from aapp.store import TweetStore, get_history_store
+from aapp.utils.cache import StaleWhileRevalidateCache
+from aapp.utils.scheduler import LLMUnavailable, Priority, llm_priority
+from aapp.utils.singleflight import SingleFlight
+from aapp.utils.tokens import TokenBudgetExceeded
+from aapp.aagents.runner import run_agent
+from aapp.utils.scoring import normalize_timestamps, score_viral_potential, to_percent
+from aapp.utils.llm_client import configure_agents_client
+from aapp.utils.logging import logger
+from aapp.utils.metrics import tool_timer
+from aapp.utils.topics import get_topic_classifier
 
 class TweetData(BaseModel):
     id: str
@@ -28,14 +46,39 @@ class TweetData(BaseModel):
 
 class TweetFinderAgent:
     def __init__(self):
+        # Agent runs share the pooled async client with openai_utils
+        configure_agents_client()
+        self.source = create_tweet_source()
+        self.store = TweetStore() if self.source is not None and TWEET_STORE_ENABLED else None
         self.agent = self._create_agent()
+        self.cache = self._create_cache()
+        self.inflight = SingleFlight("tweets")
+        self.history = get_history_store()
+        
+        # When the store was last loaded from the source, and its background refresh;
+        # loads have their own SingleFlight, apart from the searches it coalesces
+        self._ingested_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._ingest_flight = SingleFlight("ingest")
+
+    def _create_cache(self) -> Optional[StaleWhileRevalidateCache]:
+        """Create the search result cache, if enabled."""
+        if not TWEET_CACHE_ENABLED:
+            return None
+
+        return StaleWhileRevalidateCache(
+            max_entries=TWEET_CACHE_MAX_ENTRIES,
+            fresh_seconds=TWEET_CACHE_FRESH_SECONDS,
+            stale_seconds=TWEET_CACHE_STALE_SECONDS,
+            should_cache=bool  # Don't cache empty results
+        )
 
     def _create_agent(self):
         """Create an OpenAI Agent for finding tweets."""
         
         # Define function tools using the decorator syntax
         @function_tool
-        def search_twitter(search_query: str, max_results: Optional[int] = 5) -> List[Dict[str, Any]]:
+        async def search_twitter(search_query: str, max_results: Optional[int] = 5) -> List[Dict[str, Any]]:
             """
             Search Twitter for recent tweets matching criteria.
             
@@ -46,46 +89,52 @@ class TweetFinderAgent:
             Returns:
                 A list of tweets matching the search criteria
             """
-            # This would connect to a real Twitter API in production
-            # For now, we'll have the agent generate realistic tweets based on the criteria
-            # The real implementation would use Twitter API via tweepy or similar
-            return []
+            # Without a configured tweet source the agent generates realistic tweets itself
+            with tool_timer("search_twitter"):
+                if self.source is None:
+                    return []
+                criteria = parse_search_query(search_query, max_results or 5)
+                tweets = await self.source.asearch(criteria, executor=get_bulk_executor())
+                return [tweet.model_dump() for tweet in tweets]
         
         @function_tool
-        def analyze_tweet_potential(tweet_content: str, author_verified: bool, metrics: Dict[str, int], timestamp: str) -> int:
+        def analyze_tweet_potential(
+            tweet_content: str,
+            author_verified: bool,
+            likes: int,
+            replies: int,
+            retweets: int,
+            views: int,
+            timestamp: str
+        ) -> int:
             """
             Analyze a tweet to calculate its viral potential score.
             
             Args:
                 tweet_content: The content of the tweet
                 author_verified: Whether the author is verified
-                metrics: Dictionary with engagement metrics (likes, replies, retweets, views)
-                timestamp: When the tweet was posted (e.g. "10 minutes ago")
+                likes: Number of likes
+                replies: Number of replies
+                retweets: Number of retweets
+                views: Number of views
+                timestamp: When the tweet was posted (ISO-8601 or e.g. "10 minutes ago")
                 
             Returns:
                 A viral potential score from 0-100
             """
-            # Calculate viral potential based on real factors
-            engagement = metrics.get("likes", 0) + (metrics.get("replies", 0) * 2) + (metrics.get("retweets", 0) * 3)
-            views = max(metrics.get("views", 1000), 1)  # Avoid division by zero
-            
-            engagement_rate = engagement / views
-            verified_bonus = 10 if author_verified else 0
-            
-            # Calculate recency
-            recency = 10
-            if "minutes ago" in timestamp:
-                minutes_ago = int(timestamp.split(" ")[0])
-                recency = max(10 - (minutes_ago / 60), 0)
-            elif "hours ago" in timestamp:
-                hours_ago = int(timestamp.split(" ")[0])
-                recency = max(10 - (hours_ago), 0)
-                
-            # Combined score
-            score = (engagement_rate * 50) + verified_bonus + (recency * 5)
-            
-            # Ensure score is between 0-100
-            return min(max(int(score), 0), 100)
+            # Same scoring engine as calculate_viral_potential
+            with tool_timer("analyze_tweet_potential"):
+                now = time.time()
+                scores = score_viral_potential(
+                    likes=[likes],
+                    replies=[replies],
+                    retweets=[retweets],
+                    views=[views],
+                    created_at=normalize_timestamps([timestamp], now),
+                    verified=[author_verified],
+                    now=now,
+                )
+                return int(to_percent(scores)[0])
 
         # Create the agent with our custom tools
         agent = Agent(
@@ -123,9 +172,8 @@ class TweetFinderAgent:
         
         return agent
     
-    async def find_tweets(self, filters: TweetFilterRequest) -> List[Tweet]:
-        """Find tweets based on filter criteria using AI agent."""
-        # Build search query from filters
+    def _build_search_query(self, filters: TweetFilterRequest) -> str:
+        """Build a Twitter search query from filter criteria."""
         query_parts = []
         
         # Add topics if provided
@@ -150,11 +198,129 @@ class TweetFinderAgent:
             query_parts.append("is:popular")
             
         # Combine query parts
-        search_query = " ".join(query_parts)
+        return " ".join(query_parts)
+    
+    async def find_tweets(self, filters: TweetFilterRequest) -> List[Tweet]:
+        """Find tweets based on filter criteria using AI agent."""
+        try:
+            return await self._find_tweets(filters)
+        except (TokenBudgetExceeded, LLMUnavailable):
+            raise
+        except Exception as e:
+            logger.exception("Error finding tweets: %s", e)
+            return []
+    
+    async def find_tweets_batch(
+        self,
+        filters_list: List[TweetFilterRequest],
+        max_concurrency: int = 1
+    ) -> List[Union[List[Tweet], BaseException]]:
+        """
+        Run many searches concurrently at batch priority.
+        
+        Results are returned in request order; a failed search yields its
+        exception instead of a tweet list, so callers such as background
+        jobs can tell a failure from a search that matched nothing.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run_one(filters: TweetFilterRequest) -> List[Tweet]:
+            async with semaphore:
+                with llm_priority(Priority.BATCH):
+                    return await self._find_tweets(filters)
+        
+        return await asyncio.gather(
+            *(run_one(filters) for filters in filters_list),
+            return_exceptions=True
+        )
+    
+    async def _find_tweets(self, filters: TweetFilterRequest) -> List[Tweet]:
+        """Find tweets for one request, raising on failure (store, source or agent errors)."""
+        # Build search query from filters
+        search_query = self._build_search_query(filters)
         
         # Determine max results
         max_results = min(filters.max_results or MAX_TWEETS_TO_FETCH, MAX_TWEETS_TO_FETCH)
         
+        # Ingested tweets are answered from the store's indexes
+        if self.store is not None:
+            await self._ensure_ingested()
+            tweets = self.store.query(filters, max_results)
+            self._record(tweets)
+            return tweets
+        
+        # Real tweets from the configured source need no LLM call
+        if self.source is not None:
+            key = ("source", search_query, filters.min_engagement, max_results)
+            load = lambda: self._search_source(filters, max_results)
+        else:
+            key = (search_query, max_results)
+            load = lambda: self._search_once(search_query, max_results)
+        
+        if self.cache is not None:
+            # Requests that only differ in post-filters share one entry
+            tweets_data = await self.cache.get_or_load(key, load)
+        else:
+            tweets_data = await load()
+        
+        return self._apply_post_filters(tweets_data, filters)
+    
+    async def _search_once(self, search_query: str, max_results: int) -> List[Tweet]:
+        """Run the search, sharing one agent run between identical concurrent searches."""
+        return await self.inflight.do(
+            (search_query, max_results),
+            lambda: self._search(search_query, max_results)
+        )
+    
+    async def _ensure_ingested(self) -> None:
+        """Load the store from the source on first use and refresh it in the background."""
+        if self._ingested_at is None:
+            # The first search waits for the initial load (shared by concurrent searches)
+            await self._ingest_flight.do(None, self._ingest)
+        elif time.time() - self._ingested_at >= TWEET_STORE_REFRESH_SECONDS:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.ensure_future(self._refresh_store())
+    
+    async def _ingest(self) -> int:
+        """
+        Stream every source tweet into the store, in columnar batches.
+        
+        Batches are parsed and their keywords extracted in the CPU worker
+        pool; only inserting them into the store's indexes happens here, in
+        a thread.
+        """
+        now = time.time()
+        # Keywords from the workers' shared classifier only fit a store using that one
+        with_keywords = self.store.classifier is get_topic_classifier()
+        count = 0
+        async for batch, keywords in self.source.abatches(get_bulk_executor(), now, with_keywords):
+            count += await asyncio.to_thread(self.store.add_batch, batch, now, keywords)
+        self._ingested_at = time.time()
+        return count
+    
+    async def _refresh_store(self) -> None:
+        try:
+            await self._ingest_flight.do(None, self._ingest)
+        except Exception as e:
+            logger.error("Error refreshing tweet store: %s", e)
+    
+    async def _search_source(self, filters: TweetFilterRequest, max_results: int) -> List[Tweet]:
+        """Search the tweet source, sharing one scan between identical concurrent searches."""
+        # Top-k by viral potential, then filtering by it, equals filtering then top-k,
+        # so the viral potential filter is left to _apply_post_filters like cached results
+        criteria = filters.model_copy(update={"min_viral_potential": 0, "max_results": max_results})
+        return await self.inflight.do(
+            ("source", self._build_search_query(filters), filters.min_engagement, max_results),
+            lambda: self._scan_source(criteria)
+        )
+    
+    async def _scan_source(self, criteria: TweetFilterRequest) -> List[Tweet]:
+        tweets = await self.source.asearch(criteria, executor=get_bulk_executor())
+        self._record(tweets)
+        return tweets
+    
+    async def _search(self, search_query: str, max_results: int) -> List[Tweet]:
+        """Run the agent for a search query and return the unfiltered tweets."""
         # Use the Runner to execute the agent
         prompt = f"""
         Generate {max_results} realistic tweets that match this search query: {search_query}.
@@ -171,51 +337,55 @@ class TweetFinderAgent:
         Return the tweets as a structured list with all required fields.
         """
         
-        try:
-            # Run the agent with the Runner
-            result = await Runner.run(
-                self.agent, 
-                input=prompt,
-                max_turns=5  # Limit the number of turns to prevent infinite loops
+        # Run the agent with budget checks and usage accounting
+        result = await run_agent(
+            self.agent,
+            prompt,
+            max_turns=5  # Limit the number of turns to prevent infinite loops
+        )
+        
+        # Parse the generated tweets from the final output
+        tweet_data_list = result.final_output
+        
+        # Convert to Tweet model objects
+        tweets_data = []
+        
+        for tweet_data in tweet_data_list:
+            # Create Tweet object from the generated data
+            tweet = Tweet(
+                id=tweet_data.id,
+                author=TweetAuthor(
+                    name=tweet_data.author_name,
+                    handle=tweet_data.author_handle,
+                    avatar=f"https://unavatar.io/x/{tweet_data.author_handle}",
+                    is_verified=tweet_data.author_verified
+                ),
+                content=tweet_data.content,
+                timestamp=tweet_data.timestamp,
+                metrics=TweetMetrics(
+                    likes=tweet_data.likes,
+                    replies=tweet_data.replies,
+                    retweets=tweet_data.retweets,
+                    views=tweet_data.views
+                ),
+                viral_potential=tweet_data.viral_potential
             )
+            tweets_data.append(tweet)
+        
+        self._record(tweets_data)
+        return tweets_data
+    
+    def _record(self, tweets: List[Tweet]) -> None:
+        """Queue produced tweets for the history store (written in the background)."""
+        if self.history is not None:
+            self.history.add_tweets(tweets)
+    
+    @staticmethod
+    def _apply_post_filters(tweets: List[Tweet], filters: TweetFilterRequest) -> List[Tweet]:
+        """Apply the viral potential filter and sorting to a (possibly cached) result."""
+        # Filter by viral potential
+        if filters.min_viral_potential:
+            tweets = [t for t in tweets if t.viral_potential >= filters.min_viral_potential]
             
-            # Parse the generated tweets from the final output
-            tweet_data_list = result.final_output
-            
-            # Convert to Tweet model objects
-            tweets_data = []
-            
-            for tweet_data in tweet_data_list:
-                # Create Tweet object from the generated data
-                tweet = Tweet(
-                    id=tweet_data.id,
-                    author=TweetAuthor(
-                        name=tweet_data.author_name,
-                        handle=tweet_data.author_handle,
-                        avatar=f"https://unavatar.io/x/{tweet_data.author_handle}",
-                        is_verified=tweet_data.author_verified
-                    ),
-                    content=tweet_data.content,
-                    timestamp=tweet_data.timestamp,
-                    metrics=TweetMetrics(
-                        likes=tweet_data.likes,
-                        replies=tweet_data.replies,
-                        retweets=tweet_data.retweets,
-                        views=tweet_data.views
-                    ),
-                    viral_potential=tweet_data.viral_potential
-                )
-                tweets_data.append(tweet)
-            
-            # Filter by viral potential
-            if filters.min_viral_potential:
-                tweets_data = [t for t in tweets_data if t.viral_potential >= filters.min_viral_potential]
-                
-            # Sort by viral potential (highest first)
-            tweets_data.sort(key=lambda x: x.viral_potential, reverse=True)
-            
-            return tweets_data
-            
-        except Exception as e:
-            print(f"Error finding tweets: {e}")
-            return [] 
\ No newline at end of file
+        # Sort by viral potential (highest first) without touching the cached list
+        return sorted(tweets, key=lambda x: x.viral_potential, reverse=True)
@@ -12,11 +12,127 @@ API_PREFIX = os.getenv("API_PREFIX", "/api")
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# OpenAI HTTP connection pool (shared by every LLM call in the process)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "0"))  # transient failures are retried by the LLM scheduler
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+
+# LLM call scheduling: per-minute request and token limits (0 disables a limit),
+# how many seconds' worth of them may be sent at once, waiting calls per
+# priority class, and retries of rate limits, 5xx responses, timeouts and connection errors.
+# The token limit is off by default: set it to the account's TPM limit for the model
+# (OpenAI dashboard, Limits page), since a guess below it throttles for nothing
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "10"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "100"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
 
 # Application settings
 DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
 MAX_TWEETS_TO_FETCH = int(os.getenv("MAX_TWEETS_TO_FETCH", "10"))
 MAX_REPLIES_TO_GENERATE = int(os.getenv("MAX_REPLIES_TO_GENERATE", "5"))
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json"
+PRELOAD_AGENTS = os.getenv("PRELOAD_AGENTS", "False").lower() in ("true", "1", "t")  # build the agents at startup instead of on first use
+
+# Topic taxonomy: JSON file of {"Topic": ["keyword", ...]} (built-in default when unset)
+TOPIC_TAXONOMY_PATH = os.getenv("TOPIC_TAXONOMY_PATH", "")
+
+# Sentiment analysis: analyze_sentiment_batch scores with the LLM ("llm", up to
+# SENTIMENT_BATCH_SIZE texts and SENTIMENT_BATCH_MAX_TOKENS prompt tokens per
+# call) or the local lexicon ("lexicon"). LLM calls slower than
+# SENTIMENT_TIMEOUT_SECONDS, or failing, fall back to the lexicon, which a JSON
+# file of {"word or phrase": valence} at SENTIMENT_LEXICON_PATH extends
+SENTIMENT_BATCH_MODE = os.getenv("SENTIMENT_BATCH_MODE", "llm").lower()
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "25"))
+SENTIMENT_BATCH_MAX_TOKENS = int(os.getenv("SENTIMENT_BATCH_MAX_TOKENS", "2000"))
+SENTIMENT_TIMEOUT_SECONDS = float(os.getenv("SENTIMENT_TIMEOUT_SECONDS", "10"))
+SENTIMENT_LEXICON_PATH = os.getenv("SENTIMENT_LEXICON_PATH", "")
+
+# Tweet source ("none" or "ndjson"); TWEET_SOURCE_PATH is a file, directory or glob
+TWEET_SOURCE = os.getenv("TWEET_SOURCE", "none").lower()
+TWEET_SOURCE_PATH = os.getenv("TWEET_SOURCE_PATH", "")
+TWEET_SOURCE_CHUNK_SIZE = int(os.getenv("TWEET_SOURCE_CHUNK_SIZE", "1000"))
+
+# In-memory indexed store of ingested source tweets (answers searches without the LLM)
+TWEET_STORE_ENABLED = os.getenv("TWEET_STORE_ENABLED", "True").lower() in ("true", "1", "t")
+TWEET_STORE_MAX_TWEETS = int(os.getenv("TWEET_STORE_MAX_TWEETS", "100000"))
+TWEET_STORE_MAX_AGE_HOURS = float(os.getenv("TWEET_STORE_MAX_AGE_HOURS", "72"))
+TWEET_STORE_REFRESH_SECONDS = float(os.getenv("TWEET_STORE_REFRESH_SECONDS", "300"))
+TWEET_RANKING_BUCKET_SECONDS = float(os.getenv("TWEET_RANKING_BUCKET_SECONDS", "60"))
+
+# Token budgets (0 disables the per-request budget)
+REQUEST_TOKEN_BUDGET = int(os.getenv("REQUEST_TOKEN_BUDGET", "8000"))
+MAX_TWEET_CONTENT_TOKENS = int(os.getenv("MAX_TWEET_CONTENT_TOKENS", "400"))
+MAX_CUSTOM_INSTRUCTIONS_TOKENS = int(os.getenv("MAX_CUSTOM_INSTRUCTIONS_TOKENS", "300"))
+TOKEN_BUDGET_MODE = os.getenv("TOKEN_BUDGET_MODE", "trim").lower()  # "trim" or "reject"
+
+# Reply generation mode: "agent" runs the tool-using agent, "fast" makes one
+# structured-output call and scores the replies locally, "rerank" does the same
+# but asks for REPLY_CANDIDATES_PER_REPLY candidates per reply and keeps the
+# best-scoring ones that aren't near-duplicates (word-set Jaccard similarity
+# above REPLY_DUPLICATE_SIMILARITY)
+REPLY_GENERATION_MODE = os.getenv("REPLY_GENERATION_MODE", "agent").lower()
+REPLY_CANDIDATES_PER_REPLY = int(os.getenv("REPLY_CANDIDATES_PER_REPLY", "4"))
+REPLY_DUPLICATE_SIMILARITY = float(os.getenv("REPLY_DUPLICATE_SIMILARITY", "0.6"))
+
+# Batch reply generation
+REPLY_BATCH_MAX_CONCURRENCY = int(os.getenv("REPLY_BATCH_MAX_CONCURRENCY", "4"))
+REPLY_BATCH_MAX_ITEMS = int(os.getenv("REPLY_BATCH_MAX_ITEMS", "50"))
+
+# History of produced tweets and generated replies (SQLite, written in batches
+# by a background thread; HISTORY_MAX_PENDING bounds the queued additions)
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "True").lower() in ("true", "1", "t")
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "data/history.sqlite3")
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "1000"))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", "10000"))
+
+# Asynchronous jobs (POST /api/jobs): items and results are kept in a SQLite
+# database so queued work and finished results survive a restart
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ITEMS = int(os.getenv("JOB_MAX_ITEMS", "1000"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+JOB_PAGE_SIZE = int(os.getenv("JOB_PAGE_SIZE", "100"))
+JOB_MAX_PAGE_SIZE = int(os.getenv("JOB_MAX_PAGE_SIZE", "1000"))
+
+# Process pool for bulk CPU-bound work (tweet source scans and store loads,
+# a TWEET_SOURCE_CHUNK_SIZE chunk per task; lexicon sentiment and reply
+# evaluation): CPU_WORKERS processes (one per CPU when unset, 0 runs it in a
+# thread or inline), inputs split into chunks of up to CPU_CHUNK_SIZE items,
+# and inputs smaller than CPU_INLINE_THRESHOLD run inline on the caller
+CPU_WORKERS = int(os.getenv("CPU_WORKERS") or os.cpu_count() or 1)
+CPU_CHUNK_SIZE = int(os.getenv("CPU_CHUNK_SIZE", "5000"))
+CPU_INLINE_THRESHOLD = int(os.getenv("CPU_INLINE_THRESHOLD", "1000"))
+
+# Tweet search result cache (stale entries are served while refreshing)
+TWEET_CACHE_ENABLED = os.getenv("TWEET_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+TWEET_CACHE_MAX_ENTRIES = int(os.getenv("TWEET_CACHE_MAX_ENTRIES", "256"))
+TWEET_CACHE_FRESH_SECONDS = float(os.getenv("TWEET_CACHE_FRESH_SECONDS", "300"))
+TWEET_CACHE_STALE_SECONDS = float(os.getenv("TWEET_CACHE_STALE_SECONDS", "1800"))
+
+# Reply cache (repeat requests for the same tweet skip the agent run)
+REPLY_CACHE_ENABLED = os.getenv("REPLY_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+REPLY_CACHE_MAX_ENTRIES = int(os.getenv("REPLY_CACHE_MAX_ENTRIES", "1024"))
+REPLY_CACHE_TTL_SECONDS = float(os.getenv("REPLY_CACHE_TTL_SECONDS", "3600"))
+REPLY_CACHE_SNAPSHOT_PATH = os.getenv("REPLY_CACHE_SNAPSHOT_PATH", "")
+
+# Near-duplicate reply cache (a lightly edited or quoted copy of a tweet reuses
+# its replies when the texts' estimated Jaccard similarity reaches the threshold).
+# Texts with fewer character 5-grams than REPLY_SIMILARITY_MIN_SHINGLES once links
+# and punctuation are dropped (link-only or emoji-only tweets) are never matched
+REPLY_SIMILARITY_CACHE_ENABLED = os.getenv("REPLY_SIMILARITY_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+REPLY_SIMILARITY_THRESHOLD = float(os.getenv("REPLY_SIMILARITY_THRESHOLD", "0.8"))
+REPLY_SIMILARITY_MAX_ENTRIES = int(os.getenv("REPLY_SIMILARITY_MAX_ENTRIES", "100000"))
+REPLY_SIMILARITY_MIN_SHINGLES = int(os.getenv("REPLY_SIMILARITY_MIN_SHINGLES", "20"))
+REPLY_SIMILARITY_RERANK = os.getenv("REPLY_SIMILARITY_RERANK", "True").lower() in ("true", "1", "t")
 
 # Set up logging
 logging_level = logging.DEBUG if DEBUG else logging.INFO
@@ -0,0 +1,51 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# Process-wide agents and job manager, built on first use. Building an
+# agent imports the Agents SDK and the OpenAI client, which takes most
+# of the app's import time, so routes that don't need one (stats,
+# metrics, job status, history exports) never pay for it.
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+def _get(name: str, build: Callable[[], Any]) -> Any:
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = build()
+    return instance
+
+def built(name: str) -> Optional[Any]:
+    """Return the named instance ("tweet_finder", "reply_generator", "job_manager" or "bulk_executor") if it has been built"""
+    return _instances.get(name)
+
+def get_tweet_finder():
+    """The shared TweetFinderAgent"""
+    def build():
+        from aapp.aagents.tweet_finder import TweetFinderAgent
+        return TweetFinderAgent()
+    return _get("tweet_finder", build)
+
+def get_reply_generator():
+    """The shared ReplyGeneratorAgent"""
+    def build():
+        from aapp.aagents.reply_generator import ReplyGeneratorAgent
+        return ReplyGeneratorAgent()
+    return _get("reply_generator", build)
+
+def get_job_manager():
+    """The shared JobManager; its agents are built when its first item runs"""
+    def build():
+        from aapp.config import JOB_DB_PATH
+        from aapp.jobs import JobManager, JobStore
+        return JobManager(JobStore(JOB_DB_PATH), get_tweet_finder, get_reply_generator)
+    return _get("job_manager", build)
+
+def get_bulk_executor():
+    """The shared BulkExecutor; its worker processes start on the first large call"""
+    def build():
+        from aapp.utils.executor import BulkExecutor
+        return BulkExecutor()
+    return _get("bulk_executor", build)
@@ -0,0 +1,6 @@
+# Background jobs: large search and reply workloads run by a worker pool, persisted in SQLite
+
+from .manager import JobManager
+from .store import JobStore
+
+__all__ = ["JobManager", "JobStore"]
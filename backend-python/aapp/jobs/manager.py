@@ -0,0 +1,194 @@
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from aapp.config import JOB_MAX_ATTEMPTS, JOB_PAGE_SIZE, JOB_RETENTION_HOURS, JOB_WORKERS
+from aapp.jobs.store import JobStore
+from aapp.models import JobItemResult, JobRequest, JobStatus, ReplyRequest, TweetFilterRequest
+from aapp.utils.logging import logger
+from aapp.utils.scheduler import LLMUnavailable, Priority, llm_priority
+
+@dataclass
+class _QueuedItem:
+    job_id: str
+    idx: int
+    kind: str
+    request: Union[TweetFilterRequest, ReplyRequest]
+    attempt: int = 0
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+class JobManager:
+    """
+    Runs search and reply jobs in the background on a pool of workers
+
+    A submitted job is written to the JobStore and its items are queued;
+    `workers` tasks take items off the queue, so at most that many agent
+    runs are in flight however many jobs are waiting. Items run at batch
+    priority, behind interactive requests in the LLM scheduler. An item
+    the scheduler turns away (LLMUnavailable) is queued again after the
+    Retry-After, up to `max_attempts` tries; any other failure is recorded
+    as the item's error. Each result is stored as soon as its item
+    finishes, and on start the manager queues the items that had not
+    finished, so jobs survive a restart. Every store call runs in a
+    worker thread, so SQLite commits and reads never block the event loop.
+
+    Args:
+        store: Where jobs, items and results are kept
+        get_tweet_finder: Returns the agent for search items (called when one runs)
+        get_reply_generator: Returns the agent for reply items (called when one runs)
+        workers: Number of items run concurrently
+        max_attempts: Tries for an item the LLM scheduler turns away
+        retention_hours: Completed jobs older than this are deleted on start
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        get_tweet_finder: Callable[[], Any],
+        get_reply_generator: Callable[[], Any],
+        workers: int = JOB_WORKERS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retention_hours: float = JOB_RETENTION_HOURS,
+    ):
+        self.store = store
+        self.get_tweet_finder = get_tweet_finder
+        self.get_reply_generator = get_reply_generator
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retention_hours = retention_hours
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[_QueuedItem]"] = None
+        self._tasks: List["asyncio.Task[None]"] = []
+
+        self.running = 0
+        self.retried = 0
+        self.finished = 0
+
+    async def start(self) -> None:
+        """Start the workers and queue the unfinished items of stored jobs"""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+        if self.retention_hours > 0:
+            deleted = await asyncio.to_thread(self.store.delete_completed, time.time() - self.retention_hours * 3600)
+            if deleted:
+                logger.info("Deleted %d completed jobs past retention", deleted)
+
+        resumed = 0
+        for job_id, idx, kind, request in await asyncio.to_thread(self.store.pending):
+            model = TweetFilterRequest if kind == "search" else ReplyRequest
+            self._queue.put_nowait(_QueuedItem(job_id, idx, kind, model.model_validate_json(request)))
+            resumed += 1
+        if resumed:
+            logger.info("Resuming %d unfinished job items", resumed)
+
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; items in flight stay pending and resume on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    async def submit(self, job: JobRequest) -> JobStatus:
+        """Store a job, queue its items and return its initial status"""
+        await self.start()
+        items: List[Union[TweetFilterRequest, ReplyRequest]] = [*job.searches, *job.replies]
+        kinds = ["search"] * len(job.searches) + ["replies"] * len(job.replies)
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        requests = [(kind, item.model_dump_json()) for kind, item in zip(kinds, items)]
+        await asyncio.to_thread(self.store.create, job_id, requests, now)
+        for idx, (kind, item) in enumerate(zip(kinds, items)):
+            self._queue.put_nowait(_QueuedItem(job_id, idx, kind, item))
+
+        return JobStatus(id=job_id, status="queued", total=len(items), created_at=_iso(now), updated_at=_iso(now))
+
+    async def get(self, job_id: str, offset: int = 0, limit: Optional[int] = JOB_PAGE_SIZE) -> Optional[JobStatus]:
+        """A job's progress and up to `limit` of its finished items' results, or None if there is no such job"""
+        found = await asyncio.to_thread(self.store.get, job_id, offset, limit)
+        if found is None:
+            return None
+        job, results = found
+        return JobStatus.model_construct(
+            id=job["id"],
+            status=job["status"],
+            total=job["total"],
+            succeeded=job["succeeded"],
+            failed=job["failed"],
+            created_at=_iso(job["created_at"]),
+            updated_at=_iso(job["updated_at"]),
+            results=[JobItemResult.model_validate_json(result) for result in results],
+        )
+
+    async def _work(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._run(item)
+            except Exception as e:
+                logger.exception("Error running job item %s/%d: %s", item.job_id, item.idx, e)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, item: _QueuedItem) -> None:
+        await asyncio.to_thread(self.store.mark_running, item.job_id, time.time())
+
+        result = JobItemResult(index=item.idx, kind=item.kind)
+        self.running += 1
+        try:
+            with llm_priority(Priority.BATCH):
+                if item.kind == "search":
+                    (outcome,) = await self.get_tweet_finder().find_tweets_batch([item.request])
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                    result.tweets = outcome
+                else:
+                    result.tweet_id = item.request.tweet_id
+                    (outcome,) = await self.get_reply_generator().generate_replies_batch([item.request], max_concurrency=1)
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                    result.replies = outcome
+        except LLMUnavailable as e:
+            if item.attempt + 1 < self.max_attempts:
+                # The provider or the scheduler is saturated: try again once it has room
+                item.attempt += 1
+                self.retried += 1
+                self._loop.call_later(e.retry_after, self._queue.put_nowait, item)
+                return
+            logger.warning("Job item %s/%d gave up: %s", item.job_id, item.idx, e)
+            result.error = f"LLM unavailable: {str(e)}"
+        except Exception as e:
+            logger.error("Error running job item %s/%d: %s", item.job_id, item.idx, e, extra={"job_id": item.job_id})
+            result.error = f"Error running job item: {str(e)}"
+        finally:
+            self.running -= 1
+
+        await asyncio.to_thread(
+            self.store.finish_item, item.job_id, item.idx, result.model_dump_json(), result.error is not None, time.time()
+        )
+        self.finished += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        """Return queue depth, items in flight and per-status job counts"""
+        counts = await asyncio.to_thread(self.store.counts)
+        return {
+            "workers": self.workers,
+            "queued_items": self._queue.qsize() if self._queue is not None else 0,
+            "running_items": self.running,
+            "finished_items": self.finished,
+            "retried_items": self.retried,
+            "jobs": counts,
+        }
@@ -0,0 +1,129 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from aapp.utils.sqlite import connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    succeeded INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    request TEXT NOT NULL,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_items_pending ON job_items (job_id) WHERE result IS NULL;
+CREATE INDEX IF NOT EXISTS jobs_completed ON jobs (updated_at) WHERE status = 'completed';
+"""
+
+class JobStore:
+    """
+    SQLite persistence for jobs and their items
+
+    A job row carries its status and counters; each item row holds the
+    item's kind and request as JSON, and its result JSON once it has
+    finished (an item without a result is still pending). Recording a
+    result and bumping the job's counters happen in one transaction, so a
+    restart resumes exactly the items that had no result yet.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def create(self, job_id: str, items: List[Tuple[str, str]], now: float) -> None:
+        """Store a new queued job with its (kind, request JSON) items"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, total, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, len(items), now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, kind, request) VALUES (?, ?, ?, ?)",
+                ((job_id, idx, kind, request) for idx, (kind, request) in enumerate(items)),
+            )
+
+    def pending(self) -> List[Tuple[str, int, str, str]]:
+        """(job id, index, kind, request JSON) of every unfinished item, oldest job first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT i.job_id, i.idx, i.kind, i.request FROM job_items i JOIN jobs j ON j.id = i.job_id "
+                "WHERE i.result IS NULL ORDER BY j.created_at, i.job_id, i.idx"
+            ).fetchall()
+
+    def mark_running(self, job_id: str, now: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (now, job_id),
+            )
+
+    def finish_item(self, job_id: str, idx: int, result: str, failed: bool, now: float) -> None:
+        """Record an item's result JSON and count it, completing the job with its last item"""
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE job_items SET result = ? WHERE job_id = ? AND idx = ? AND result IS NULL",
+                (result, job_id, idx),
+            ).rowcount
+            if not updated:
+                return
+            self._conn.execute(
+                "UPDATE jobs SET succeeded = succeeded + ?, failed = failed + ?, updated_at = ?, "
+                "status = CASE WHEN succeeded + failed + 1 >= total THEN 'completed' ELSE 'running' END "
+                "WHERE id = ?",
+                (0 if failed else 1, 1 if failed else 0, now, job_id),
+            )
+
+    def get(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """
+        A job's row and the result JSON of its finished items, in item order
+
+        Args:
+            job_id: Job to read
+            offset: Finished items to skip
+            limit: Maximum number of results (None for all)
+
+        Returns:
+            (job row as a dict, result JSON strings), or None if there is no such job
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, total, succeeded, failed, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            results = self._conn.execute(
+                "SELECT result FROM job_items WHERE job_id = ? AND result IS NOT NULL ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, -1 if limit is None else limit, offset),
+            ).fetchall()
+        columns = ("id", "status", "total", "succeeded", "failed", "created_at", "updated_at")
+        return dict(zip(columns, row)), [result for (result,) in results]
+
+    def delete_completed(self, before: float) -> int:
+        """Delete completed jobs (and their items) last updated before `before`; returns how many"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status = 'completed' AND updated_at < ?", (before,)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
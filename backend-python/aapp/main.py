@@ -1,16 +1,80 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-from aapp.routers import tweets, replies
-import uvicorn
-# Load environment variables
-load_dotenv()
+from fastapi.responses import PlainTextResponse
+from aapp.config import PRELOAD_AGENTS
+from aapp.dependencies import built, get_job_manager, get_reply_generator, get_tweet_finder
+from aapp.routers import tweets, replies, jobs, history
+from aapp.store.history import close_history_store, get_history_store
+from aapp.utils.llm_client import close_openai_client
+from aapp.utils.logging import logger, request_id_var
+from aapp.utils.metrics import (
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+    registry,
+)
+from aapp.utils.scheduler import llm_scheduler
+from aapp.utils.tokens import current_endpoint, usage_tracker
+import asyncio
+import time
+import uuid
+
+def route_template(request: Request) -> str:
+    """Return the request path with path parameter values replaced by their names"""
+    segments = request.url.path.split("/")
+    # Path parameters sit at the end of our routes, so match from the right
+    for name, value in reversed(list(request.path_params.items())):
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i] == str(value):
+                segments[i] = f"{{{name}}}"
+                break
+    return "/".join(segments)
+
+async def track_endpoint(request: Request):
+    """Attribute LLM usage in this request to its route"""
+    current_endpoint.set(f"{request.method} {route_template(request)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Agents are built on first use unless PRELOAD_AGENTS asks for them up front
+    if PRELOAD_AGENTS:
+        get_tweet_finder()
+        get_reply_generator()
+
+    # Start the job workers and resume jobs left unfinished by the last run
+    await get_job_manager().start()
+
+    yield
+
+    # Stop the job workers; unfinished items resume on the next start
+    job_manager = get_job_manager()
+    await job_manager.stop()
+    job_manager.store.close()
+
+    # Persist the reply cache so the next worker starts warm
+    reply_generator = built("reply_generator")
+    if reply_generator is not None:
+        reply_generator.save_cache_snapshot()
+
+    # Write the queued history rows
+    close_history_store()
+
+    # Stop the CPU worker processes
+    bulk_executor = built("bulk_executor")
+    if bulk_executor is not None:
+        bulk_executor.shutdown()
+
+    # Release the pooled LLM connections
+    await close_openai_client()
 
 # Create FastAPI app
 app = FastAPI(
     title="ReplyGuy API",
     description="AI-powered API for finding viral tweets and generating engaging replies",
-    version="1.0.0"
+    version="1.0.0",
+    dependencies=[Depends(track_endpoint)],
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -25,6 +89,83 @@ app.add_middleware(
 # Include routers
 app.include_router(tweets.router, prefix="/api/tweets", tags=["tweets"])
 app.include_router(replies.router, prefix="/api/replies", tags=["replies"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(history.router, prefix="/api/history", tags=["history"])
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    """Assign a request ID and record latency, status and in-flight count per route"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    status = 500
+    http_requests_in_flight.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    except Exception:
+        logger.exception("Unhandled error", extra={"path": request.url.path})
+        raise
+    finally:
+        http_requests_in_flight.dec()
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = route_template(request) if "route" in request.scope else "unmatched"
+        http_request_duration_seconds.observe(time.perf_counter() - start, method=request.method, route=route)
+        http_requests_total.inc(method=request.method, route=route, status=str(status))
+        request_id_var.reset(token)
+
+def collect_app_metrics():
+    """Expose cache, coalescing and token usage counters that live on the agents"""
+    # Agents not built yet have nothing to report
+    tweet_finder = built("tweet_finder")
+    reply_generator = built("reply_generator")
+    caches = {}
+    if tweet_finder is not None:
+        caches["tweets"] = tweet_finder.cache
+    if reply_generator is not None:
+        caches["replies"] = reply_generator.cache
+        caches["similar_replies"] = reply_generator.similar
+    cache_hits, cache_misses, cache_entries = [], [], []
+    for name, cache in caches.items():
+        if cache is None:
+            continue
+        cache_stats = cache.stats()
+        hits = cache_stats.get("hits", cache_stats.get("fresh_hits", 0) + cache_stats.get("stale_hits", 0))
+        cache_hits.append(("replyguy_cache_hits_total", {"cache": name}, hits))
+        cache_misses.append(("replyguy_cache_misses_total", {"cache": name}, cache_stats["misses"]))
+        cache_entries.append(("replyguy_cache_entries", {"cache": name}, cache_stats["entries"]))
+
+    coalesced_calls, coalesced_executions, coalesced_in_flight = [], [], []
+    for name, agent in (("tweets", tweet_finder), ("replies", reply_generator)):
+        if agent is None:
+            continue
+        flight_stats = agent.inflight.stats()
+        coalesced_calls.append(("replyguy_coalescing_calls_total", {"name": name}, flight_stats["calls"]))
+        coalesced_executions.append(("replyguy_coalescing_executions_total", {"name": name}, flight_stats["executions"]))
+        coalesced_in_flight.append(("replyguy_coalescing_in_flight", {"name": name}, flight_stats["in_flight"]))
+
+    tokens, llm_requests, tool_calls = [], [], []
+    for endpoint, endpoint_usage in usage_tracker.stats().items():
+        tokens.append(("replyguy_llm_tokens_total", {"endpoint": endpoint, "kind": "prompt"}, endpoint_usage["prompt_tokens"]))
+        tokens.append(("replyguy_llm_tokens_total", {"endpoint": endpoint, "kind": "completion"}, endpoint_usage["completion_tokens"]))
+        llm_requests.append(("replyguy_llm_requests_total", {"endpoint": endpoint}, endpoint_usage["llm_requests"]))
+        tool_calls.append(("replyguy_tool_calls_total", {"endpoint": endpoint}, endpoint_usage["tool_calls"]))
+
+    return [
+        ("replyguy_cache_hits_total", "counter", "Cache hits (fresh and stale)", cache_hits),
+        ("replyguy_cache_misses_total", "counter", "Cache misses", cache_misses),
+        ("replyguy_cache_entries", "gauge", "Entries currently cached", cache_entries),
+        ("replyguy_coalescing_calls_total", "counter", "Calls through request coalescing", coalesced_calls),
+        ("replyguy_coalescing_executions_total", "counter", "Agent runs actually started after coalescing", coalesced_executions),
+        ("replyguy_coalescing_in_flight", "gauge", "Coalesced agent runs in flight", coalesced_in_flight),
+        ("replyguy_llm_tokens_total", "counter", "LLM tokens by endpoint and kind", tokens),
+        ("replyguy_llm_requests_total", "counter", "LLM model round trips by endpoint", llm_requests),
+        ("replyguy_tool_calls_total", "counter", "Agent tool calls by endpoint", tool_calls),
+    ]
+
+registry.register_collector(collect_app_metrics)
 
 @app.get("/")
 async def root():
@@ -33,5 +174,55 @@ async def root():
         "docs": "/docs",
     }
 
+@app.get("/api/stats")
+async def stats():
+    """
+    Cache, request-coalescing, LLM scheduler, job, history, CPU executor and tweet source counters
+
+    `saved` under `coalescing` is the number of agent runs avoided by
+    sharing an in-flight run between identical concurrent requests.
+    """
+    # An agent that has not served a request yet is not built just to report zeros
+    tweet_finder = built("tweet_finder")
+    reply_generator = built("reply_generator")
+    # Opening either SQLite store on first use and counting jobs are blocking calls
+    history_store = await asyncio.to_thread(get_history_store)
+    job_manager = await asyncio.to_thread(get_job_manager)
+    job_stats = await job_manager.stats()
+    bulk_executor = built("bulk_executor")
+    return {
+        "caches": {
+            "tweets": tweet_finder.cache.stats() if tweet_finder is not None and tweet_finder.cache is not None else None,
+            "replies": reply_generator.cache.stats() if reply_generator is not None and reply_generator.cache is not None else None,
+            "similar_replies": reply_generator.similar.stats() if reply_generator is not None and reply_generator.similar is not None else None,
+        },
+        "coalescing": {
+            "tweets": tweet_finder.inflight.stats() if tweet_finder is not None else None,
+            "replies": reply_generator.inflight.stats() if reply_generator is not None else None,
+        },
+        "llm_scheduler": llm_scheduler.stats(),
+        "jobs": job_stats,
+        "history": history_store.stats() if history_store is not None else None,
+        "executor": bulk_executor.stats() if bulk_executor is not None else None,
+        "source": tweet_finder.source.stats() if tweet_finder is not None and tweet_finder.source is not None else None,
+        "store": tweet_finder.store.stats() if tweet_finder is not None and tweet_finder.store is not None else None,
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/usage")
+async def usage():
+    """
+    LLM token usage per endpoint
+
+    Prompt and completion tokens, model round trips (llm_requests) and
+    tool calls, as totals and per-call averages.
+    """
+    return usage_tracker.stats()
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
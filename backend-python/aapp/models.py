@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 
 class TweetAuthor(BaseModel):
     name: str
@@ -20,6 +20,7 @@ class Tweet(BaseModel):
     timestamp: str
     metrics: TweetMetrics
     viral_potential: int = Field(0, ge=0, le=100)  # 0-100 scale
+    is_reply: Optional[bool] = False
 
 class TweetFilterRequest(BaseModel):
     min_engagement: Optional[int] = 100
@@ -38,12 +39,54 @@ class ReplyRequest(BaseModel):
     tweet_author: str
     custom_instructions: Optional[str] = None
     num_replies: Optional[int] = 3
+    mode: Optional[Literal["agent", "fast", "rerank"]] = None  # Defaults to REPLY_GENERATION_MODE
 
 class Reply(BaseModel):
     content: str
     strengths: List[str]
     estimated_engagement: int = Field(0, ge=0, le=100)
 
+class ReplyRecord(Reply):
+    tweet_id: str
+    tweet_author: str
+    mode: str
+    created_at: str
+
 class ReplyResponse(BaseModel):
     replies: List[Reply]
-    tweet_id: str 
\ No newline at end of file
+    tweet_id: str
+
+class BatchReplyRequest(BaseModel):
+    requests: List[ReplyRequest]
+
+class BatchReplyResult(BaseModel):
+    tweet_id: str
+    replies: List[Reply] = []
+    error: Optional[str] = None
+
+class BatchReplyResponse(BaseModel):
+    results: List[BatchReplyResult]
+    succeeded: int = 0
+    failed: int = 0
+
+class JobRequest(BaseModel):
+    searches: List[TweetFilterRequest] = []
+    replies: List[ReplyRequest] = []
+
+class JobItemResult(BaseModel):
+    index: int
+    kind: Literal["search", "replies"]
+    tweet_id: Optional[str] = None  # Reply items only
+    tweets: Optional[List[Tweet]] = None
+    replies: Optional[List[Reply]] = None
+    error: Optional[str] = None
+
+class JobStatus(BaseModel):
+    id: str
+    status: Literal["queued", "running", "completed"]
+    total: int
+    succeeded: int = 0
+    failed: int = 0
+    created_at: str
+    updated_at: str
+    results: List[JobItemResult] = []  # Finished items so far, in item order
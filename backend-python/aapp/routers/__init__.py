@@ -2,5 +2,7 @@
 
 from .tweets import router as tweets_router
 from .replies import router as replies_router
+from .jobs import router as jobs_router
+from .history import router as history_router
 
-__all__ = ["tweets_router", "replies_router"]
\ No newline at end of file
+__all__ = ["tweets_router", "replies_router", "jobs_router", "history_router"]
\ No newline at end of file
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Iterator, Optional
+
+from pydantic import BaseModel
+
+from aapp.store import get_history_store
+from aapp.utils.timestamps import parse_timestamp
+from aapp.utils.serialization import serialize_model
+
+router = APIRouter()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _history():
+    history = get_history_store()
+    if history is None:
+        raise HTTPException(status_code=404, detail="History is disabled (HISTORY_ENABLED=False)")
+    return history
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    return None if value is None else parse_timestamp(value)
+
+def _ndjson(models: Iterator[BaseModel]) -> Iterator[bytes]:
+    # A plain iterator: Starlette runs it in a worker thread, so SQLite reads don't block the loop
+    for model in models:
+        yield serialize_model(model) + b"\n"
+
+@router.get("/tweets")
+async def export_tweets(author: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """
+    Export stored tweets as NDJSON, oldest first
+
+    Filter by author handle and by creation time (`since` inclusive,
+    `until` exclusive, ISO-8601). Rows are streamed from SQLite, so
+    exports of any size use constant memory.
+    """
+    tweets = _history().iter_tweets(author=author, since=_epoch(since), until=_epoch(until))
+    return StreamingResponse(_ndjson(tweets), media_type=NDJSON_MEDIA_TYPE)
+
+@router.get("/replies")
+async def export_replies(
+    tweet_id: Optional[str] = None,
+    author: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Export generated replies as NDJSON, oldest first
+
+    Each line is a reply with the tweet it answers, its author and the
+    generation mode. Filter by tweet id, the tweet's author handle and
+    generation time (`since` inclusive, `until` exclusive, ISO-8601).
+    """
+    replies = _history().iter_replies(tweet_id=tweet_id, author=author, since=_epoch(since), until=_epoch(until))
+    return StreamingResponse(_ndjson(replies), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from aapp.models import JobRequest, JobStatus
+from aapp.config import JOB_MAX_ITEMS, JOB_MAX_PAGE_SIZE, JOB_PAGE_SIZE
+from aapp.dependencies import get_job_manager
+from aapp.utils.serialization import model_response
+
+router = APIRouter()
+
+@router.post("", response_model=JobStatus, status_code=202)
+async def create_job(job: JobRequest, http_request: Request, job_manager=Depends(get_job_manager)):
+    """
+    Queue a job of tweet searches and/or reply requests
+
+    Returns immediately with the job's ID; poll GET /api/jobs/{job_id}
+    for progress and results.
+    """
+    total = len(job.searches) + len(job.replies)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Job has no searches or replies")
+    if total > JOB_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Job too large: {total} items (max {JOB_MAX_ITEMS})")
+
+    status = await job_manager.submit(job)
+    return model_response(http_request, status, status_code=202)
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    http_request: Request,
+    job_manager=Depends(get_job_manager),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(JOB_PAGE_SIZE, ge=1, le=JOB_MAX_PAGE_SIZE),
+):
+    """
+    Get a job's progress and the results of its finished items
+
+    Results are in item order (searches first, then replies) and only
+    cover finished items; page through them with offset and limit
+    (JOB_PAGE_SIZE results by default, at most JOB_MAX_PAGE_SIZE).
+    """
+    status = await job_manager.get(job_id, offset, limit)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return model_response(http_request, status)
@@ -1,28 +1,144 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import math
+from typing import List, Any, Dict
+import time
 
-from aapp.models import ReplyRequest, Reply, ReplyResponse
-from aapp.aagents.reply_generator import ReplyGeneratorAgent
+from aapp.models import ReplyRequest, Reply, ReplyResponse, BatchReplyRequest, BatchReplyResult, BatchReplyResponse
+from aapp.config import REPLY_BATCH_MAX_ITEMS
+from aapp.utils.logging import logger
+from aapp.utils.scheduler import LLMUnavailable
+from aapp.utils.serialization import dumps_json, model_response
+from aapp.utils.tokens import TokenBudgetExceeded
+from aapp.dependencies import get_reply_generator
 
 router = APIRouter()
 
-# Create the ReplyGeneratorAgent instance
-reply_generator = ReplyGeneratorAgent()
-
 @router.post("/generate", response_model=ReplyResponse)
-async def generate_replies(request: ReplyRequest):
+async def generate_replies(request: ReplyRequest, http_request: Request, reply_generator=Depends(get_reply_generator)):
     """
     Generate AI-powered replies to a tweet
+
+    Responds with JSON, or MessagePack if the Accept header prefers it.
     """
     try:
         replies = await reply_generator.generate_replies(request)
-        return ReplyResponse(replies=replies, tweet_id=request.tweet_id)
+        return model_response(http_request, ReplyResponse.model_construct(replies=replies, tweet_id=request.tweet_id))
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
-        print(f"Error generating replies: {e}")
+        logger.exception("Error generating replies: %s", e)
         raise HTTPException(status_code=500, detail=f"Error generating replies: {str(e)}")
 
+@router.post("/generate-batch", response_model=BatchReplyResponse)
+async def generate_replies_batch(batch: BatchReplyRequest, http_request: Request, reply_generator=Depends(get_reply_generator)):
+    """
+    Generate AI-powered replies for many tweets concurrently
+
+    Each item gets its own result; a failing item reports its error
+    without failing the rest of the batch.
+    """
+    if len(batch.requests) > REPLY_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(batch.requests)} items (max {REPLY_BATCH_MAX_ITEMS})"
+        )
+
+    outcomes = await reply_generator.generate_replies_batch(batch.requests)
+
+    results = []
+    for request, outcome in zip(batch.requests, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error("Error generating replies for tweet %s: %s", request.tweet_id, outcome, extra={"tweet_id": request.tweet_id})
+            results.append(BatchReplyResult(tweet_id=request.tweet_id, error=f"Error generating replies: {str(outcome)}"))
+        else:
+            results.append(BatchReplyResult(tweet_id=request.tweet_id, replies=outcome))
+
+    failed = sum(1 for result in results if result.error is not None)
+    return model_response(
+        http_request,
+        BatchReplyResponse.model_construct(results=results, succeeded=len(results) - failed, failed=failed),
+    )
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {dumps_json(data).decode()}\n\n"
+
+async def _wait_for_disconnect(http_request: Request) -> None:
+    """Return once the client disconnects (the request body has already been read)"""
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+@router.post("/generate/stream")
+async def stream_replies(request: ReplyRequest, http_request: Request, reply_generator=Depends(get_reply_generator)):
+    """
+    Generate AI-powered replies to a tweet, streamed as Server-Sent Events
+
+    Emits a `reply` event for each reply as soon as it is complete, then a
+    `done` event with a summary (or an `error` event if generation fails).
+    A client that disconnects stops the generation right away, even while
+    it waits for the first or the next reply.
+    """
+    async def event_stream():
+        started = time.perf_counter()
+        first_reply_ms = None
+        count = 0
+        replies_stream = reply_generator.stream_replies(request)
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(http_request))
+        next_reply = None
+
+        try:
+            while True:
+                # Wait for the next reply or the client going away, whichever comes first
+                next_reply = asyncio.ensure_future(replies_stream.__anext__())
+                await asyncio.wait((next_reply, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                if not next_reply.done():
+                    return
+                try:
+                    reply = next_reply.result()
+                except StopAsyncIteration:
+                    break
+
+                count += 1
+                if first_reply_ms is None:
+                    first_reply_ms = round((time.perf_counter() - started) * 1000, 1)
+                yield _sse_event("reply", {"index": count - 1, "tweet_id": request.tweet_id, **reply.model_dump()})
+
+            yield _sse_event("done", {
+                "tweet_id": request.tweet_id,
+                "count": count,
+                "first_reply_ms": first_reply_ms,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+        except LLMUnavailable as e:
+            logger.warning("LLM unavailable while streaming replies: %s", e)
+            yield _sse_event("error", {"tweet_id": request.tweet_id, "detail": str(e), "retry_after": math.ceil(e.retry_after)})
+        except Exception as e:
+            logger.exception("Error streaming replies: %s", e)
+            yield _sse_event("error", {"tweet_id": request.tweet_id, "detail": f"Error generating replies: {str(e)}"})
+        finally:
+            disconnected.cancel()
+            if next_reply is not None and not next_reply.done():
+                # Cancelling the pending step stops the upstream run; it has to
+                # finish unwinding before the generator can be closed
+                next_reply.cancel()
+                await asyncio.gather(next_reply, return_exceptions=True)
+            # Closing the generator cancels the agent run if it is still going
+            await replies_stream.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/test/{tweet_id}", response_model=ReplyResponse)
-async def test_replies(tweet_id: str):
+async def test_replies(tweet_id: str, http_request: Request, reply_generator=Depends(get_reply_generator)):
     """
     Get test replies for UI development
     """
@@ -35,7 +151,9 @@ async def test_replies(tweet_id: str):
             num_replies=3
         )
         replies = await reply_generator.generate_replies(test_request)
-        return ReplyResponse(replies=replies, tweet_id=tweet_id)
+        return model_response(http_request, ReplyResponse.model_construct(replies=replies, tweet_id=tweet_id))
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
-        print(f"Error getting test replies: {e}")
+        logger.exception("Error getting test replies: %s", e)
         raise HTTPException(status_code=500, detail=f"Error getting test replies: {str(e)}") 
\ No newline at end of file
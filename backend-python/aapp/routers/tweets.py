@@ -1,28 +1,36 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+import math
 from typing import List
 
 from aapp.models import TweetFilterRequest, Tweet, TweetResponse
-from aapp.aagents.tweet_finder import TweetFinderAgent
+from aapp.dependencies import get_tweet_finder
+from aapp.utils.logging import logger
+from aapp.utils.scheduler import LLMUnavailable
+from aapp.utils.serialization import model_response
+from aapp.utils.tokens import TokenBudgetExceeded
 
 router = APIRouter()
 
-# Create the TweetFinderAgent instance
-tweet_finder = TweetFinderAgent()
-
 @router.post("/search", response_model=TweetResponse)
-async def search_tweets(filters: TweetFilterRequest):
+async def search_tweets(filters: TweetFilterRequest, http_request: Request, tweet_finder=Depends(get_tweet_finder)):
     """
     Search for tweets based on filter criteria
+
+    Responds with JSON, or MessagePack if the Accept header prefers it.
     """
     try:
         tweets = await tweet_finder.find_tweets(filters)
-        return TweetResponse(tweets=tweets)
+        return model_response(http_request, TweetResponse.model_construct(tweets=tweets))
+    except TokenBudgetExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
-        print(f"Error searching tweets: {e}")
+        logger.exception("Error searching tweets: %s", e)
         raise HTTPException(status_code=500, detail=f"Error searching tweets: {str(e)}")
 
 @router.get("/test", response_model=TweetResponse)
-async def test_tweets():
+async def test_tweets(http_request: Request, tweet_finder=Depends(get_tweet_finder)):
     """
     Get test tweets for UI development
     """
@@ -37,7 +45,9 @@ async def test_tweets():
             max_results=5
         )
         tweets = await tweet_finder.find_tweets(test_filters)
-        return TweetResponse(tweets=tweets)
+        return model_response(http_request, TweetResponse.model_construct(tweets=tweets))
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
-        print(f"Error getting test tweets: {e}")
+        logger.exception("Error getting test tweets: %s", e)
         raise HTTPException(status_code=500, detail=f"Error getting test tweets: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,20 @@
+# Tweet sources the TweetFinder can search instead of (or before) asking the LLM
+
+from typing import Optional
+
+from aapp.config import TWEET_SOURCE, TWEET_SOURCE_PATH
+from .base import TweetSource, record_to_tweet_data
+from .ndjson import NDJSONTweetSource
+from .query import parse_search_query
+
+def create_tweet_source(kind: str = TWEET_SOURCE, path: str = TWEET_SOURCE_PATH) -> Optional[TweetSource]:
+    """Create the configured tweet source, or None when no source is configured"""
+    if kind == "ndjson":
+        if not path:
+            raise ValueError("TWEET_SOURCE=ndjson needs TWEET_SOURCE_PATH")
+        return NDJSONTweetSource(path)
+    if kind in ("", "none"):
+        return None
+    raise ValueError(f"Unknown tweet source: {kind}")
+
+__all__ = ["TweetSource", "NDJSONTweetSource", "record_to_tweet_data", "parse_search_query", "create_tweet_source"]
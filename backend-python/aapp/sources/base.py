@@ -0,0 +1,341 @@
+import asyncio
+import heapq
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from aapp.config import TWEET_SOURCE_CHUNK_SIZE
+from aapp.models import Tweet, TweetFilterRequest
+from aapp.store.columnar import AuthorKey, TweetBatch, TweetRow, build_tweet
+from aapp.utils.scoring import engagement_count, score_viral_potential, to_percent
+from aapp.utils.topics import get_topic_classifier
+
+if TYPE_CHECKING:
+    from aapp.utils.executor import BulkExecutor
+
+# created_at format of the Twitter v1.1 API ("Wed Oct 10 20:19:24 +0000 2018")
+_TWITTER_TIME_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+def _timestamp(value: Any) -> str:
+    """Convert Twitter-style created_at values to ISO-8601, pass anything else through"""
+    if isinstance(value, str) and value[:3].isalpha():
+        try:
+            return datetime.strptime(value, _TWITTER_TIME_FORMAT).isoformat()
+        except ValueError:
+            pass
+    return "" if value is None else str(value)
+
+def record_to_tweet_data(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a raw tweet record to the Tweet model's shape
+
+    Records already in the Tweet shape (with `author` and `metrics`) pass
+    through; flat firehose records in the Twitter API shape (`text`, `user`,
+    `favorite_count`, ...) are mapped field by field.
+    """
+    if "author" in record and "metrics" in record:
+        return record
+
+    user = record.get("user") or {}
+    handle = user.get("screen_name") or user.get("username") or record.get("author_handle") or ""
+    metrics = record.get("public_metrics") or record
+
+    return {
+        "id": str(record.get("id_str") or record.get("id") or ""),
+        "author": {
+            "name": user.get("name") or record.get("author_name") or handle,
+            "handle": handle,
+            "avatar": user.get("profile_image_url_https") or f"https://unavatar.io/x/{handle}",
+            "is_verified": bool(user.get("verified", record.get("author_verified", False))),
+        },
+        "content": record.get("full_text") or record.get("text") or record.get("content") or "",
+        "timestamp": _timestamp(record.get("created_at") or record.get("timestamp")),
+        "metrics": {
+            "likes": metrics.get("favorite_count", metrics.get("like_count", metrics.get("likes", 0))) or 0,
+            "replies": metrics.get("reply_count", metrics.get("replies", 0)) or 0,
+            "retweets": metrics.get("retweet_count", metrics.get("retweets", 0)) or 0,
+            "views": metrics.get("impression_count", metrics.get("views", 0)) or 0,
+        },
+        "is_reply": record.get("in_reply_to_status_id") is not None or bool(record.get("is_reply", False)),
+    }
+
+def _tweet_data(records: Iterable[Any]) -> Iterator[Any]:
+    """record_to_tweet_data over many records; records that can't be mapped are passed on as-is to be rejected"""
+    for record in records:
+        try:
+            yield record_to_tweet_data(record)
+        except (AttributeError, TypeError):
+            yield record
+
+def _chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# Decodes a chunk of raw items into records, returning them and how many items were invalid
+RecordDecoder = Callable[[List[Any]], Tuple[List[Dict[str, Any]], int]]
+
+# A search match as plain data: (viral_potential, row, author, metrics, is_reply)
+Candidate = Tuple[int, TweetRow, AuthorKey, Tuple[int, int, int, int], bool]
+
+class SearchFilters(NamedTuple):
+    """The filters of a TweetFilterRequest as plain values, cheap to send to a worker process"""
+
+    min_engagement: int = 0
+    only_verified: bool = False
+    exclude_replies: bool = False
+    min_viral_potential: int = 0
+    topics: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_request(cls, criteria: Optional[TweetFilterRequest]) -> Optional["SearchFilters"]:
+        if criteria is None:
+            return None
+        return cls(
+            criteria.min_engagement or 0,
+            bool(criteria.only_verified),
+            bool(criteria.exclude_replies),
+            criteria.min_viral_potential or 0,
+            tuple(criteria.topics or ()),
+        )
+
+def score_and_filter(batch: TweetBatch, filters: Optional[SearchFilters], now: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices of the batch's tweets matching the filters, and every tweet's viral_potential"""
+    percents = to_percent(score_viral_potential(**batch.columns(), now=now))
+
+    keep = np.ones(len(batch), dtype=bool)
+    if filters is not None:
+        if filters.min_engagement:
+            keep &= engagement_count(batch.likes, batch.replies, batch.retweets) >= filters.min_engagement
+        if filters.only_verified:
+            keep &= batch.verified
+        if filters.exclude_replies:
+            keep &= ~batch.is_reply
+        if filters.min_viral_potential:
+            keep &= percents >= filters.min_viral_potential
+
+    indices = np.flatnonzero(keep)
+
+    # Topic matching is the costliest predicate, so it only sees the survivors
+    if filters is not None and filters.topics and len(indices):
+        matches = get_topic_classifier().matches_any([batch.rows[i].content for i in indices.tolist()], filters.topics)
+        indices = indices[np.fromiter(matches, dtype=bool, count=len(indices))]
+    return indices, percents
+
+def _decode_batch(items: List[Any], decoder: Optional[RecordDecoder], now: float) -> Tuple[TweetBatch, int]:
+    records, invalid = decoder(items) if decoder is not None else (items, 0)
+    batch = TweetBatch.from_dicts(_tweet_data(records), now)
+    return batch, invalid + len(records) - len(batch)
+
+# The chunk stages below run in the CPU worker pool (utils/executor.py), so
+# they are module-level and take and return plain data: raw records,
+# SearchFilters, rows, author tuples, counts and keyword sets, never
+# Pydantic models
+
+def search_chunk(
+    items: List[Any], decoder: Optional[RecordDecoder], filters: Optional[SearchFilters], now: float, limit: int
+) -> Tuple[int, int, int, List[Candidate]]:
+    """Decode, validate, score and filter one chunk; returns (invalid, filtered, matched, its top `limit` matches)"""
+    batch, invalid = _decode_batch(items, decoder, now)
+    indices, percents = score_and_filter(batch, filters, now)
+    top = heapq.nlargest(limit, indices.tolist(), key=percents.__getitem__)
+    candidates = [
+        (
+            int(percents[i]),
+            batch.rows[i],
+            batch.authors.get(int(batch.author_ids[i])),
+            (int(batch.likes[i]), int(batch.replies[i]), int(batch.retweets[i]), int(batch.views[i])),
+            bool(batch.is_reply[i]),
+        )
+        for i in top
+    ]
+    return invalid, len(batch) - len(indices), len(indices), candidates
+
+def batch_chunk(
+    items: List[Any], decoder: Optional[RecordDecoder], now: float, with_keywords: bool
+) -> Tuple[int, TweetBatch, Optional[List[Set[str]]]]:
+    """Decode and validate one chunk into a TweetBatch, with each tweet's taxonomy keywords if asked; returns (invalid, batch, keywords)"""
+    batch, invalid = _decode_batch(items, decoder, now)
+    keywords = None
+    if with_keywords:
+        classifier = get_topic_classifier()
+        keywords = [classifier.keywords(row.content) for row in batch.rows]
+    return invalid, batch, keywords
+
+class TweetSource(ABC):
+    """
+    A source of real tweets that searches can pull from
+
+    Backends only implement records(). The shared pipeline turns records
+    into validated TweetBatches (the compact columnar form in
+    store/columnar.py) and scores and filters them a chunk at a time:
+
+        records -> parse + validate (TweetBatch) -> score (vectorized) -> filter
+
+    Every stage is a generator, so records are read only as fast as the
+    consumer pulls them (backpressure) and memory is bounded by the chunk
+    size, however large the source is. Tweet models are only built for
+    the tweets that are yielded, and search() only builds the page it
+    returns.
+
+    The async paths (asearch, abatches) run the pipeline on a
+    BulkExecutor instead: raw chunks are read in a thread and decoded,
+    validated, scored and filtered in its worker processes, a few chunks
+    in flight at a time, so a scan or an ingest doesn't hold the event
+    loop. Backends whose records need parsing set `record_decoder` and
+    yield the undecoded items from raw_records(), so the parsing happens
+    in the workers too.
+    """
+
+    name = "source"
+
+    # Turns a chunk of raw_records() items into records (None: they already are records)
+    record_decoder: Optional[RecordDecoder] = None
+
+    def __init__(self, chunk_size: int = TWEET_SOURCE_CHUNK_SIZE):
+        self.chunk_size = max(1, chunk_size)
+
+        # Pipeline counters, summed over every scan
+        self.records_read = 0
+        self.invalid = 0
+        self.filtered = 0
+        self.emitted = 0
+
+    @abstractmethod
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Yield raw tweet records (dicts), oldest first"""
+
+    def raw_records(self) -> Iterator[Any]:
+        """Yield the records as cheaply as possible, for record_decoder to finish in a worker"""
+        return self.records()
+
+    def batches(self, now: Optional[float] = None) -> Iterator[TweetBatch]:
+        """Yield every valid tweet in the source as TweetBatches of up to chunk_size tweets"""
+        now = time.time() if now is None else now
+        for chunk in _chunked(self.records(), self.chunk_size):
+            self.records_read += len(chunk)
+            batch = TweetBatch.from_dicts(_tweet_data(chunk), now)
+            self.invalid += len(chunk) - len(batch)
+            yield batch
+
+    def tweets(self) -> Iterator[Tweet]:
+        """Yield every valid tweet in the source, unscored"""
+        for batch in self.batches():
+            for i in range(len(batch)):
+                yield batch.tweet(i)
+
+    def stream(self, criteria: Optional[TweetFilterRequest] = None, now: Optional[float] = None) -> Iterator[Tweet]:
+        """
+        Yield scored tweets matching the filter criteria
+
+        viral_potential is recomputed for every tweet that is yielded.
+        max_results is not applied here; see search().
+        """
+        now = time.time() if now is None else now
+        for batch in self.batches(now):
+            indices, percents = self._score_and_filter(batch, criteria, now)
+            for i in indices.tolist():
+                yield batch.tweet(i, int(percents[i]))
+
+    def search(self, criteria: Optional[TweetFilterRequest] = None, limit: Optional[int] = None) -> List[Tweet]:
+        """Return the top tweets by viral potential matching the criteria (memory bounded by limit)"""
+        if limit is None:
+            limit = criteria.max_results if criteria is not None and criteria.max_results else 5
+        now = time.time()
+        best = heapq.nlargest(limit, self._candidates(criteria, now), key=lambda candidate: candidate[0])
+        return [batch.tweet(i, percent) for percent, batch, i in best]
+
+    async def asearch(
+        self, criteria: Optional[TweetFilterRequest] = None, limit: Optional[int] = None, executor: Optional["BulkExecutor"] = None
+    ) -> List[Tweet]:
+        """
+        search() off the event loop
+
+        With a BulkExecutor, each chunk is scored and filtered in a worker
+        process, which sends back only its own top matches; without one,
+        search() runs in a thread.
+        """
+        if executor is None:
+            return await asyncio.to_thread(self.search, criteria, limit)
+        if limit is None:
+            limit = criteria.max_results if criteria is not None and criteria.max_results else 5
+        now = time.time()
+        best: List[Candidate] = []
+        filters = SearchFilters.from_request(criteria)
+        async for invalid, filtered, matched, candidates in self._process_chunks(executor, search_chunk, filters, now, limit):
+            self.invalid += invalid
+            self.filtered += filtered
+            self.emitted += matched
+            best = heapq.nlargest(limit, best + candidates, key=itemgetter(0))
+        return [build_tweet(row, author, metrics, is_reply, percent) for percent, row, author, metrics, is_reply in best]
+
+    async def abatches(
+        self, executor: "BulkExecutor", now: Optional[float] = None, with_keywords: bool = False
+    ) -> AsyncIterator[Tuple[TweetBatch, Optional[List[Set[str]]]]]:
+        """
+        Yield every valid tweet in the source as (TweetBatch, keywords), built in the executor's workers
+
+        With with_keywords, keywords holds each tweet's taxonomy keywords
+        (TopicClassifier.keywords on the shared classifier), which is what
+        TweetStore.add_batch spends most of its time on.
+        """
+        now = time.time() if now is None else now
+        async for invalid, batch, keywords in self._process_chunks(executor, batch_chunk, now, with_keywords):
+            self.invalid += invalid
+            yield batch, keywords
+
+    async def _process_chunks(self, executor: "BulkExecutor", stage: Callable[..., Any], *args: Any) -> AsyncIterator[Any]:
+        """Yield stage(chunk, record_decoder, *args) for each raw chunk, in order, run on the executor"""
+        chunks = _chunked(self.raw_records(), self.chunk_size)
+        # Enough chunks in flight to keep every worker busy while the next one is read
+        window = max(1, executor.workers) + 1
+        pending: Deque[asyncio.Future] = deque()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                self.records_read += len(chunk)
+                pending.append(asyncio.ensure_future(executor.run(stage, chunk, self.record_decoder, *args)))
+                if len(pending) >= window:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _candidates(self, criteria: Optional[TweetFilterRequest], now: float) -> Iterator[Tuple[int, TweetBatch, int]]:
+        """(viral_potential, batch, index) for every matching tweet, without building models"""
+        for batch in self.batches(now):
+            indices, percents = self._score_and_filter(batch, criteria, now)
+            for i in indices.tolist():
+                yield int(percents[i]), batch, i
+
+    def _score_and_filter(
+        self, batch: TweetBatch, criteria: Optional[TweetFilterRequest], now: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """score_and_filter(), counted in the pipeline counters"""
+        indices, percents = score_and_filter(batch, SearchFilters.from_request(criteria), now)
+        self.filtered += len(batch) - len(indices)
+        self.emitted += len(indices)
+        return indices, percents
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pipeline counters"""
+        return {
+            "source": self.name,
+            "records_read": self.records_read,
+            "invalid": self.invalid,
+            "filtered": self.filtered,
+            "emitted": self.emitted,
+        }
@@ -0,0 +1,53 @@
+import re
+
+from aapp.models import TweetFilterRequest
+
+# Quoted phrases or bare terms
+_TERM_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+# Boolean operators and grouping carry no filter of their own
+_OPERATORS = {"or", "and"}
+
+def parse_search_query(query: str, max_results: int = 5) -> TweetFilterRequest:
+    """
+    Parse a Twitter-style search query into filter criteria
+
+    Understands the syntax _build_search_query emits and the agent tends to
+    use: `min_faves:N` (and `min_retweets:`/`min_replies:`, treated as a
+    minimum engagement), `is:verified`, `-is:reply`, `is:popular`, and
+    topic terms or quoted phrases, optionally grouped with OR.
+    """
+    topics = []
+    min_engagement = 0
+    only_verified = False
+    exclude_replies = False
+
+    for match in _TERM_RE.finditer(query or ""):
+        phrase, term = match.groups()
+        if phrase:
+            topics.append(phrase)
+            continue
+
+        term = term.strip("()")
+        lowered = term.lower()
+        if not term or lowered in _OPERATORS or lowered == "is:popular":
+            continue
+        if lowered == "is:verified":
+            only_verified = True
+        elif lowered == "-is:reply":
+            exclude_replies = True
+        elif lowered.startswith(("min_faves:", "min_retweets:", "min_replies:")):
+            value = lowered.split(":", 1)[1]
+            if value.isdigit():
+                min_engagement = max(min_engagement, int(value))
+        elif ":" not in term and not term.startswith("-"):
+            topics.append(term.lstrip("#"))
+
+    return TweetFilterRequest(
+        min_engagement=min_engagement,
+        topics=topics,
+        exclude_replies=exclude_replies,
+        only_verified=only_verified,
+        min_viral_potential=0,
+        max_results=max_results,
+    )
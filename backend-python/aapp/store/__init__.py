@@ -0,0 +1,24 @@
+# Tweet storage: the in-memory indexed store and the SQLite history
+
+# Exports are resolved on first access, so the history routes can use
+# store.history without importing numpy for the columnar tweet store
+import importlib
+
+_exports = {
+    "AuthorTable": ".columnar",
+    "TweetBatch": ".columnar",
+    "TweetRow": ".columnar",
+    "TweetStore": ".memory",
+    "HistoryStore": ".history",
+    "get_history_store": ".history",
+    "close_history_store": ".history",
+}
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+__all__ = ["AuthorTable", "TweetBatch", "TweetRow", "TweetStore", "HistoryStore", "get_history_store", "close_history_store"]
@@ -0,0 +1,223 @@
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from aapp.models import Tweet
+from aapp.utils.scoring import normalize_timestamps
+from aapp.utils.validation import tweet_fields_valid
+
+# (name, handle, avatar, is_verified)
+AuthorKey = Tuple[str, str, str, bool]
+
+class AuthorTable:
+    """
+    Interned tweet authors
+
+    Each distinct author is stored once and referred to by an integer id,
+    and its name, handle and avatar strings are interned, so a million
+    tweets from a few thousand accounts hold a few thousand author records
+    instead of a million.
+    """
+
+    __slots__ = ("_ids", "_authors")
+
+    def __init__(self):
+        self._ids: Dict[AuthorKey, int] = {}
+        self._authors: List[AuthorKey] = []
+
+    def __len__(self) -> int:
+        return len(self._authors)
+
+    def intern(self, name: str, handle: str, avatar: str, is_verified: bool) -> int:
+        """Return the id of an author, adding it if it's new"""
+        key = (name, handle, avatar, is_verified)
+        author_id = self._ids.get(key)
+        if author_id is None:
+            author_id = len(self._authors)
+            key = (sys.intern(name), sys.intern(handle), sys.intern(avatar), is_verified)
+            self._ids[key] = author_id
+            self._authors.append(key)
+        return author_id
+
+    def get(self, author_id: int) -> AuthorKey:
+        return self._authors[author_id]
+
+class TweetRow:
+    """The per-tweet strings; everything numeric lives in columns"""
+
+    __slots__ = ("id", "content", "timestamp")
+
+    def __init__(self, id: str, content: str, timestamp: str):
+        self.id = id
+        self.content = content
+        self.timestamp = timestamp
+
+ParsedTweet = Tuple[str, str, str, AuthorKey, Tuple[int, int, int, int], bool]
+
+def _is_flag(value: Any) -> bool:
+    return value is True or value is False or value is None
+
+def _plain_fields(data: Dict[str, Any]) -> Optional[ParsedTweet]:
+    """
+    The fields of a dict Tweet.model_validate is certain to accept as is
+    (plain strings, ints and bools, viral_potential in range), or None
+    """
+    author, metrics = data.get("author"), data.get("metrics")
+    if type(author) is not dict or type(metrics) is not dict:
+        return None
+    tweet_id, content, timestamp = data.get("id"), data.get("content"), data.get("timestamp")
+    name, handle, avatar = author.get("name"), author.get("handle"), author.get("avatar")
+    if not (type(tweet_id) is type(content) is type(timestamp) is type(name) is type(handle) is type(avatar) is str):
+        return None
+    counts = (metrics.get("likes", 0), metrics.get("replies", 0), metrics.get("retweets", 0), metrics.get("views", 0))
+    if not all(type(count) is int for count in counts):
+        return None
+    verified, reply = author.get("is_verified", False), data.get("is_reply", False)
+    viral_potential = data.get("viral_potential", 0)
+    if not (_is_flag(verified) and _is_flag(reply) and type(viral_potential) is int and 0 <= viral_potential <= 100):
+        return None
+    return tweet_id, content, timestamp, (name, handle, avatar, bool(verified)), counts, bool(reply)
+
+def _parse(data: Dict[str, Any]) -> ParsedTweet:
+    """
+    Check one dict in the Tweet shape like Tweet.model_validate plus
+    validate_tweet, building the model only for unusual input
+
+    Plain records are read directly; anything else (numeric strings,
+    "false", bytes, a missing field...) goes through the model itself, so
+    the two paths can't disagree on what is valid. The required-field
+    check is validate_tweet's own.
+    """
+    fields = _plain_fields(data)
+    if fields is None:
+        tweet = Tweet.model_validate(data)
+        author, metrics = tweet.author, tweet.metrics
+        fields = (
+            tweet.id,
+            tweet.content,
+            tweet.timestamp,
+            (author.name, author.handle, author.avatar, bool(author.is_verified)),
+            (metrics.likes, metrics.replies, metrics.retweets, metrics.views),
+            bool(tweet.is_reply),
+        )
+    tweet_id, content, _, (name, handle, _, _), _, _ = fields
+    if not tweet_fields_valid(tweet_id, content, name, handle):
+        raise ValueError("missing a required field")
+    return fields
+
+class TweetBatch:
+    """
+    A chunk of tweets in columnar form
+
+    Rows carry the id, text and timestamp; authors are interned in an
+    AuthorTable; metrics, flags and the parsed creation time are numpy
+    columns. Scoring and filtering work on the columns directly, and a
+    Pydantic Tweet is only built (with tweet()) for the tweets a caller
+    actually returns.
+    """
+
+    __slots__ = (
+        "rows", "authors", "author_ids", "likes", "replies", "retweets", "views",
+        "verified", "is_reply", "created_at",
+    )
+
+    def __init__(
+        self,
+        rows: List[TweetRow],
+        authors: AuthorTable,
+        author_ids: Sequence[int],
+        metrics: Sequence[Tuple[int, int, int, int]],
+        is_reply: Sequence[bool],
+        created_at: np.ndarray,
+    ):
+        count = len(rows)
+        self.rows = rows
+        self.authors = authors
+        self.author_ids = np.fromiter(author_ids, dtype=np.int32, count=count)
+        columns = np.array(metrics, dtype=np.int64).reshape(count, 4)
+        self.likes, self.replies, self.retweets, self.views = (columns[:, i].copy() for i in range(4))
+        self.verified = np.fromiter((authors.get(a)[3] for a in self.author_ids.tolist()), dtype=bool, count=count)
+        self.is_reply = np.fromiter(is_reply, dtype=bool, count=count)
+        self.created_at = created_at
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_dicts(cls, items: Iterable[Dict[str, Any]], now: Optional[float] = None) -> "TweetBatch":
+        """
+        Build a batch from dicts in the Tweet shape, skipping invalid ones
+
+        Applies Tweet.model_validate's and validate_tweet's checks (see
+        _parse), so the batch holds exactly the tweets the model path would
+        accept.
+        """
+        authors = AuthorTable()
+        rows, author_ids, metrics, is_reply = [], [], [], []
+        for data in items:
+            try:
+                tweet_id, content, timestamp, author, counts, reply = _parse(data)
+            except (KeyError, AttributeError, TypeError, ValueError):
+                continue
+            rows.append(TweetRow(tweet_id, content, timestamp))
+            author_ids.append(authors.intern(*author))
+            metrics.append(counts)
+            is_reply.append(reply)
+        created_at = normalize_timestamps((row.timestamp for row in rows), now)
+        return cls(rows, authors, author_ids, metrics, is_reply, created_at)
+
+    @classmethod
+    def from_tweets(cls, tweets: Iterable[Tweet], now: Optional[float] = None) -> "TweetBatch":
+        """Build a batch from Tweet models"""
+        authors = AuthorTable()
+        rows, author_ids, metrics, is_reply = [], [], [], []
+        for tweet in tweets:
+            author, counts = tweet.author, tweet.metrics
+            rows.append(TweetRow(tweet.id, tweet.content, tweet.timestamp))
+            author_ids.append(authors.intern(author.name, author.handle, author.avatar, bool(author.is_verified)))
+            metrics.append((counts.likes, counts.replies, counts.retweets, counts.views))
+            is_reply.append(bool(tweet.is_reply))
+        created_at = normalize_timestamps((row.timestamp for row in rows), now)
+        return cls(rows, authors, author_ids, metrics, is_reply, created_at)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """The scoring columns, keyed like tweet_columns() (score_viral_potential's arguments)"""
+        return {
+            "likes": self.likes,
+            "replies": self.replies,
+            "retweets": self.retweets,
+            "views": self.views,
+            "created_at": self.created_at,
+            "verified": self.verified,
+        }
+
+    def tweet(self, index: int, viral_potential: int = 0) -> Tweet:
+        """Materialize one tweet as a Tweet model"""
+        row = self.rows[index]
+        return build_tweet(
+            row,
+            self.authors.get(int(self.author_ids[index])),
+            (int(self.likes[index]), int(self.replies[index]), int(self.retweets[index]), int(self.views[index])),
+            bool(self.is_reply[index]),
+            viral_potential,
+        )
+
+def build_tweet(row: TweetRow, author: AuthorKey, metrics: Tuple[int, int, int, int], is_reply: bool, viral_potential: int) -> Tweet:
+    """
+    Assemble a Tweet from stored parts
+
+    Validating plain dicts runs in pydantic-core and is about twice as
+    fast as model_construct for a nested model like Tweet.
+    """
+    name, handle, avatar, is_verified = author
+    likes, replies, retweets, views = metrics
+    return Tweet.model_validate({
+        "id": row.id,
+        "author": {"name": name, "handle": handle, "avatar": avatar, "is_verified": is_verified},
+        "content": row.content,
+        "timestamp": row.timestamp,
+        "metrics": {"likes": likes, "replies": replies, "retweets": retweets, "views": views},
+        "viral_potential": viral_potential,
+        "is_reply": is_reply,
+    })
@@ -0,0 +1,364 @@
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from aapp.config import HISTORY_BATCH_SIZE, HISTORY_DB_PATH, HISTORY_ENABLED, HISTORY_MAX_PENDING
+from aapp.models import Reply, ReplyRecord, Tweet, TweetAuthor, TweetMetrics
+from aapp.utils.logging import logger
+from aapp.utils.timestamps import parse_timestamp
+from aapp.utils.sqlite import connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id TEXT PRIMARY KEY,
+    author_handle TEXT NOT NULL COLLATE NOCASE,
+    author_name TEXT NOT NULL,
+    author_avatar TEXT NOT NULL,
+    author_verified INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    likes INTEGER NOT NULL,
+    replies INTEGER NOT NULL,
+    retweets INTEGER NOT NULL,
+    views INTEGER NOT NULL,
+    viral_potential INTEGER NOT NULL,
+    is_reply INTEGER NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tweets_author ON tweets (author_handle, created_at);
+CREATE INDEX IF NOT EXISTS tweets_created ON tweets (created_at);
+CREATE TABLE IF NOT EXISTS replies (
+    id INTEGER PRIMARY KEY,
+    tweet_id TEXT NOT NULL,
+    tweet_author TEXT NOT NULL COLLATE NOCASE,
+    content TEXT NOT NULL,
+    strengths TEXT NOT NULL,
+    estimated_engagement INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS replies_tweet ON replies (tweet_id);
+CREATE INDEX IF NOT EXISTS replies_author ON replies (tweet_author, created_at);
+CREATE INDEX IF NOT EXISTS replies_created ON replies (created_at);
+"""
+
+# A tweet seen again keeps its row and gets its latest metrics
+_UPSERT_TWEET = """
+INSERT INTO tweets (
+    id, author_handle, author_name, author_avatar, author_verified, content, timestamp, created_at,
+    likes, replies, retweets, views, viral_potential, is_reply, seen_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    likes = excluded.likes, replies = excluded.replies, retweets = excluded.retweets,
+    views = excluded.views, viral_potential = excluded.viral_potential, seen_at = excluded.seen_at
+"""
+
+_INSERT_REPLY = """
+INSERT INTO replies (tweet_id, tweet_author, content, strengths, estimated_engagement, mode, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_TWEET_COLUMNS = (
+    "id, author_handle, author_name, author_avatar, author_verified, content, timestamp, "
+    "likes, replies, retweets, views, viral_potential, is_reply"
+)
+_REPLY_COLUMNS = "tweet_id, tweet_author, content, strengths, estimated_engagement, mode, created_at"
+
+# Queue entries: ("tweets", tweets, seen_at), ("replies", (tweet_id, author, mode, replies), created_at),
+# ("flush", event, None) or ("stop", None, None)
+_Entry = Tuple[str, Any, Any]
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+def _author_params(author: str) -> List[str]:
+    # Handles are stored as given, with or without the @
+    handle = author.lstrip("@")
+    return [handle, "@" + handle]
+
+def _entry_rows(entry: _Entry) -> int:
+    kind, payload, _ = entry
+    if kind == "tweets":
+        return len(payload)
+    if kind == "replies":
+        return len(payload[3])
+    return 0
+
+def _tweet_row(tweet: Tweet, seen_at: float) -> tuple:
+    author, metrics = tweet.author, tweet.metrics
+    # A tweet whose timestamp can't be parsed was posted no later than it was seen
+    created_at = parse_timestamp(tweet.timestamp, seen_at)
+    return (
+        tweet.id, author.handle, author.name, author.avatar, bool(author.is_verified),
+        tweet.content, tweet.timestamp, seen_at if created_at is None else created_at,
+        metrics.likes, metrics.replies, metrics.retweets, metrics.views,
+        tweet.viral_potential, bool(tweet.is_reply), seen_at,
+    )
+
+class HistoryStore:
+    """
+    SQLite history of the tweets and replies the backend has produced
+
+    Tweets are upserted by id and replies appended, in tables indexed by
+    tweet id, author handle and creation time. Writes never happen on
+    the caller's thread: add_tweets and add_replies only queue the
+    objects, and one writer thread drains whatever has queued up into a
+    single transaction of up to `batch_size` rows (group commit), so a
+    burst of requests costs a few large transactions rather than a
+    commit per row. The database runs in WAL mode, so the iterators can
+    read while the writer writes.
+
+    When more than `max_pending` additions are waiting the new ones are
+    dropped and counted, rather than slowing down requests; `flush`
+    waits until everything queued so far is written.
+
+    Args:
+        path: SQLite database file
+        batch_size: Maximum rows per write transaction
+        max_pending: Maximum queued additions before new ones are dropped
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, max_pending: int = 10_000):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._conn = connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._queue: "queue.Queue[_Entry]" = queue.Queue(maxsize=max(1, max_pending))
+        self._closed = False
+
+        self.tweets_written = 0
+        self.replies_written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def add_tweets(self, tweets: Iterable[Tweet]) -> None:
+        """Queue tweets to be stored (or their metrics updated)"""
+        tweets = list(tweets)
+        if tweets:
+            self._put(("tweets", tweets, time.time()), len(tweets))
+
+    def add_replies(self, tweet_id: str, tweet_author: str, replies: Iterable[Reply], mode: str) -> None:
+        """Queue replies generated for a tweet to be stored"""
+        replies = list(replies)
+        if replies:
+            self._put(("replies", (tweet_id, tweet_author, mode, replies), time.time()), len(replies))
+
+    def _put(self, entry: _Entry, rows: int) -> None:
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            if not self.dropped:
+                logger.warning("History writer is behind; dropping new rows until it catches up")
+            self.dropped += rows
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is written; returns False on timeout"""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(("flush", done, None))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Write what is queued, stop the writer and close the database"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(("stop", None, None))
+        self._writer.join()
+        self._conn.close()
+
+    def _write_loop(self) -> None:
+        while True:
+            entries = [self._queue.get()]
+            rows = _entry_rows(entries[0])
+            # Take whatever else is already waiting, up to a batch
+            while rows < self.batch_size and entries[-1][0] not in ("flush", "stop"):
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                entries.append(entry)
+                rows += _entry_rows(entry)
+
+            self._write(entries)
+            for kind, payload, _ in entries:
+                if kind == "flush":
+                    payload.set()
+                elif kind == "stop":
+                    return
+
+    def _write(self, entries: List[_Entry]) -> None:
+        tweet_rows, reply_rows = [], []
+        try:
+            for kind, payload, at in entries:
+                if kind == "tweets":
+                    tweet_rows.extend(_tweet_row(tweet, at) for tweet in payload)
+                elif kind == "replies":
+                    tweet_id, tweet_author, mode, replies = payload
+                    reply_rows.extend(
+                        (tweet_id, tweet_author, reply.content, json.dumps(reply.strengths), reply.estimated_engagement, mode, at)
+                        for reply in replies
+                    )
+            if not tweet_rows and not reply_rows:
+                return
+
+            with self._conn:
+                if tweet_rows:
+                    self._conn.executemany(_UPSERT_TWEET, tweet_rows)
+                if reply_rows:
+                    self._conn.executemany(_INSERT_REPLY, reply_rows)
+        except Exception as e:
+            rows = sum(_entry_rows(entry) for entry in entries)
+            self.errors += rows
+            logger.error("Error writing %d history rows: %s", rows, e)
+            return
+        self.tweets_written += len(tweet_rows)
+        self.replies_written += len(reply_rows)
+        self.batches += 1
+
+    def _select(self, sql: str, params: List[Any], batch_size: int) -> Iterator[tuple]:
+        # Each iterator reads on its own connection, so it never waits for the writer
+        connection = connect(self.path)
+        try:
+            cursor = connection.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            connection.close()
+
+    def iter_tweets(
+        self,
+        author: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Tweet]:
+        """
+        Stream stored tweets in creation-time order, `batch_size` rows at a time
+
+        Args:
+            author: Only this author's tweets (handle, with or without @)
+            since: Only tweets created at or after this epoch time
+            until: Only tweets created before this epoch time
+            batch_size: Rows fetched from SQLite at once
+        """
+        where, params = [], []
+        if author:
+            where.append("author_handle IN (?, ?)")
+            params.extend(_author_params(author))
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        sql = f"SELECT {_TWEET_COLUMNS} FROM tweets"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at"
+
+        for (tweet_id, handle, name, avatar, verified, content, timestamp,
+             likes, replies, retweets, views, viral_potential, is_reply) in self._select(sql, params, batch_size):
+            yield Tweet.model_construct(
+                id=tweet_id,
+                author=TweetAuthor.model_construct(name=name, handle=handle, avatar=avatar, is_verified=bool(verified)),
+                content=content,
+                timestamp=timestamp,
+                metrics=TweetMetrics.model_construct(likes=likes, replies=replies, retweets=retweets, views=views),
+                viral_potential=viral_potential,
+                is_reply=bool(is_reply),
+            )
+
+    def iter_replies(
+        self,
+        tweet_id: Optional[str] = None,
+        author: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[ReplyRecord]:
+        """
+        Stream stored replies in creation-time order, `batch_size` rows at a time
+
+        Args:
+            tweet_id: Only replies to this tweet
+            author: Only replies to this author's tweets
+            since: Only replies generated at or after this epoch time
+            until: Only replies generated before this epoch time
+            batch_size: Rows fetched from SQLite at once
+        """
+        where, params = [], []
+        if tweet_id:
+            where.append("tweet_id = ?")
+            params.append(tweet_id)
+        if author:
+            where.append("tweet_author IN (?, ?)")
+            params.extend(_author_params(author))
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        sql = f"SELECT {_REPLY_COLUMNS} FROM replies"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at, id"
+
+        for reply_tweet_id, tweet_author, content, strengths, engagement, mode, created_at in self._select(sql, params, batch_size):
+            yield ReplyRecord.model_construct(
+                tweet_id=reply_tweet_id,
+                tweet_author=tweet_author,
+                content=content,
+                strengths=json.loads(strengths),
+                estimated_engagement=engagement,
+                mode=mode,
+                created_at=_iso(created_at),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return rows written, batches, queued additions and dropped rows"""
+        return {
+            "tweets_written": self.tweets_written,
+            "replies_written": self.replies_written,
+            "batches": self.batches,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+_history: Optional[HistoryStore] = None
+_history_lock = threading.Lock()
+
+def get_history_store() -> Optional[HistoryStore]:
+    """Return the shared history store, opening it on first use, or None when disabled"""
+    global _history
+    if not HISTORY_ENABLED:
+        return None
+    with _history_lock:
+        if _history is None:
+            _history = HistoryStore(HISTORY_DB_PATH, batch_size=HISTORY_BATCH_SIZE, max_pending=HISTORY_MAX_PENDING)
+    return _history
+
+def close_history_store() -> None:
+    """Write the queued rows and close the shared history store, if it was opened"""
+    global _history
+    with _history_lock:
+        history, _history = _history, None
+    if history is not None:
+        history.close()
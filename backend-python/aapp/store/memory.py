@@ -0,0 +1,417 @@
+import threading
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from aapp.config import TWEET_STORE_MAX_AGE_HOURS, TWEET_STORE_MAX_TWEETS
+from aapp.models import Tweet, TweetFilterRequest, TweetMetrics
+from aapp.store.columnar import AuthorTable, TweetBatch, TweetRow, build_tweet
+from aapp.store.ranking import DecayingRanking
+from aapp.utils.scoring import combine_terms, engagement_term, recency_term
+from aapp.utils.topics import TopicClassifier, get_topic_classifier
+
+# Scoring a candidate directly costs about this fraction of a ranking heap
+# pop. Reading the top K of C candidates (out of N tweets) off the ranking
+# pops about K * N / C entries, so small or very selective candidate sets
+# are cheaper to score directly
+_DIRECT_SCORING_COST = 1 / 50
+
+# Fraction of the capacity evicted at once when the store is full, so
+# ingesting into a full store doesn't pay for an eviction per tweet
+_EVICTION_BATCH = 0.01
+
+# Expired tweets are swept at most this often (seconds)
+_EXPIRY_INTERVAL = 1.0
+
+class TweetStore:
+    """
+    Bounded in-memory store of ingested tweets with secondary indexes
+
+    Each tweet occupies a slot. Its id, text and timestamp are kept in a
+    compact TweetRow, its author is interned in an AuthorTable, and every
+    number and flag lives in a column indexed by slot:
+
+    - verified and reply bitmaps (bool columns)
+    - the topic bitmask from the TopicClassifier, plus a keyword bitset
+      for requests that name a keyword instead of a topic
+    - the four metrics, engagement, creation time and the engagement
+      term of the viral score
+
+    A TweetFilterRequest is answered by intersecting the bitmaps and
+    range predicates over the columns, then ranking the matches by their
+    viral score as of the query time: a small candidate set is scored
+    directly with a partial sort, a large one is read off a
+    DecayingRanking that only rescores tweets near the top. Either way a
+    search never touches the rows it doesn't return, and Tweet models
+    are only built for the returned page, carrying their current
+    viral_potential.
+
+    The store holds at most max_tweets tweets. Tweets older than
+    max_age_hours are dropped (as are tweets whose timestamp can't be
+    parsed, since they could never age out), and when the store is full
+    the oldest tweets are evicted first. Adding a tweet with a known id
+    replaces it.
+    """
+
+    def __init__(
+        self,
+        max_tweets: int = TWEET_STORE_MAX_TWEETS,
+        max_age_hours: float = TWEET_STORE_MAX_AGE_HOURS,
+        classifier: Optional[TopicClassifier] = None,
+    ):
+        self.capacity = max(1, max_tweets)
+        self.max_age_seconds = max_age_hours * 3600.0
+        self.classifier = classifier or get_topic_classifier()
+        self._lock = threading.RLock()
+
+        self._rows: List[Optional[TweetRow]] = [None] * self.capacity
+        self.authors = AuthorTable()
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._size = 0  # High-water mark: slots >= _size have never been used
+
+        self._live = np.zeros(self.capacity, dtype=bool)
+        self._verified = np.zeros(self.capacity, dtype=bool)
+        self._is_reply = np.zeros(self.capacity, dtype=bool)
+        self._topics = np.zeros(self.capacity, dtype=np.int64)
+        self._author = np.zeros(self.capacity, dtype=np.int32)
+        self._likes = np.zeros(self.capacity, dtype=np.int64)
+        self._replies = np.zeros(self.capacity, dtype=np.int64)
+        self._retweets = np.zeros(self.capacity, dtype=np.int64)
+        self._views = np.zeros(self.capacity, dtype=np.int64)
+        self._engagement = np.zeros(self.capacity, dtype=np.int64)
+        self._engagement_term = np.zeros(self.capacity, dtype=np.float64)
+        self._created_at = np.zeros(self.capacity, dtype=np.float64)
+        self.ranking = DecayingRanking()
+
+        # One bit per taxonomy keyword, packed into 64-bit words per slot
+        self._keyword_ids = {keyword: i for i, keyword in enumerate(self.classifier.all_keywords())}
+        self._keywords = np.zeros((self.capacity, max(1, -(-len(self._keyword_ids) // 64))), dtype=np.uint64)
+
+        self._last_expiry = 0.0
+
+        self.added = 0
+        self.updated = 0
+        self.expired = 0
+        self.evicted = 0
+        self.queries = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, tweet_id: str) -> bool:
+        return tweet_id in self._slots
+
+    def get(self, tweet_id: str, now: Optional[float] = None) -> Optional[Tweet]:
+        """Return a stored tweet with its current viral_potential"""
+        with self._lock:
+            slot = self._slots.get(tweet_id)
+            if slot is None:
+                return None
+            return self._tweet(slot, int(round(self.ranking.score(slot, now) * 100)))
+
+    def add(self, tweet: Tweet, now: Optional[float] = None) -> bool:
+        """Add or replace one tweet; returns False if it is too old to keep"""
+        return self.add_many([tweet], now) == 1
+
+    def add_many(self, tweets: Iterable[Tweet], now: Optional[float] = None, chunk_size: int = 1000) -> int:
+        """Add or replace many Tweet models, returning how many were stored"""
+        now = time.time() if now is None else now
+        iterator = iter(tweets)
+        stored = 0
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return stored
+            stored += self.add_batch(TweetBatch.from_tweets(chunk, now), now)
+
+    def add_batches(self, batches: Iterable[TweetBatch], now: Optional[float] = None) -> int:
+        """Add or replace the tweets of many TweetBatches, returning how many were stored"""
+        now = time.time() if now is None else now
+        return sum(self.add_batch(batch, now) for batch in batches)
+
+    def add_batch(self, batch: TweetBatch, now: Optional[float] = None, keywords: Optional[List[Set[str]]] = None) -> int:
+        """
+        Add or replace the tweets of one TweetBatch, returning how many were stored
+
+        Engagement terms and topics are computed outside the lock, so
+        searches keep being answered during a long ingest. Extracting the
+        keywords is most of the cost, so callers that prepare batches in
+        worker processes pass each tweet's `keywords` (from this store's
+        classifier) along with them.
+        """
+        now = time.time() if now is None else now
+        # NaN (unknown) creation times compare False, so those tweets are skipped too
+        fresh = np.flatnonzero(batch.created_at >= now - self.max_age_seconds)
+        if not len(fresh):
+            return 0
+        if len(fresh) > self.capacity:
+            # Only the newest tweets would survive eviction anyway
+            newest = np.argsort(batch.created_at[fresh], kind="stable")[-self.capacity:]
+            fresh = np.sort(fresh[newest])
+
+        terms = engagement_term(batch.likes, batch.replies, batch.retweets, batch.views)[fresh].tolist()
+        if keywords is None:
+            keywords = [self.classifier.keywords(batch.rows[i].content) for i in fresh.tolist()]
+        else:
+            keywords = [keywords[i] for i in fresh.tolist()]
+        columns = [
+            column[fresh].tolist()
+            for column in (batch.likes, batch.replies, batch.retweets, batch.views, batch.is_reply, batch.created_at)
+        ]
+
+        with self._lock:
+            # Each distinct author in the batch is looked up in the store's table once
+            author_map = np.array(
+                [self.authors.intern(*batch.authors.get(a)) for a in range(len(batch.authors))], dtype=np.int32
+            )
+            author_ids = author_map[batch.author_ids[fresh]].tolist()
+
+            # Replacing a known tweet reuses its slot
+            self._make_room(sum(1 for i in fresh.tolist() if batch.rows[i].id not in self._slots))
+            for i, author_id, likes, replies, retweets, views, is_reply, created_at, term, tweet_keywords in zip(
+                fresh.tolist(), author_ids, *columns, terms, keywords
+            ):
+                self._insert(
+                    batch.rows[i], author_id, (likes, replies, retweets, views), is_reply, created_at, term, tweet_keywords, now
+                )
+            self._maybe_compact_authors()
+        return len(fresh)
+
+    def update_metrics(self, tweet_id: str, metrics: TweetMetrics, now: Optional[float] = None) -> bool:
+        """
+        Record new metrics for a stored tweet and reposition it in the ranking
+
+        Costs O(log N); returns False if the tweet isn't stored.
+        """
+        now = time.time() if now is None else now
+        term = float(engagement_term(metrics.likes, metrics.replies, metrics.retweets, metrics.views))
+        with self._lock:
+            slot = self._slots.get(tweet_id)
+            if slot is None:
+                return False
+            self._likes[slot] = metrics.likes
+            self._replies[slot] = metrics.replies
+            self._retweets[slot] = metrics.retweets
+            self._views[slot] = metrics.views
+            self._engagement[slot] = metrics.likes + metrics.replies + metrics.retweets
+            self._engagement_term[slot] = term
+            self.ranking.update(slot, term, float(self._created_at[slot]), bool(self._verified[slot]), now)
+            self.updated += 1
+            return True
+
+    def remove(self, tweet_id: str) -> bool:
+        with self._lock:
+            slot = self._slots.get(tweet_id)
+            if slot is None:
+                return False
+            self._release(slot)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            for slot in list(self._slots.values()):
+                self._release(slot)
+            self.authors = AuthorTable()
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """Drop every tweet older than max_age_hours"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_expiry = now
+            n = self._size
+            slots = np.flatnonzero(self._live[:n] & (self._created_at[:n] < now - self.max_age_seconds))
+            for slot in slots:
+                self._release(int(slot))
+            self.expired += len(slots)
+            return len(slots)
+
+    def query(self, filters: TweetFilterRequest, limit: Optional[int] = None, now: Optional[float] = None) -> List[Tweet]:
+        """
+        Return the top tweets matching a TweetFilterRequest
+
+        Tweets are ranked by their viral score at `now`, which is also
+        what min_viral_potential is checked against. Topics match if any
+        requested topic matches: a taxonomy topic name, one of its
+        keywords, or (slowest) any other term found in the tweet text.
+        """
+        limit = limit or filters.max_results or 5
+        now = time.time() if now is None else now
+
+        with self._lock:
+            self.queries += 1
+            if now - self._last_expiry >= _EXPIRY_INTERVAL:
+                self.evict_expired(now)
+
+            n = self._size
+            mask = self._live[:n].copy()
+            if filters.only_verified:
+                mask &= self._verified[:n]
+            if filters.exclude_replies:
+                mask &= ~self._is_reply[:n]
+            if filters.min_engagement:
+                mask &= self._engagement[:n] >= filters.min_engagement
+            # viral_potential is the score rounded to a percentage
+            min_potential = filters.min_viral_potential or 0
+            min_score = (min_potential - 0.5) / 100
+            if filters.topics:
+                bits, keywords, other = self.classifier.resolve(filters.topics)
+                indexed = self._indexed_topic_matches(bits, keywords, n)
+                # Terms outside the taxonomy can only be matched against the text,
+                # so walk the ranking best first and stop at `limit` matches
+                if other:
+                    text_query = self.classifier.query(other)
+                    accept = lambda slot: mask[slot] and (indexed[slot] or text_query.mask(self._rows[slot].content))
+                    return self._materialize(self.ranking.top(limit, now, accept, min_score), min_potential)
+                mask &= indexed
+
+            slots = np.flatnonzero(mask)
+            if len(slots) * _DIRECT_SCORING_COST <= limit * n / max(len(slots), 1):
+                ranked = self._score_directly(slots, limit, now, min_score)
+            else:
+                ranked = self.ranking.top(limit, now, mask.__getitem__, min_score)
+            return self._materialize(ranked, min_potential)
+
+    def _indexed_topic_matches(self, bits: int, keywords: Set[str], n: int) -> np.ndarray:
+        """Slots whose topics include `bits` or whose text contains one of `keywords`"""
+        matches = np.zeros(n, dtype=bool)
+        if bits:
+            matches |= (self._topics[:n] & bits) != 0
+        for keyword in keywords:
+            word, bit = divmod(self._keyword_ids[keyword], 64)
+            matches |= (self._keywords[:n, word] & np.uint64(1 << bit)) != 0
+        return matches
+
+    def _score_directly(self, slots: np.ndarray, limit: int, now: float, min_score: float) -> List[Tuple[int, float]]:
+        """Score a small candidate set at `now` and select the top `limit`, best first"""
+        scores = combine_terms(
+            self._engagement_term[slots],
+            recency_term(self._created_at[slots], now),
+            self._verified[slots],
+        )
+        keep = scores >= min_score
+        slots, scores = slots[keep], scores[keep]
+        if len(slots) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            slots, scores = slots[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return list(zip(slots[order].tolist(), scores[order].tolist()))
+
+    def _materialize(self, ranked: List[Tuple[int, float]], min_potential: int) -> List[Tweet]:
+        """The Tweets for ranked (slot, score) pairs, with viral_potential brought up to date"""
+        tweets = []
+        for slot, score in ranked:
+            potential = int(round(score * 100))
+            if potential < min_potential:
+                continue
+            tweets.append(self._tweet(slot, potential))
+        return tweets
+
+    def _tweet(self, slot: int, viral_potential: int) -> Tweet:
+        """Materialize the tweet in a slot as a Tweet model"""
+        return build_tweet(
+            self._rows[slot],
+            self.authors.get(int(self._author[slot])),
+            (int(self._likes[slot]), int(self._replies[slot]), int(self._retweets[slot]), int(self._views[slot])),
+            bool(self._is_reply[slot]),
+            viral_potential,
+        )
+
+    def _insert(
+        self,
+        row: TweetRow,
+        author_id: int,
+        metrics: Tuple[int, int, int, int],
+        is_reply: bool,
+        created_at: float,
+        term: float,
+        keywords: Set[str],
+        now: float,
+    ) -> None:
+        slot = self._slots.get(row.id)
+        if slot is not None:
+            self.updated += 1
+        else:
+            if not self._free and self._size >= self.capacity:
+                self._make_room(1)
+            slot = self._free.pop() if self._free else self._next_slot()
+            self._slots[row.id] = slot
+            self.added += 1
+
+        likes, replies, retweets, views = metrics
+        verified = self.authors.get(author_id)[3]
+
+        self._rows[slot] = row
+        self._live[slot] = True
+        self._verified[slot] = verified
+        self._is_reply[slot] = is_reply
+        self._topics[slot] = self.classifier.keyword_mask(keywords)
+        self._author[slot] = author_id
+        self._likes[slot] = likes
+        self._replies[slot] = replies
+        self._retweets[slot] = retweets
+        self._views[slot] = views
+        self._engagement[slot] = likes + replies + retweets
+        self._engagement_term[slot] = term
+        self._created_at[slot] = created_at
+        self.ranking.update(slot, term, created_at, verified, now)
+
+        keyword_bits = self._keywords[slot]
+        keyword_bits[:] = 0
+        for keyword in keywords:
+            word, bit = divmod(self._keyword_ids[keyword], 64)
+            keyword_bits[word] |= np.uint64(1 << bit)
+
+    def _next_slot(self) -> int:
+        slot = self._size
+        self._size += 1
+        return slot
+
+    def _release(self, slot: int) -> None:
+        del self._slots[self._rows[slot].id]
+        self._rows[slot] = None
+        self._live[slot] = False
+        self.ranking.remove(slot)
+        self._free.append(slot)
+
+    def _make_room(self, needed: int) -> None:
+        """Evict the oldest tweets if fewer than `needed` slots are available"""
+        available = self.capacity - len(self._slots)
+        if available >= needed:
+            return
+
+        count = min(len(self._slots), max(needed - available, int(self.capacity * _EVICTION_BATCH)))
+        if count <= 0:
+            return
+        n = self._size
+        ages = np.where(self._live[:n], self._created_at[:n], np.inf)
+        for slot in np.argpartition(ages, count - 1)[:count]:
+            self._release(int(slot))
+        self.evicted += count
+
+    def _maybe_compact_authors(self) -> None:
+        """Rebuild the author table from live tweets once departed authors dominate it"""
+        if len(self.authors) <= 2 * len(self._slots) + 1024:
+            return
+        live = np.flatnonzero(self._live[:self._size])
+        old_ids, inverse = np.unique(self._author[live], return_inverse=True)
+        authors = AuthorTable()
+        new_ids = [authors.intern(*self.authors.get(author_id)) for author_id in old_ids.tolist()]
+        self._author[live] = np.array(new_ids, dtype=np.int32)[inverse]
+        self.authors = authors
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and activity counters"""
+        return {
+            "tweets": len(self._slots),
+            "capacity": self.capacity,
+            "added": self.added,
+            "updated": self.updated,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "queries": self.queries,
+            "authors": len(self.authors),
+            "ranking": self.ranking.stats(),
+        }
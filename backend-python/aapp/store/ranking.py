@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from aapp.config import TWEET_RANKING_BUCKET_SECONDS
+from aapp.utils.scoring import RECENCY_WEIGHT, RECENCY_WINDOW_HOURS, VERIFIED_MULTIPLIER
+
+# Rebuild the heap once stale entries outnumber live ones by this factor
+_COMPACT_RATIO = 2
+
+def decayed_score(engagement: float, created_at: float, verified: bool, now: float) -> float:
+    """Scalar form of score_viral_potential from its precomputed engagement term"""
+    recency = max(0.0, 1.0 - (now - created_at) / (RECENCY_WINDOW_HOURS * 3600.0)) * RECENCY_WEIGHT
+    score = (engagement + recency) * (VERIFIED_MULTIPLIER if verified else 1.0)
+    return min(1.0, score)
+
+class DecayingRanking:
+    """
+    Viral ranking that stays current as scores decay, without rescoring everything
+
+    With fixed metrics a tweet's score only ever goes down (its recency
+    term decays linearly), so a score computed earlier is an upper bound
+    on the score now. The ranking keeps one max-heap of scores, each
+    stamped with the time bucket it was computed in, and answers top-K
+    lazily: the best entry is popped, and if it was scored in an older
+    bucket it is rescored and pushed back; once the best entry is from
+    the current bucket it is truly the best. Only the entries competing
+    for the top K are ever rescored.
+
+    Scores are exact to within the decay of one bucket
+    (bucket_seconds / 72h * 0.36 at most). Updating a tweet's metrics
+    pushes a new entry in O(log N); the old one is skipped when reached.
+    """
+
+    def __init__(self, bucket_seconds: float = TWEET_RANKING_BUCKET_SECONDS):
+        self.bucket_seconds = max(bucket_seconds, 1e-6)
+        self._lock = threading.RLock()
+        self._versions = itertools.count()
+
+        # key -> (version, engagement term, created_at, verified)
+        self._entries: Dict[Hashable, Tuple[int, float, float, bool]] = {}
+        # (-score, version, bucket, key); versions are unique, so keys are never compared
+        self._heap: List[Tuple[float, int, int, Hashable]] = []
+
+        self.rescored = 0
+        self.stale_skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def _bucket(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def update(self, key: Hashable, engagement: float, created_at: float, verified: bool, now: Optional[float] = None) -> None:
+        """Add a tweet or reposition it after its metrics changed (O(log N))"""
+        now = time.time() if now is None else now
+        with self._lock:
+            version = next(self._versions)
+            self._entries[key] = (version, engagement, created_at, verified)
+            score = decayed_score(engagement, created_at, verified, now)
+            heapq.heappush(self._heap, (-score, version, self._bucket(now), key))
+            self._maybe_compact(now)
+
+    def remove(self, key: Hashable) -> None:
+        """Forget a tweet; its heap entry is dropped when it surfaces"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def score(self, key: Hashable, now: Optional[float] = None) -> Optional[float]:
+        """Return a tweet's current score"""
+        now = time.time() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        _, engagement, created_at, verified = entry
+        return decayed_score(engagement, created_at, verified, now)
+
+    def top(
+        self,
+        k: int,
+        now: Optional[float] = None,
+        accept: Optional[Callable[[Hashable], Any]] = None,
+        min_score: float = 0.0,
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Return the k best (key, current score) pairs, best first
+
+        Args:
+            k: Number of results
+            now: Reference time (defaults to time.time())
+            accept: Optional filter on keys; rejected keys are skipped
+            min_score: Stop once scores fall below this
+        """
+        now = time.time() if now is None else now
+        bucket = self._bucket(now)
+        found: List[Tuple[Hashable, float]] = []
+        popped = []
+
+        with self._lock:
+            heap = self._heap
+            while heap and len(found) < k:
+                neg_score, version, item_bucket, key = heap[0]
+                entry = self._entries.get(key)
+                if entry is None or entry[0] != version:
+                    heapq.heappop(heap)
+                    self.stale_skipped += 1
+                    continue
+
+                # Scored in an earlier bucket: its score is only an upper bound, refresh it
+                if item_bucket != bucket:
+                    _, engagement, created_at, verified = entry
+                    score = decayed_score(engagement, created_at, verified, now)
+                    heapq.heapreplace(heap, (-score, version, bucket, key))
+                    self.rescored += 1
+                    continue
+
+                if -neg_score < min_score:
+                    break
+
+                popped.append(heapq.heappop(heap))
+                if accept is None or accept(key):
+                    found.append((key, self.score(key, now)))
+
+            # Everything popped stays ranked
+            for item in popped:
+                heapq.heappush(heap, item)
+
+        return found
+
+    def _maybe_compact(self, now: float) -> None:
+        """Rebuild the heap from live entries when stale ones pile up"""
+        if len(self._heap) <= _COMPACT_RATIO * len(self._entries) + 1024:
+            return
+        bucket = self._bucket(now)
+        self._heap = [
+            (-decayed_score(engagement, created_at, verified, now), version, bucket, key)
+            for key, (version, engagement, created_at, verified) in self._entries.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "heap_size": len(self._heap),
+            "rescored": self.rescored,
+            "stale_skipped": self.stale_skipped,
+        }
@@ -1,8 +1,6 @@
 import os
 from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
+import aapp.config  # loads .env
 
 client = OpenAI(
     base_url="https://api.aimlapi.com/v1",
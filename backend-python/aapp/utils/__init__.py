@@ -1,7 +1,25 @@
 # Utility functions and helpers module for Reply Guy API
 
-from .tweet_utils import calculate_viral_potential
-from .openai_utils import generate_completion, generate_structured_output
-from .validation import validate_tweet, validate_tweets, validate_reply, validate_replies
+# Exports are resolved on first access: openai_utils imports the OpenAI
+# client, which modules that only need, say, validation should not pay for
+import importlib
 
-__all__ = ["calculate_viral_potential", "generate_completion", "generate_structured_output", "validate_tweet", "validate_tweets", "validate_reply", "validate_replies"]
\ No newline at end of file
+_exports = {
+    "calculate_viral_potential": ".tweet_utils",
+    "generate_completion": ".openai_utils",
+    "generate_structured_output": ".openai_utils",
+    "validate_tweet": ".validation",
+    "validate_tweets": ".validation",
+    "validate_reply": ".validation",
+    "validate_replies": ".validation",
+    "evaluate_reply": ".reply_utils",
+}
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+__all__ = ["calculate_viral_potential", "generate_completion", "generate_structured_output", "validate_tweet", "validate_tweets", "validate_reply", "validate_replies", "evaluate_reply"]
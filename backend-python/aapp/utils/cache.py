@@ -0,0 +1,277 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from aapp.utils.logging import logger
+from aapp.utils.scheduler import Priority, llm_priority
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so trivially different inputs share a cache key"""
+    return " ".join((text or "").split())
+
+class TTLCache:
+    """
+    Bounded in-memory cache with LRU eviction and a per-entry TTL
+
+    Entries expire `ttl_seconds` after they are written. When the cache is
+    full the least recently used entry is evicted. Expiry times are wall
+    clock timestamps so a snapshot written by one process is still valid
+    when loaded by the next one.
+
+    Args:
+        max_entries: Maximum number of entries kept in memory
+        ttl_seconds: Default time to live for each entry
+        snapshot_path: Optional JSON file used by save_snapshot/load_snapshot
+        encode: Converts a value to JSON-serializable data for snapshots
+        decode: Converts snapshot data back to a value
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        snapshot_path: Optional[str] = None,
+        encode: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = snapshot_path or None
+        self._encode = encode or (lambda value: value)
+        self._decode = decode or (lambda data: data)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full"""
+        expires_at = time.time() + (self.ttl_seconds if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save_snapshot(self, path: Optional[str] = None) -> int:
+        """
+        Write all live entries to a JSON file
+
+        Keys must be strings or tuples of JSON-serializable values.
+        The file is replaced atomically.
+
+        Returns:
+            The number of entries written
+        """
+        path = path or self.snapshot_path
+        if not path:
+            return 0
+
+        now = time.time()
+        with self._lock:
+            items = [
+                {"key": list(key) if isinstance(key, tuple) else key, "expires_at": expires_at, "value": self._encode(value)}
+                for key, (expires_at, value) in self._entries.items()
+                if expires_at > now
+            ]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "entries": items}, f)
+        os.replace(tmp_path, path)
+
+        return len(items)
+
+    def load_snapshot(self, path: Optional[str] = None) -> int:
+        """
+        Load entries from a JSON snapshot, skipping any that have expired
+
+        Returns:
+            The number of entries loaded
+        """
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return 0
+
+        with open(path) as f:
+            data = json.load(f)
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            # Entries are stored oldest first, so replaying keeps LRU order
+            for item in data.get("entries", []):
+                if item["expires_at"] <= now:
+                    continue
+                key = tuple(item["key"]) if isinstance(item["key"], list) else item["key"]
+                self._entries[key] = (item["expires_at"], self._decode(item["value"]))
+                self._entries.move_to_end(key)
+                loaded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return loaded
+
+class StaleWhileRevalidateCache:
+    """
+    Result cache that serves stale entries while refreshing them in the background
+
+    An entry is fresh for `fresh_seconds` after it was loaded and served
+    directly. For the following `stale_seconds` it is still served
+    immediately, but the first request to see it stale starts a single
+    background task that reloads it (at prefetch priority with the LLM
+    scheduler). After that it is treated as missing.
+
+    Args:
+        max_entries: Maximum number of entries kept in memory
+        fresh_seconds: How long a loaded value is served without refreshing
+        stale_seconds: How long a stale value may be served while refreshing
+        should_cache: Predicate deciding whether a loaded value is stored
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        fresh_seconds: float = 300.0,
+        stale_seconds: float = 1800.0,
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self._should_cache = should_cache or (lambda value: True)
+        self._entries = TTLCache(max_entries=max_entries, ttl_seconds=fresh_seconds + stale_seconds)
+        self._refreshing: Dict[Hashable, "asyncio.Task"] = {}
+
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the value for key, loading it with loader on a miss
+
+        Args:
+            key: Cache key
+            loader: Zero-argument coroutine function producing the value
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            loaded_at, value = entry
+            if time.time() - loaded_at < self.fresh_seconds:
+                self.fresh_hits += 1
+            else:
+                self.stale_hits += 1
+                self._schedule_refresh(key, loader)
+            return value
+
+        self.misses += 1
+        value = await loader()
+        self._store(key, value)
+        return value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if self._should_cache(value):
+            self._entries.set(key, (time.time(), value))
+
+    def _schedule_refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        # One background refresh per key at a time
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                # Refreshing ahead of need is prefetch work: its LLM calls wait for interactive ones
+                with llm_priority(Priority.PREFETCH):
+                    value = await loader()
+                self._store(key, value)
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.error("Error refreshing cache entry: %s", e)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.get_running_loop().create_task(refresh())
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count and fresh/stale hit counters"""
+        lookups = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._entries.max_entries,
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "refreshing": len(self._refreshing),
+            "hit_rate": (self.fresh_hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
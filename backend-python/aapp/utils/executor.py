@@ -0,0 +1,210 @@
+import asyncio
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from aapp.config import CPU_CHUNK_SIZE, CPU_INLINE_THRESHOLD, CPU_WORKERS
+from aapp.models import Reply, Tweet
+from aapp.utils.logging import logger
+from aapp.utils.reply_utils import evaluate_replies
+from aapp.utils.sentiment import get_sentiment_lexicon, to_scores
+from aapp.utils.tweet_utils import extract_hashtags, extract_mentions
+from aapp.utils.validation import reply_fields_valid, tweet_fields_valid
+
+T = TypeVar("T")
+
+# Chunk functions run in the worker processes, so they are module-level (picklable)
+# and their items and results are plain strings, numbers and arrays, never Pydantic
+# models: pickling a model costs about 80x as much as pickling its text
+
+def _evaluate_chunk(replies: List[str], original_tweet: str) -> List[Dict[str, Any]]:
+    return evaluate_replies(replies, original_tweet)
+
+def _sentiment_chunk(texts: List[str]) -> List[Tuple[float, float, int]]:
+    lexicon = get_sentiment_lexicon()
+    return [lexicon.weights(text) for text in texts]
+
+def _hashtags_chunk(texts: List[str]) -> List[List[str]]:
+    return [extract_hashtags(text) for text in texts]
+
+def _mentions_chunk(texts: List[str]) -> List[List[str]]:
+    return [extract_mentions(text) for text in texts]
+
+def _tweet_fields_chunk(fields: List[Tuple[str, str, str, str]]) -> List[bool]:
+    return [tweet_fields_valid(*tweet) for tweet in fields]
+
+def _reply_fields_chunk(fields: List[Tuple[str, int]]) -> List[bool]:
+    return [reply_fields_valid(*reply) for reply in fields]
+
+def _run_chunk(func: Callable[..., Sequence[Any]], items: List[Any], args: tuple) -> Sequence[Any]:
+    return func(items, *args)
+
+class BulkExecutor:
+    """
+    Runs CPU-bound bulk work off the event loop: the tweet source pipeline and per-text utilities
+
+    This work is pure Python and holds the GIL, so tens of thousands of
+    items worked through inline, or in a thread, stall every other
+    request for as long as they take. It runs on a pool of `workers`
+    processes (started with spawn, on first use) in two ways:
+
+    - map() splits a list of items into chunks; calls with fewer than
+      `inline_threshold` items run inline, where the round trip to a
+      process would cost more than the work (lexicon sentiment, reply
+      evaluation, hashtag and mention extraction, tweet and reply
+      validation)
+    - run() takes one task its caller already cut to size, such as a
+      chunk of raw records for the tweet source pipeline (sources/base.py)
+      to decode, validate, score and filter, or to prepare for the store
+
+    Only plain data crosses the process boundary: texts, model fields and
+    raw records go in; scores, evaluations, flags, TweetBatches and
+    matches come back. If the pool breaks (a worker died), the call is
+    logged and run inline (run() in a thread), and a new pool is started
+    for the next one.
+
+    Args:
+        workers: Worker processes (0 runs everything inline)
+        chunk_size: Most items sent to a worker in one task
+        inline_threshold: Calls with fewer items than this run inline
+    """
+
+    def __init__(self, workers: int = CPU_WORKERS, chunk_size: int = CPU_CHUNK_SIZE, inline_threshold: int = CPU_INLINE_THRESHOLD):
+        self.workers = max(0, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.inline_threshold = inline_threshold
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.inline_calls = 0
+        self.pool_calls = 0
+        self.chunks = 0
+        self.items = 0
+        self.failures = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _chunks(self, count: int) -> List[slice]:
+        # At least one chunk per worker, so a call uses the whole pool
+        size = min(self.chunk_size, math.ceil(count / self.workers))
+        return [slice(start, start + size) for start in range(0, count, size)]
+
+    async def map(self, func: Callable[..., Sequence[Any]], items: Sequence[Any], *args: Any) -> List[Any]:
+        """
+        Run a chunk function over items, in worker processes for large inputs
+
+        Args:
+            func: Module-level function taking a list of items (then `args`)
+                and returning one result per item
+            items: The items
+            *args: Extra arguments passed to every chunk
+
+        Returns:
+            The chunk results concatenated, one per item, in order
+        """
+        items = list(items)
+        count = len(items)
+        self.items += count
+        if self.workers == 0 or count < self.inline_threshold:
+            self.inline_calls += 1
+            return list(_run_chunk(func, items, args))
+
+        loop = asyncio.get_running_loop()
+        chunks = self._chunks(count)
+        self.pool_calls += 1
+        self.chunks += len(chunks)
+        try:
+            pool = self._get_pool()
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, _run_chunk, func, items[chunk], args)
+                for chunk in chunks
+            ))
+        except BrokenProcessPool as e:
+            logger.error("CPU worker pool failed, running %d items inline: %s", count, e)
+            self._reset_pool()
+            return list(_run_chunk(func, items, args))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run one task in a worker process (in a thread when workers is 0)
+
+        For work its caller already splits into chunks big enough to be
+        worth the round trip, so there is no inline threshold; with no
+        pool the task still leaves the event loop, in a thread.
+
+        Args:
+            func: Module-level function taking and returning plain data
+            *args: Its arguments
+        """
+        if self.workers == 0:
+            self.inline_calls += 1
+            return await asyncio.to_thread(func, *args)
+
+        self.pool_calls += 1
+        self.chunks += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_pool(), func, *args)
+        except BrokenProcessPool as e:
+            logger.error("CPU worker pool failed, running %s in a thread: %s", getattr(func, "__name__", func), e)
+            self._reset_pool()
+            return await asyncio.to_thread(func, *args)
+
+    def _reset_pool(self) -> None:
+        self.failures += 1
+        with self._lock:
+            self._pool = None
+
+    async def evaluate_replies(self, replies: Sequence[str], original_tweet: str) -> List[Dict[str, Any]]:
+        """evaluate_replies() for many candidate replies to one tweet"""
+        return await self.map(_evaluate_chunk, replies, original_tweet)
+
+    async def sentiment(self, texts: Sequence[Optional[str]]) -> List[Dict[str, float]]:
+        """Lexicon sentiment scores of each text (as SentimentLexicon.score_many on the shared lexicon)"""
+        return [to_scores(*weights) for weights in await self.map(_sentiment_chunk, [text or "" for text in texts])]
+
+    async def extract_hashtags(self, texts: Sequence[str]) -> List[List[str]]:
+        """extract_hashtags() of each text"""
+        return await self.map(_hashtags_chunk, texts)
+
+    async def extract_mentions(self, texts: Sequence[str]) -> List[List[str]]:
+        """extract_mentions() of each text"""
+        return await self.map(_mentions_chunk, texts)
+
+    async def validate_tweets(self, tweets: Sequence[Tweet]) -> List[Tweet]:
+        """validate_tweets(): only the checked fields are sent to the workers, and the valid models are kept here"""
+        fields = [(tweet.id, tweet.content, tweet.author.name, tweet.author.handle) for tweet in tweets]
+        return [tweet for tweet, valid in zip(tweets, await self.map(_tweet_fields_chunk, fields)) if valid]
+
+    async def validate_replies(self, replies: Sequence[Reply]) -> List[Reply]:
+        """validate_replies(), sending only each reply's content and estimated engagement to the workers"""
+        fields = [(reply.content, reply.estimated_engagement) for reply in replies]
+        return [reply for reply, valid in zip(replies, await self.map(_reply_fields_chunk, fields)) if valid]
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (a later call starts a new pool)"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the pool size and how many calls ran inline or on the pool"""
+        return {
+            "workers": self.workers,
+            "started": self._pool is not None,
+            "chunk_size": self.chunk_size,
+            "inline_threshold": self.inline_threshold,
+            "inline_calls": self.inline_calls,
+            "pool_calls": self.pool_calls,
+            "chunks": self.chunks,
+            "items": self.items,
+            "failures": self.failures,
+        }
@@ -0,0 +1,78 @@
+import json
+from typing import Any, List
+
+class JSONArrayItemParser:
+    """
+    Incrementally extract complete items from a streamed JSON array
+
+    Feed text chunks as they arrive from the model. Every object that is a
+    direct element of the first array in the document is returned as soon
+    as its closing brace has been seen, so a wrapped output such as
+    {"response": [{...}, {...}]} yields each element in turn.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard all buffered text and start a new document"""
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._array_depth = None
+        self._item_start = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Consume a chunk of text
+
+        Args:
+            chunk: The next piece of the JSON document
+
+        Returns:
+            The array items completed by this chunk, parsed as Python objects
+        """
+        self._buffer += chunk
+        items = []
+
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._stack.append(char)
+                if char == "[" and self._array_depth is None:
+                    self._array_depth = len(self._stack)
+                elif (
+                    char == "{"
+                    and self._item_start is None
+                    and self._array_depth is not None
+                    and len(self._stack) == self._array_depth + 1
+                ):
+                    self._item_start = self._pos
+            elif char in "]}":
+                if self._stack:
+                    self._stack.pop()
+                if char == "}" and self._item_start is not None and len(self._stack) == self._array_depth:
+                    try:
+                        items.append(json.loads(self._buffer[self._item_start:self._pos + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    # Drop the consumed text so the buffer stays small
+                    self._buffer = self._buffer[self._pos + 1:]
+                    self._pos = -1
+                    self._item_start = None
+
+            self._pos += 1
+
+        return items
@@ -0,0 +1,91 @@
+from typing import TYPE_CHECKING, Optional
+
+from aapp.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_TIMEOUT,
+    OPENAI_MAX_RETRIES,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_KEEPALIVE_EXPIRY,
+)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Shared client for the whole process, created on first use
+_client: Optional["AsyncOpenAI"] = None
+
+def create_openai_client(
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    max_connections: int = OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections: int = OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = OPENAI_KEEPALIVE_EXPIRY,
+    timeout: float = OPENAI_TIMEOUT,
+) -> "AsyncOpenAI":
+    """
+    Create an async OpenAI client backed by a pooled httpx connection pool
+
+    Args:
+        api_key: API key to use (defaults to OPENAI_API_KEY)
+        base_url: Optional API base URL (defaults to OPENAI_BASE_URL)
+        max_connections: Maximum number of concurrent connections
+        max_keepalive_connections: Maximum number of idle connections kept alive
+        keepalive_expiry: Seconds an idle connection is kept alive
+        timeout: Request timeout in seconds
+
+    Returns:
+        A new AsyncOpenAI client
+    """
+    # Imported here: the SDK is a large import that only processes making LLM calls need
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(timeout),
+    )
+
+    return AsyncOpenAI(
+        api_key=api_key or OPENAI_API_KEY,
+        base_url=base_url or OPENAI_BASE_URL,
+        timeout=timeout,
+        max_retries=OPENAI_MAX_RETRIES,
+        http_client=http_client,
+    )
+
+def get_openai_client() -> "AsyncOpenAI":
+    """Returns the shared async OpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = create_openai_client()
+    return _client
+
+def set_openai_client(client: "AsyncOpenAI") -> None:
+    """
+    Replace the shared client (e.g. to point at a local stand-in)
+
+    The Agents SDK default client is updated as well so agent runs
+    and direct completions keep sharing one connection pool.
+    """
+    global _client
+    _client = client
+    configure_agents_client()
+
+def configure_agents_client() -> None:
+    """Make the Agents SDK use the shared client for every Runner.run"""
+    from agents import set_default_openai_client
+
+    set_default_openai_client(get_openai_client())
+
+async def close_openai_client() -> None:
+    """Close the shared client and release its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -1,24 +1,72 @@
+import json
 import logging
 import sys
-from aapp.config import DEBUG
+from contextvars import ContextVar
+from aapp.config import DEBUG, LOG_FORMAT
+
+# ID of the request being handled (set per request by the middleware in main.py)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request ID to every log record"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+class KeyValueFormatter(logging.Formatter):
+    """Text log lines with the request ID and any `extra` fields as key=value pairs"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = {key: value for key, value in record.__dict__.items() if key not in _RESERVED}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per log line, including the request ID and `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in record.__dict__.items() if key not in _RESERVED})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
 
 def setup_logger():
     """Set up the application logger"""
     logger = logging.getLogger("replyguy")
-    
+
     # Set log level based on DEBUG setting
     log_level = logging.DEBUG if DEBUG else logging.INFO
     logger.setLevel(log_level)
-    
+
     # Create console handler with formatting
     handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    if LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = KeyValueFormatter(
+            "%(asctime)s - %(name)s - %(levelname)s - request_id=%(request_id)s - %(message)s"
+        )
     handler.setFormatter(formatter)
+    handler.addFilter(RequestIdFilter())
     logger.addHandler(handler)
-    
+
+    # Our handler already writes the line; don't repeat it on the root logger
+    logger.propagate = False
+
     return logger
 
 # Create a global logger instance
-logger = setup_logger() 
\ No newline at end of file
+logger = setup_logger()
@@ -0,0 +1,233 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds (LLM calls take seconds, local work microseconds)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Buckets for agent turn counts
+TURN_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10)
+
+LabelValues = Tuple[str, ...]
+
+# A collected sample: (metric name, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    @abstractmethod
+    def samples(self) -> List[Sample]:
+        """The metric's current (name, labels, value) samples"""
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+class Gauge(_Metric):
+    """Value that can go up and down per label set"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+class Histogram(_Metric):
+    """Cumulative bucketed observations per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label set -> (bucket counts, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            if index < len(counts):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+class Registry:
+    """
+    Holds metrics and collectors and renders them in Prometheus text format
+
+    Collectors are callables returning (name, type, help, samples) tuples,
+    for values that already live elsewhere (cache counters, token usage).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], List[Tuple[str, str, str, List[Sample]]]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format (0.0.4)"""
+        families = [(m.name, m.kind, m.documentation, m.samples()) for m in self._metrics.values()]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception:
+                # A broken collector must not take the whole endpoint down
+                continue
+
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry and the hot-path metrics recorded by the app
+registry = Registry()
+
+http_requests_total = registry.counter(
+    "replyguy_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "replyguy_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "replyguy_http_requests_in_flight", "HTTP requests currently being served"
+)
+agent_runs_total = registry.counter(
+    "replyguy_agent_runs_total", "Agent runs by agent and outcome", ("agent", "status")
+)
+agent_run_duration_seconds = registry.histogram(
+    "replyguy_agent_run_duration_seconds", "Agent Runner.run wall time", ("agent",)
+)
+agent_run_turns = registry.histogram(
+    "replyguy_agent_run_turns", "Model turns per agent run", ("agent",), buckets=TURN_BUCKETS
+)
+llm_queue_depth = registry.gauge(
+    "replyguy_llm_queue_depth", "LLM calls waiting in the scheduler by priority", ("priority",)
+)
+llm_queue_wait_seconds = registry.histogram(
+    "replyguy_llm_queue_wait_seconds", "Time LLM calls waited in the scheduler by priority", ("priority",)
+)
+llm_retries_total = registry.counter(
+    "replyguy_llm_retries_total", "LLM calls retried after a 429, 5xx, timeout or connection error", ("reason",)
+)
+llm_rejected_total = registry.counter(
+    "replyguy_llm_rejected_total", "LLM calls refused (queue full, or still rate limited after retries)", ("reason",)
+)
+tool_duration_seconds = registry.histogram(
+    "replyguy_tool_duration_seconds", "Agent tool invocation time", ("tool",),
+    buckets=(0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0),
+)
+
+def tool_timer(tool: str):
+    """Context manager timing one tool invocation"""
+    return tool_duration_seconds.time(tool=tool)
@@ -1,14 +1,38 @@
-from openai import OpenAI
-from typing import Dict, Any, List, Optional, TypeVar, Generic, Type
+from typing import Dict, Any, List, Optional, Sequence, TypeVar, Generic, Type
 from pydantic import BaseModel, create_model
+import asyncio
 import json
-from aapp.config import OPENAI_API_KEY, OPENAI_MODEL
+from aapp.config import (
+    OPENAI_MODEL,
+    REQUEST_TOKEN_BUDGET,
+    SENTIMENT_BATCH_MAX_TOKENS,
+    SENTIMENT_BATCH_MODE,
+    SENTIMENT_BATCH_SIZE,
+    SENTIMENT_TIMEOUT_SECONDS,
+)
+from aapp.utils.llm_client import get_openai_client
+from aapp.utils.logging import logger
+from aapp.utils.scheduler import DEFAULT_COMPLETION_TOKENS, LLMUnavailable, llm_scheduler
+from aapp.utils.sentiment import get_sentiment_lexicon
+from aapp.utils.tokens import TokenBudgetExceeded, count_tokens, enforce_budget, usage_tracker
 
 T = TypeVar('T', bound=BaseModel)
 
-def get_openai_client() -> OpenAI:
-    """Returns an OpenAI client with the API key from config"""
-    return OpenAI(api_key=OPENAI_API_KEY)
+def _check_budget(messages: List[Dict[str, str]], model: str, extra: str = "") -> int:
+    """Reject a call whose prompt would exceed REQUEST_TOKEN_BUDGET before it is made"""
+    tokens = sum(count_tokens(message["content"], model) for message in messages) + count_tokens(extra, model)
+    enforce_budget(tokens, REQUEST_TOKEN_BUDGET, "Completion prompt")
+    return tokens
+
+def _record_usage(response: Any, estimated_tokens: int) -> None:
+    """Record the prompt and completion tokens reported for a call"""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        usage_tracker.record(
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=usage.completion_tokens or 0,
+        )
+        llm_scheduler.settle(estimated_tokens, (usage.prompt_tokens or 0) + (usage.completion_tokens or 0))
 
 async def generate_completion(
     prompt: str, 
@@ -41,17 +65,25 @@ async def generate_completion(
     # Add user prompt
     messages.append({"role": "user", "content": prompt})
     
+    tokens = _check_budget(messages, model) + max_tokens
+    
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens
+        response = await llm_scheduler.run(
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ),
+            tokens=tokens
         )
+        _record_usage(response, tokens)
         
         return response.choices[0].message.content
+    except LLMUnavailable:
+        raise
     except Exception as e:
-        print(f"Error generating completion: {e}")
+        logger.exception("Error generating completion: %s", e)
         return ""
 
 async def generate_structured_output(
@@ -85,12 +117,15 @@ async def generate_structured_output(
     # Add user prompt
     messages.append({"role": "user", "content": prompt})
     
+    tokens = _check_budget(messages, model, json.dumps(output_schema)) + DEFAULT_COMPLETION_TOKENS
+    
     try:
-        response = client.chat.completions.create(
+        response = await llm_scheduler.run(lambda: client.chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
-            response_format={"type": "json_object"},
+            # The forced tool call already makes the arguments JSON matching the schema;
+            # response_format json_object would also require "JSON" in the messages
             tools=[{
                 "type": "function",
                 "function": {
@@ -100,7 +135,8 @@ async def generate_structured_output(
                 }
             }],
             tool_choice={"type": "function", "function": {"name": "generate_structured_output"}}
-        )
+        ), tokens=tokens)
+        _record_usage(response, tokens)
         
         # Get the tool call response
         if response.choices[0].message.tool_calls:
@@ -109,8 +145,10 @@ async def generate_structured_output(
         
         # Fallback to parsing the content directly
         return json.loads(response.choices[0].message.content)
+    except LLMUnavailable:
+        raise
     except Exception as e:
-        print(f"Error generating structured output: {e}")
+        logger.exception("Error generating structured output: %s", e)
         return {}
 
 async def generate_structured_model_output(
@@ -148,43 +186,187 @@ async def generate_structured_model_output(
     # Convert to Pydantic model instance
     return model_class.model_validate(data)
 
+_SENTIMENT_SCORES = {
+    "positive": {
+        "type": "number",
+        "description": "Positive sentiment score from 0 to 1"
+    },
+    "negative": {
+        "type": "number",
+        "description": "Negative sentiment score from 0 to 1"
+    },
+    "neutral": {
+        "type": "number",
+        "description": "Neutral sentiment score from 0 to 1"
+    }
+}
+
+_SENTIMENT_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {
+                        "type": "integer",
+                        "description": "The number of the text in the list"
+                    },
+                    **_SENTIMENT_SCORES
+                },
+                "required": ["index", "positive", "negative", "neutral"]
+            }
+        }
+    },
+    "required": ["results"]
+}
+
+SENTIMENT_SYSTEM_MESSAGE = "You are a sentiment analysis tool. Analyze the sentiment of the text and provide scores."
+
+def _sentiment_scores(result: Any) -> Optional[Dict[str, float]]:
+    """The {positive, negative, neutral} scores of an LLM result, clamped to 0-1, or None if malformed"""
+    try:
+        return {key: min(max(float(result[key]), 0.0), 1.0) for key in ("positive", "negative", "neutral")}
+    except (KeyError, TypeError, ValueError):
+        return None
+
 async def analyze_sentiment(text: str) -> Dict[str, float]:
     """
     Analyze the sentiment of a text using OpenAI
     
+    Falls back to the local lexicon scorer (utils/sentiment.py) when the
+    call fails, returns malformed scores or takes longer than
+    SENTIMENT_TIMEOUT_SECONDS.
+    
     Returns a dictionary with sentiment scores
     """
     sentiment_schema = {
         "type": "object",
-        "properties": {
-            "positive": {
-                "type": "number",
-                "description": "Positive sentiment score from 0 to 1"
-            },
-            "negative": {
-                "type": "number",
-                "description": "Negative sentiment score from 0 to 1"
-            },
-            "neutral": {
-                "type": "number",
-                "description": "Neutral sentiment score from 0 to 1"
-            }
-        },
+        "properties": _SENTIMENT_SCORES,
         "required": ["positive", "negative", "neutral"]
     }
     
-    system_message = "You are a sentiment analysis tool. Analyze the sentiment of the text and provide scores."
     prompt = f"Analyze the sentiment of this text: {text}"
     
     try:
-        result = await generate_structured_output(
-            prompt=prompt,
-            output_schema=sentiment_schema,
-            temperature=0.1,
-            system_message=system_message
+        result = await asyncio.wait_for(
+            generate_structured_output(
+                prompt=prompt,
+                output_schema=sentiment_schema,
+                temperature=0.1,
+                system_message=SENTIMENT_SYSTEM_MESSAGE
+            ),
+            SENTIMENT_TIMEOUT_SECONDS
         )
+    except asyncio.TimeoutError:
+        logger.warning("Sentiment analysis took over %.1fs, using the lexicon", SENTIMENT_TIMEOUT_SECONDS)
+        return get_sentiment_lexicon().score(text)
+    except Exception as e:
+        logger.exception("Error analyzing sentiment: %s", e)
+        return get_sentiment_lexicon().score(text)
+    
+    scores = _sentiment_scores(result)
+    return scores if scores is not None else get_sentiment_lexicon().score(text)
+
+async def analyze_sentiment_batch(texts: Sequence[str], mode: Optional[str] = None) -> List[Dict[str, float]]:
+    """
+    Analyze the sentiment of many texts, in the shape analyze_sentiment returns
+    
+    In "llm" mode the texts are numbered and packed into structured calls
+    of up to SENTIMENT_BATCH_SIZE texts and SENTIMENT_BATCH_MAX_TOKENS
+    prompt tokens, which run concurrently through the LLM scheduler, and
+    the results are matched back by number. A call whose prompt would
+    exceed REQUEST_TOKEN_BUDGET is split in half until it fits. Texts the
+    model left out or scored malformed, and whole calls that fail or take
+    longer than SENTIMENT_TIMEOUT_SECONDS, get the lexicon's scores.
+    
+    In "lexicon" mode every text is scored locally (on the CPU worker
+    pool for large feeds) without any LLM call.
+    
+    Args:
+        texts: The texts to analyze
+        mode: "llm" or "lexicon" (defaults to SENTIMENT_BATCH_MODE)
         
-        return result
+    Returns:
+        One {positive, negative, neutral} dict per text, in order
+    """
+    mode = (mode or SENTIMENT_BATCH_MODE).lower()
+    if mode not in ("llm", "lexicon"):
+        raise ValueError(f"Unknown sentiment mode: {mode!r} (expected 'llm' or 'lexicon')")
+    if not texts:
+        return []
+    
+    if mode == "lexicon":
+        from aapp.dependencies import get_bulk_executor
+        return await get_bulk_executor().sentiment(texts)
+    
+    results: List[Optional[Dict[str, float]]] = [None] * len(texts)
+    await asyncio.gather(*(
+        _analyze_sentiment_chunk(texts, indices, results)
+        for indices in _sentiment_batches(texts)
+    ))
+    return results
+
+def _sentiment_batches(texts: Sequence[str]) -> List[List[int]]:
+    """Group text indices into batches bounded by count and prompt tokens"""
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    batch_tokens = 0
+    for i, text in enumerate(texts):
+        # The text, its number and its quotes
+        tokens = count_tokens(text) + 6
+        if batch and (len(batch) >= SENTIMENT_BATCH_SIZE or batch_tokens + tokens > SENTIMENT_BATCH_MAX_TOKENS):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+async def _analyze_sentiment_chunk(texts: Sequence[str], indices: List[int], results: List[Optional[Dict[str, float]]]) -> None:
+    """Score one batch of texts in one structured call, writing into results"""
+    lines = "\n".join(f"[{number}] {json.dumps(texts[i], ensure_ascii=False)}" for number, i in enumerate(indices))
+    prompt = (
+        f"Analyze the sentiment of each of these {len(indices)} texts. "
+        f"Return one result per text, with the text's number as its index.\n\n{lines}"
+    )
+    
+    output: Any = {}
+    try:
+        output = await asyncio.wait_for(
+            generate_structured_output(
+                prompt=prompt,
+                output_schema=_SENTIMENT_BATCH_SCHEMA,
+                temperature=0.1,
+                system_message=SENTIMENT_SYSTEM_MESSAGE
+            ),
+            SENTIMENT_TIMEOUT_SECONDS
+        )
+    except TokenBudgetExceeded:
+        if len(indices) > 1:
+            half = len(indices) // 2
+            await asyncio.gather(
+                _analyze_sentiment_chunk(texts, indices[:half], results),
+                _analyze_sentiment_chunk(texts, indices[half:], results)
+            )
+            return
+        logger.warning("Text too long for a sentiment call, using the lexicon")
+    except asyncio.TimeoutError:
+        logger.warning("Sentiment batch of %d took over %.1fs, using the lexicon", len(indices), SENTIMENT_TIMEOUT_SECONDS)
     except Exception as e:
-        print(f"Error analyzing sentiment: {e}")
-        return {"positive": 0.0, "negative": 0.0, "neutral": 1.0} 
\ No newline at end of file
+        logger.error("Error analyzing sentiment batch of %d: %s", len(indices), e)
+    
+    items = output.get("results") if isinstance(output, dict) else None
+    for item in items if isinstance(items, list) else []:
+        number = item.get("index") if isinstance(item, dict) else None
+        if isinstance(number, int) and 0 <= number < len(indices):
+            scores = _sentiment_scores(item)
+            if scores is not None:
+                results[indices[number]] = scores
+    
+    lexicon = get_sentiment_lexicon()
+    for i in indices:
+        if results[i] is None:
+            results[i] = lexicon.score(texts[i])
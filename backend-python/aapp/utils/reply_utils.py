@@ -0,0 +1,117 @@
+import re
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set
+
+from aapp.utils.topics import tokenize
+
+_PERSONAL_PHRASES = re.compile("i've|i'd|i think|in my experience")
+
+def evaluate_reply(reply_content: str, original_tweet: str) -> Dict[str, Any]:
+    """
+    Evaluate the quality and potential engagement of a reply
+
+    This is the local heuristic behind the ReplyGenerator agent's
+    evaluate_reply tool.
+
+    Args:
+        reply_content: The content of the reply to evaluate
+        original_tweet: The original tweet being replied to
+
+    Returns:
+        Evaluation details including strengths and estimated engagement score
+    """
+    return _evaluate(reply_content, set(original_tweet.lower().split()))
+
+def evaluate_replies(replies: Sequence[str], original_tweet: str) -> List[Dict[str, Any]]:
+    """
+    Evaluate many candidate replies to the same tweet in one pass
+
+    Gives the same result as evaluate_reply for each reply, but the
+    original tweet is only split into words once.
+
+    Args:
+        replies: The candidate replies
+        original_tweet: The original tweet being replied to
+
+    Returns:
+        One evaluation per reply, in order
+    """
+    original_words = set(original_tweet.lower().split())
+    return [_evaluate(reply, original_words) for reply in replies]
+
+def _evaluate(reply_content: str, original_words: Set[str]) -> Dict[str, Any]:
+    lowered = reply_content.lower()
+    length = len(reply_content)
+    words = lowered.split()
+    has_question = "?" in reply_content
+
+    # Generate strengths based on content
+    strengths = []
+
+    if has_question:
+        strengths.append("Asks an open-ended question")
+
+    if length < 140:
+        strengths.append("Concise and direct")
+
+    if "consider" in lowered:
+        strengths.append("Encourages deeper thinking")
+
+    if _PERSONAL_PHRASES.search(lowered):
+        strengths.append("Personal and authentic tone")
+
+    if len(words) > 5 and length < 280:
+        strengths.append("Appropriate length for platform")
+
+    # More sophisticated engagement score calculation
+    score = 50  # Base score
+
+    # Adjust for length (prefer 80-150 chars)
+    if 80 <= length <= 150:
+        score += 20
+    elif length > 200:
+        score -= 10
+
+    # Bonus for questions
+    if has_question:
+        score += 15
+
+    # Bonus for relevant content
+    overlap = len(original_words.intersection(words))
+    if overlap > 0:
+        score += min(overlap * 2, 15)  # Maximum 15 points for relevance
+
+    # Ensure score is in range
+    score = min(max(score, 0), 100)
+
+    return {
+        "strengths": strengths[:3],  # Limit to top 3 strengths
+        "estimated_engagement": score
+    }
+
+def jaccard_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two word sets (1.0 when both are empty)"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def select_diverse_replies(replies: Sequence[str], scores: Sequence[float], count: int, max_similarity: float) -> List[int]:
+    """
+    Pick the best-scoring replies that aren't near-duplicates of each other
+
+    Candidates are taken in descending score order (ties keep their
+    original order) and skipped if their word set's Jaccard similarity to
+    an already picked reply exceeds max_similarity. Stops at `count`, so
+    only the candidates near the top are ever tokenized.
+
+    Returns:
+        Indices into `replies`, best first
+    """
+    word_sets: List[Optional[FrozenSet[str]]] = [None] * len(replies)
+    picked: List[int] = []
+    for i in sorted(range(len(replies)), key=lambda i: -scores[i]):
+        if len(picked) == count:
+            break
+        words = word_sets[i] = frozenset(tokenize(replies[i]))
+        if all(jaccard_similarity(words, word_sets[j]) <= max_similarity for j in picked):
+            picked.append(i)
+    return picked
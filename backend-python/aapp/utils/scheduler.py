@@ -0,0 +1,425 @@
+import asyncio
+import heapq
+import itertools
+import random
+import sys
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from aapp.config import (
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_BURST_SECONDS,
+    LLM_MAX_QUEUE,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+)
+from aapp.utils.logging import logger
+from aapp.utils.metrics import llm_queue_depth, llm_queue_wait_seconds, llm_rejected_total, llm_retries_total
+
+T = TypeVar("T")
+
+# Completion tokens reserved for a call that doesn't cap them with max_tokens
+DEFAULT_COMPLETION_TOKENS = 500
+
+class Priority(IntEnum):
+    """LLM call priority classes; lower values are dispatched first"""
+
+    INTERACTIVE = 0
+    BATCH = 1
+    PREFETCH = 2
+
+# Priority of the LLM calls made by the current task (set by batch and background work)
+current_priority: ContextVar[Priority] = ContextVar("current_priority", default=Priority.INTERACTIVE)
+
+@contextmanager
+def llm_priority(priority: Priority) -> Iterator[None]:
+    """Run the LLM calls made inside the with-block at the given priority"""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+class LLMUnavailable(Exception):
+    """Raised when an LLM call can't be made now; clients should retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+class LLMQueueFull(LLMUnavailable):
+    """Raised when the scheduler's queue for a priority class is full"""
+
+class LLMRateLimited(LLMUnavailable):
+    """Raised when the provider still rate limits a call after every retry"""
+
+class TokenBucket:
+    """
+    Continuously refilled token bucket for a per-minute limit
+
+    Holds at most `burst_seconds` worth of the allowance, so a full
+    minute's quota isn't sent in one burst (providers enforce their
+    per-minute limits over shorter windows). The level may go negative
+    when a call turns out to have used more than was reserved for it,
+    which delays the calls after it. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 60.0):
+        self.per_minute = per_minute
+        self.capacity = per_minute * min(max(burst_seconds, 0.0), 60.0) / 60
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (amounts above capacity wait for a full bucket)"""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.per_minute)
+
+    def take(self, amount: float, now: float) -> None:
+        if self.per_minute <= 0:
+            return
+        self._refill(now)
+        self.level -= amount
+
+class LLMScheduler:
+    """
+    Paces, prioritizes and retries outbound LLM calls
+
+    Every call first reserves one request and its estimated tokens from
+    the requests-per-minute and tokens-per-minute buckets. When the
+    buckets can't cover it the call waits in a priority queue, and a
+    single dispatcher task releases waiters in (priority, arrival) order
+    as the buckets refill, so interactive calls go ahead of batch and
+    prefetch work. Each priority class queues at most `max_queue` calls;
+    beyond that callers get LLMQueueFull instead of waiting indefinitely.
+    A task whose work is shared with a higher priority caller can be
+    promoted, queued calls included (see promote).
+
+    Calls that fail with a 429 or a 5xx are retried up to `max_retries`
+    times after a jittered exponential backoff (at least the provider's
+    Retry-After). A 429 also pauses dispatching for that long, since the
+    provider's window is shared by every queued call.
+
+    Args:
+        requests_per_minute: Request limit (0 for none)
+        tokens_per_minute: Token limit, prompt plus completion (0 for none)
+        burst_seconds: How many seconds' worth of either limit may go out at once
+        max_queue: Maximum number of waiting calls per priority class
+        max_retries: Retries for a call that gets a 429 or 5xx
+        backoff_base: Backoff ceiling for the first retry, in seconds
+        backoff_max: Maximum backoff ceiling, in seconds
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        burst_seconds: float = 10.0,
+        max_queue: int = 100,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        self.max_queue = max(1, max_queue)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # (priority, arrival, tokens, future, task) heap of waiting calls
+        self._waiters: List[Tuple[int, int, int, "asyncio.Future[None]", Optional["asyncio.Task[Any]"]]] = []
+        # Current priority of each waiting call, which promote may raise
+        self._levels: Dict["asyncio.Future[None]", Priority] = {}
+        # Lowest priority the calls of a promoted task may run at
+        self._floors: "weakref.WeakKeyDictionary[asyncio.Task[Any], Priority]" = weakref.WeakKeyDictionary()
+        self._arrivals = itertools.count()
+        self._depth: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._wake: Optional[asyncio.Event] = None
+        self._dispatcher: Optional["asyncio.Task[None]"] = None
+        self._paused_until = 0.0
+
+        self.dispatched = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        # Waiters and the dispatcher belong to one event loop; start over on a new one
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._waiters = []
+            self._levels = {}
+            self._floors = weakref.WeakKeyDictionary()
+            self._depth = {priority: 0 for priority in Priority}
+            self._wake = asyncio.Event()
+            self._dispatcher = None
+        return loop
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        return max(self._paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def _take(self, tokens: int, now: float) -> None:
+        self.requests.take(1, now)
+        self.tokens.take(tokens, now)
+        self.dispatched += 1
+
+    def _give_back(self, tokens: int) -> None:
+        # A granted call that was cancelled before it could be sent
+        now = time.monotonic()
+        self.requests.take(-1, now)
+        self.tokens.take(-tokens, now)
+        self.dispatched -= 1
+        self._wake.set()
+
+    def _prune(self) -> None:
+        """Drop finished (granted or cancelled) waiters from the head of the queue"""
+        while self._waiters and self._waiters[0][3].done():
+            heapq.heappop(self._waiters)
+
+    def _remove(self, future: "asyncio.Future[None]") -> None:
+        # Queues are at most max_queue per class, so a linear removal is cheap
+        self._waiters = [waiter for waiter in self._waiters if waiter[3] is not future]
+        heapq.heapify(self._waiters)
+        self._wake.set()
+
+    def promote(self, task: "asyncio.Task[Any]", priority: Priority) -> None:
+        """
+        Run the LLM calls of `task` at `priority` or higher from now on
+
+        Calls it already has queued move up too. Only calls made by the
+        task itself are affected, not by tasks it spawns.
+        """
+        self._bind()
+        floor = self._floors.get(task)
+        if floor is not None and floor <= priority:
+            return
+        self._floors[task] = priority
+
+        moved = False
+        for i, (level, arrival, tokens, future, owner) in enumerate(self._waiters):
+            if owner is task and level > priority and not future.done():
+                self._waiters[i] = (int(priority), arrival, tokens, future, owner)
+                self._move(future, priority)
+                moved = True
+        if moved:
+            heapq.heapify(self._waiters)
+            self._wake.set()
+
+    def _move(self, future: "asyncio.Future[None]", priority: Priority) -> None:
+        previous = self._levels[future]
+        self._levels[future] = priority
+        self._depth[previous] -= 1
+        self._depth[priority] += 1
+        llm_queue_depth.dec(priority=previous.name.lower())
+        llm_queue_depth.inc(priority=priority.name.lower())
+
+    async def acquire(self, tokens: int, priority: Optional[Priority] = None) -> None:
+        """
+        Wait until a call estimated at `tokens` tokens may be sent
+
+        Raises:
+            LLMQueueFull: If the queue for the priority class is full
+        """
+        loop = self._bind()
+        priority = current_priority.get() if priority is None else priority
+        task = asyncio.current_task()
+        floor = self._floors.get(task) if task is not None else None
+        if floor is not None and floor < priority:
+            priority = floor
+
+        # Nothing queued and the buckets cover it: go straight through
+        self._prune()
+        now = time.monotonic()
+        if not self._waiters and self._wait_time(tokens, now) == 0:
+            self._take(tokens, now)
+            llm_queue_wait_seconds.observe(0.0, priority=priority.name.lower())
+            return
+
+        if self._depth[priority] >= self.max_queue:
+            self.rejected += 1
+            llm_rejected_total.inc(reason="queue_full")
+            raise LLMQueueFull(
+                f"Too many queued LLM calls ({priority.name.lower()})",
+                retry_after=max(1.0, self._wait_time(tokens, now)),
+            )
+
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._arrivals), tokens, future, task))
+        self._levels[future] = priority
+        self._depth[priority] += 1
+        llm_queue_depth.inc(priority=priority.name.lower())
+        self._wake.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+        queued_at = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Cancelled after the dispatcher granted it: return the reservation
+                self._give_back(tokens)
+            else:
+                # Still queued: leave the heap, so it doesn't hold up the fast path
+                future.cancel()
+                self._remove(future)
+            raise
+        finally:
+            # A promoted call leaves the queue of the class it was moved to
+            priority = self._levels.pop(future)
+            self._depth[priority] -= 1
+            llm_queue_depth.dec(priority=priority.name.lower())
+        llm_queue_wait_seconds.observe(time.perf_counter() - queued_at, priority=priority.name.lower())
+
+    async def _dispatch(self) -> None:
+        """Release queued calls in priority order as the buckets allow"""
+        while True:
+            self._prune()
+            if not self._waiters:
+                return
+
+            now = time.monotonic()
+            _, _, tokens, future, _ = self._waiters[0]
+            wait = self._wait_time(tokens, now)
+            if wait == 0:
+                heapq.heappop(self._waiters)
+                self._take(tokens, now)
+                future.set_result(None)
+                continue
+
+            # Sleep until the head can go, or until a new (maybe higher priority) call arrives
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Charge the token bucket for the difference between a call's estimate and its real usage"""
+        if actual_tokens:
+            self.tokens.take(actual_tokens - estimated_tokens, time.monotonic())
+
+    async def backoff(self, error: BaseException, attempt: int) -> None:
+        """
+        Sleep before retrying a failed call, or raise if it shouldn't be retried
+
+        Retries what the OpenAI client retries on its own: 408, 409, 429
+        and 5xx responses, connection errors and timeouts, until
+        `max_retries` is reached; a 429 that is out of retries raises
+        LLMRateLimited, anything else re-raises the error.
+        """
+        if not _retryable(error):
+            raise error
+
+        status = getattr(error, "status_code", None)
+        retry_after = _retry_after(error)
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        delay = max(delay, retry_after or 0.0)
+        if status == 429:
+            reason = "rate_limited"
+        elif isinstance(status, int) and status >= 500:
+            reason = "server_error"
+        else:
+            reason = "transient"
+
+        if attempt >= self.max_retries:
+            if status == 429:
+                self.rejected += 1
+                llm_rejected_total.inc(reason="rate_limited")
+                raise LLMRateLimited("LLM provider rate limit reached", retry_after=max(1.0, delay)) from error
+            raise error
+
+        if status == 429:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self.retries += 1
+        llm_retries_total.inc(reason=reason)
+        logger.warning("LLM call failed with %s, retrying in %.2fs (attempt %d)", status or type(error).__name__, delay, attempt + 1)
+        await asyncio.sleep(delay)
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int, priority: Optional[Priority] = None) -> T:
+        """
+        Make an LLM call through the scheduler, retrying transient failures (see backoff)
+
+        Args:
+            call: Zero-argument coroutine function making one LLM request
+            tokens: Estimated prompt plus completion tokens of the request
+            priority: Priority class (defaults to current_priority)
+
+        Returns:
+            The call's result
+        """
+        attempt = 0
+        while True:
+            await self.acquire(tokens, priority)
+            try:
+                return await call()
+            except Exception as e:
+                await self.backoff(e, attempt)
+                attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depths, bucket levels and dispatch/retry counters"""
+        now = time.monotonic()
+        return {
+            "queued": {priority.name.lower(): depth for priority, depth in self._depth.items()},
+            "max_queue": self.max_queue,
+            "requests_per_minute": self.requests.per_minute,
+            "tokens_per_minute": self.tokens.per_minute,
+            "wait_seconds": round(self._wait_time(1, now), 3),
+            "dispatched": self.dispatched,
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
+
+# Statuses the OpenAI client retries: request timeout, lock conflict, rate limit (and 5xx)
+RETRYABLE_STATUSES = frozenset({408, 409, 429})
+
+def _retryable(error: BaseException) -> bool:
+    """Whether a failed LLM call is worth retrying"""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUSES or status >= 500
+    # Connection errors and timeouts (APITimeoutError is a subclass) carry no status;
+    # if openai was never imported, the error can't be one of them
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(error, openai.APIConnectionError)
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """The Retry-After header of a failed response, in seconds, if present"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after-ms")) / 1000
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+# Process-wide scheduler shared by agent runs and openai_utils
+llm_scheduler = LLMScheduler(
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    burst_seconds=LLM_BURST_SECONDS,
+    max_queue=LLM_MAX_QUEUE,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE_SECONDS,
+    backoff_max=LLM_BACKOFF_MAX_SECONDS,
+)
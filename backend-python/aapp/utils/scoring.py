@@ -0,0 +1,164 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from aapp.utils.timestamps import parse_timestamp
+
+# Recency decays linearly to zero over this window
+RECENCY_WINDOW_HOURS = 72.0
+
+# Engagement weights: replies and retweets count more than likes
+LIKE_WEIGHT = 1.0
+REPLY_WEIGHT = 2.0
+RETWEET_WEIGHT = 3.0
+
+ENGAGEMENT_RATE_WEIGHT = 0.7
+RECENCY_WEIGHT = 0.3
+VERIFIED_MULTIPLIER = 1.2
+
+# Views are estimated from likes when a tweet has none
+ESTIMATED_VIEWS_PER_LIKE = 100
+
+def normalize_timestamps(timestamps: Iterable[Any], now: Optional[float] = None) -> np.ndarray:
+    """
+    Normalize many timestamps to an array of epoch seconds (done once at ingestion)
+
+    Unparseable timestamps become NaN: they score no recency, and the
+    TweetStore never admits them since their age is unknown.
+    """
+    now = time.time() if now is None else now
+    parsed = (parse_timestamp(ts, now) for ts in timestamps)
+    return np.fromiter((np.nan if ts is None else ts for ts in parsed), dtype=np.float64)
+
+def score_viral_potential(
+    likes: Any,
+    replies: Any,
+    retweets: Any,
+    views: Any,
+    created_at: Any,
+    verified: Any,
+    now: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Score the viral potential of many tweets in one vectorized pass
+
+    The score combines:
+    - Engagement rate: (likes + 2*replies + 3*retweets) / views
+    - Recency: 1.0 for a brand new tweet, decaying linearly to 0 over 72 hours
+      (0 for an unknown creation time)
+    - Verified status: verified authors get a 1.2x multiplier
+
+    All arguments are equal-length array-likes (columns).
+
+    Args:
+        likes: Like counts
+        replies: Reply counts
+        retweets: Retweet counts
+        views: View counts (0 means unknown and is estimated from likes)
+        created_at: Creation times as epoch seconds (NaN if unknown)
+        verified: Verified author flags
+        now: Reference epoch time (defaults to time.time())
+
+    Returns:
+        A float array of scores between 0 and 1
+    """
+    now = time.time() if now is None else now
+    return combine_terms(
+        engagement_term(likes, replies, retweets, views),
+        recency_term(created_at, now),
+        verified,
+    )
+
+def engagement_term(likes: Any, replies: Any, retweets: Any, views: Any) -> np.ndarray:
+    """The weighted engagement-rate part of the score; it only changes when metrics do"""
+    likes = np.asarray(likes, dtype=np.float64)
+    replies = np.asarray(replies, dtype=np.float64)
+    retweets = np.asarray(retweets, dtype=np.float64)
+    views = np.asarray(views, dtype=np.float64)
+
+    # Estimate views if not available
+    views = np.where(views > 0, views, likes * ESTIMATED_VIEWS_PER_LIKE)
+
+    total_engagement = likes * LIKE_WEIGHT + replies * REPLY_WEIGHT + retweets * RETWEET_WEIGHT
+    engagement_rate = np.where(views > 0, total_engagement / np.maximum(views, 1.0), 0.0)
+    return engagement_rate * ENGAGEMENT_RATE_WEIGHT
+
+def recency_term(created_at: Any, now: float) -> np.ndarray:
+    """The weighted recency part of the score, decaying linearly to 0 over RECENCY_WINDOW_HOURS"""
+    hours_ago = (now - np.asarray(created_at, dtype=np.float64)) / 3600.0
+    # fmax rather than maximum: an unknown (NaN) creation time scores 0
+    return np.fmax(0.0, 1.0 - hours_ago / RECENCY_WINDOW_HOURS) * RECENCY_WEIGHT
+
+def combine_terms(engagement: Any, recency: Any, verified: Any) -> np.ndarray:
+    """Add the two terms, apply the verified multiplier and cap at 1"""
+    scores = np.asarray(engagement, dtype=np.float64) + recency
+    scores = np.where(np.asarray(verified, dtype=bool), scores * VERIFIED_MULTIPLIER, scores)
+    return np.minimum(1.0, scores)
+
+def engagement_count(likes: Any, replies: Any, retweets: Any) -> np.ndarray:
+    """Raw engagement (likes + replies + retweets), the quantity min_engagement filters on"""
+    return (
+        np.asarray(likes, dtype=np.int64)
+        + np.asarray(replies, dtype=np.int64)
+        + np.asarray(retweets, dtype=np.int64)
+    )
+
+def to_percent(scores: Any) -> np.ndarray:
+    """Convert 0-1 scores to the 0-100 integer scale used by the API"""
+    return np.clip(np.rint(np.asarray(scores, dtype=np.float64) * 100), 0, 100).astype(np.int64)
+
+def tweet_columns(tweets: Sequence[Any], now: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Extract scoring columns from Tweet models or flat tweet dicts
+
+    Timestamps are normalized to epoch seconds here, once, so later
+    scoring passes only do arithmetic.
+
+    Returns:
+        A dict of equal-length arrays keyed by the score_viral_potential argument names
+    """
+    columns, timestamps = metric_columns(tweets)
+    columns["created_at"] = normalize_timestamps(timestamps, now)
+    return columns
+
+def metric_columns(tweets: Sequence[Any]) -> Tuple[Dict[str, np.ndarray], List[Any]]:
+    """
+    Extract the metric and verified columns of Tweet models or flat tweet dicts
+
+    Returns:
+        (the columns of tweet_columns() except created_at, the raw timestamps)
+    """
+    count = len(tweets)
+    likes = np.empty(count, dtype=np.int64)
+    replies = np.empty(count, dtype=np.int64)
+    retweets = np.empty(count, dtype=np.int64)
+    views = np.empty(count, dtype=np.int64)
+    verified = np.empty(count, dtype=bool)
+    timestamps = []
+
+    for i, tweet in enumerate(tweets):
+        if isinstance(tweet, dict):
+            metrics = tweet.get("metrics") or tweet
+            author = tweet.get("author") or {}
+            likes[i] = metrics.get("likes", 0)
+            replies[i] = metrics.get("replies", 0)
+            retweets[i] = metrics.get("retweets", 0)
+            views[i] = metrics.get("views", 0)
+            verified[i] = bool(author.get("is_verified", tweet.get("author_verified", False)))
+            timestamps.append(tweet.get("timestamp"))
+        else:
+            likes[i] = tweet.metrics.likes
+            replies[i] = tweet.metrics.replies
+            retweets[i] = tweet.metrics.retweets
+            views[i] = tweet.metrics.views
+            verified[i] = bool(tweet.author.is_verified)
+            timestamps.append(tweet.timestamp)
+
+    columns = {"likes": likes, "replies": replies, "retweets": retweets, "views": views, "verified": verified}
+    return columns, timestamps
+
+def score_tweets(tweets: Sequence[Any], now: Optional[float] = None) -> np.ndarray:
+    """Score Tweet models or flat tweet dicts, returning 0-1 scores"""
+    now = time.time() if now is None else now
+    return score_viral_potential(**tweet_columns(tweets, now), now=now)
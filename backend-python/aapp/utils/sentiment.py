@@ -0,0 +1,179 @@
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from aapp.config import SENTIMENT_LEXICON_PATH
+from aapp.utils.topics import tokenize
+
+# Word -> valence from -3 (very negative) to 3 (very positive). Extend or
+# override it with a JSON file of {"word": valence} at SENTIMENT_LEXICON_PATH;
+# keys may also be phrases ("not bad", "can't wait").
+DEFAULT_LEXICON: Dict[str, float] = {
+    # Positive
+    "love": 3.0, "loved": 3.0, "loving": 2.5, "amazing": 3.0, "awesome": 3.0, "incredible": 3.0,
+    "excellent": 3.0, "fantastic": 3.0, "brilliant": 3.0, "perfect": 2.5, "best": 2.5, "wonderful": 3.0,
+    "great": 2.5, "excited": 2.5, "exciting": 2.5, "thrilled": 3.0, "happy": 2.5, "glad": 2.0,
+    "proud": 2.0, "congrats": 2.5, "congratulations": 2.5, "thanks": 1.5, "thank": 1.5, "grateful": 2.5,
+    "good": 1.5, "nice": 1.5, "cool": 1.5, "fun": 1.5, "beautiful": 2.5, "impressive": 2.5,
+    "useful": 1.5, "helpful": 1.5, "easy": 1.0, "fast": 1.0, "faster": 1.0, "smooth": 1.5,
+    "win": 2.0, "wins": 2.0, "won": 2.0, "winning": 2.0, "success": 2.0, "successful": 2.0,
+    "shipped": 1.0, "launched": 1.0, "growth": 1.0, "growing": 1.0, "recommend": 1.5, "enjoy": 2.0,
+    "enjoyed": 2.0, "liked": 1.0, "wow": 2.0, "yay": 2.5, "finally": 1.0,
+    "solid": 1.5, "clean": 1.0, "elegant": 2.0, "favorite": 2.0, "fav": 2.0, "hyped": 2.0,
+    "underrated": 1.0, "inspiring": 2.5, "delightful": 3.0, "lol": 1.0, "haha": 1.5,
+    # Negative
+    "hate": -3.0, "hated": -3.0, "terrible": -3.0, "awful": -3.0, "horrible": -3.0, "worst": -3.0,
+    "bad": -2.0, "worse": -2.0, "sucks": -2.5, "suck": -2.5, "broken": -2.0, "bug": -1.0,
+    "bugs": -1.0, "buggy": -2.0, "crash": -2.0, "crashed": -2.0, "crashes": -2.0, "slow": -1.5,
+    "slower": -1.5, "fail": -2.0, "failed": -2.0, "failing": -2.0, "failure": -2.0, "wrong": -1.5,
+    "angry": -2.5, "annoying": -2.0, "annoyed": -2.0, "frustrating": -2.5, "frustrated": -2.5,
+    "sad": -2.0, "disappointed": -2.5, "disappointing": -2.5, "useless": -2.5, "waste": -2.0,
+    "scam": -3.0, "fraud": -3.0, "lost": -1.5, "lose": -1.5, "losing": -1.5, "layoffs": -2.0,
+    "problem": -1.0, "problems": -1.0, "issue": -1.0, "issues": -1.0, "pain": -2.0, "painful": -2.0,
+    "hard": -0.5, "difficult": -1.0, "confusing": -1.5, "overrated": -1.5, "expensive": -1.0,
+    "boring": -1.5, "ugly": -2.0, "stupid": -2.5, "dumb": -2.0, "ridiculous": -2.0, "ugh": -2.0,
+    "outage": -2.0, "down": -0.5, "dead": -2.0, "worried": -1.5, "scary": -2.0, "hype": -0.5,
+}
+
+DEFAULT_EMOJI: Dict[str, float] = {
+    "\U0001F525": 2.0, "\u2764": 3.0, "\U0001F60D": 3.0, "\U0001F389": 2.5, "\U0001F680": 2.0,
+    "\U0001F44D": 2.0, "\U0001F64C": 2.0, "\U0001F602": 1.5, "\U0001F60A": 2.0, "\U0001F4AF": 2.0,
+    "\U0001F44E": -2.0, "\U0001F621": -3.0, "\U0001F620": -2.5, "\U0001F622": -2.0, "\U0001F62D": -2.0,
+    "\U0001F92E": -3.0, "\U0001F480": -0.5, "\U0001F612": -1.5, "\U0001F644": -1.5,
+}
+
+# A negator flips (and damps) the valence of sentiment words up to this many words after it.
+# "t" is what tokenize() leaves of "n't" ("don't" -> "don t")
+NEGATORS = frozenset({"not", "no", "never", "none", "nobody", "nothing", "neither", "nor", "cannot", "without", "t", "isnt", "dont", "cant", "wont"})
+NEGATION_WINDOW = 3
+NEGATION_FACTOR = -0.75
+
+# Degree words scale the next sentiment word
+INTENSIFIERS: Dict[str, float] = {
+    "very": 1.5, "really": 1.5, "so": 1.3, "extremely": 1.8, "super": 1.5, "incredibly": 1.8,
+    "absolutely": 1.6, "totally": 1.4, "insanely": 1.8, "slightly": 0.5, "somewhat": 0.6,
+    "kinda": 0.6, "barely": 0.4, "pretty": 1.2,
+}
+
+NEUTRAL = {"positive": 0.0, "negative": 0.0, "neutral": 1.0}
+
+class SentimentLexicon:
+    """
+    Lexicon sentiment scorer compiled once from a word -> valence table
+
+    A text is split into words once (the topic classifier's tokenizer);
+    each sentiment word or phrase contributes its valence, scaled by an
+    intensifier right before it and flipped by a negator in the few words
+    before it (the longest phrase starting at a word wins over the word),
+    and emoji found anywhere in the text add theirs. The scores follow
+    the {positive, negative, neutral} shape of analyze_sentiment: the
+    summed positive and negative weight and the count of words carrying
+    none, as fractions of their total. Exclamation marks strengthen the
+    sentiment that is there. It runs in microseconds per text and needs
+    no model, at the cost of missing sarcasm and context.
+    """
+
+    def __init__(self, lexicon: Dict[str, float], emoji: Optional[Dict[str, float]] = None):
+        # Single words are looked up directly; entries that tokenize to several words are matched as phrases
+        self.lexicon: Dict[str, float] = {}
+        self.phrases: Dict[Tuple[str, ...], float] = {}
+        for entry, valence in lexicon.items():
+            words = tuple(tokenize(entry))
+            if len(words) == 1:
+                self.lexicon[words[0]] = float(valence)
+            elif words:
+                self.phrases[words] = float(valence)
+        self._phrase_starts = frozenset(words[0] for words in self.phrases)
+        self._phrase_lengths = sorted({len(words) for words in self.phrases}, reverse=True)
+        self.emoji = dict(DEFAULT_EMOJI if emoji is None else emoji)
+
+    def _phrase(self, words: List[str], i: int) -> Tuple[Optional[float], int]:
+        """The valence and length of the longest phrase starting at words[i], or (None, 1)"""
+        for length in self._phrase_lengths:
+            valence = self.phrases.get(tuple(words[i:i + length]))
+            if valence is not None:
+                return valence, length
+        return None, 1
+
+    def weights(self, text: Optional[str]) -> Tuple[float, float, int]:
+        """Return (positive weight, negative weight, words without sentiment) of a text"""
+        text = text or ""
+        words = tokenize(text)
+        positive = negative = 0.0
+        neutral = 0
+        negated_until = -1
+        i = 0
+        while i < len(words):
+            word = words[i]
+            valence, span = self._phrase(words, i) if word in self._phrase_starts else (None, 1)
+            if valence is None:
+                if word in NEGATORS:
+                    negated_until = i + NEGATION_WINDOW
+                    neutral += 1
+                    i += 1
+                    continue
+                valence = self.lexicon.get(word)
+                if valence is None:
+                    neutral += 1
+                    i += 1
+                    continue
+            if i > 0 and words[i - 1] in INTENSIFIERS:
+                valence *= INTENSIFIERS[words[i - 1]]
+            if i <= negated_until:
+                valence *= NEGATION_FACTOR
+            if valence > 0:
+                positive += valence
+            else:
+                negative -= valence
+            i += span
+
+        # Emoji are never ASCII, so most texts skip the scan
+        if not text.isascii():
+            for symbol, valence in self.emoji.items():
+                count = text.count(symbol)
+                if count:
+                    if valence > 0:
+                        positive += valence * count
+                    else:
+                        negative -= valence * count
+
+        exclamations = min(text.count("!"), 3)
+        if exclamations:
+            boost = 1 + 0.1 * exclamations
+            positive *= boost
+            negative *= boost
+        return positive, negative, neutral
+
+    def score(self, text: Optional[str]) -> Dict[str, float]:
+        """Return the {positive, negative, neutral} scores of a text (summing to 1)"""
+        return to_scores(*self.weights(text))
+
+    def score_many(self, texts: Sequence[Optional[str]]) -> List[Dict[str, float]]:
+        """Return the scores of each text"""
+        return [self.score(text) for text in texts]
+
+def to_scores(positive: float, negative: float, neutral: float) -> Dict[str, float]:
+    """Turn positive/negative weights and a neutral count into fractions of their total"""
+    total = positive + negative + neutral
+    if total <= 0:
+        return dict(NEUTRAL)
+    return {
+        "positive": round(positive / total, 3),
+        "negative": round(negative / total, 3),
+        "neutral": round(neutral / total, 3),
+    }
+
+def load_lexicon(path: str = SENTIMENT_LEXICON_PATH) -> Dict[str, float]:
+    """Load a {word or phrase: valence} lexicon from JSON on top of the default one"""
+    if not path:
+        return DEFAULT_LEXICON
+    with open(path) as f:
+        return {**DEFAULT_LEXICON, **json.load(f)}
+
+_lexicon: Optional[SentimentLexicon] = None
+
+def get_sentiment_lexicon() -> SentimentLexicon:
+    """Return the shared scorer, compiling the lexicon on first use"""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = SentimentLexicon(load_lexicon())
+    return _lexicon
@@ -0,0 +1,84 @@
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # In requirements.txt; without it plain payloads use the standard library
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # In requirements.txt; without it every response is JSON
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+_JSON_RANGES = (JSON_MEDIA_TYPE, "application/*", "*/*")
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """
+    Pick the response media type from an Accept header
+
+    MessagePack is chosen when the client ranks it above JSON (by q-value,
+    then by order) and msgpack is installed; anything else gets JSON.
+    """
+    if not accept or msgpack is None:
+        return JSON_MEDIA_TYPE
+
+    best, best_q = JSON_MEDIA_TYPE, 0.0
+    for media_range in accept.split(","):
+        media_type, _, params = media_range.partition(";")
+        media_type = media_type.strip().lower()
+        if media_type not in MSGPACK_MEDIA_TYPES and media_type not in _JSON_RANGES:
+            continue
+
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = (media_type if media_type in MSGPACK_MEDIA_TYPES else JSON_MEDIA_TYPE), q
+    return best
+
+def dumps_json(content: Any) -> bytes:
+    """Encode plain JSON-compatible data (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode()
+
+def serialize_model(model: BaseModel, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """
+    Encode a model as JSON or MessagePack
+
+    JSON is written by pydantic-core straight from the model, without
+    building the intermediate dicts that model_dump() + a JSON encoder
+    would (for a large response those dicts cost more than the encoding).
+    """
+    if media_type in MSGPACK_MEDIA_TYPES:
+        # JSON mode, so the MessagePack body carries exactly what the JSON one would
+        return msgpack.packb(model.model_dump(mode="json"))
+    return model.__pydantic_serializer__.to_json(model)
+
+def model_response(request: Request, model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Return an already validated model in the format the client asked for
+
+    Routes return this instead of the model itself so FastAPI doesn't
+    validate the response again against response_model and serialize it
+    through jsonable_encoder; response_model still documents the schema.
+    """
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    return Response(
+        content=serialize_model(model, media_type),
+        status_code=status_code,
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
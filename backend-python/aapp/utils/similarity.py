@@ -0,0 +1,273 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from aapp.utils.topics import tokenize
+
+# Links differ between copies of the same text (t.co wraps every share)
+_URLS = re.compile(r"https?://\S+")
+
+SHINGLE_BYTES = 5
+
+def shingle_text(text: Optional[str]) -> str:
+    """Normalize a text for shingling: no links, lowercase words, no punctuation"""
+    return " ".join(tokenize(_URLS.sub(" ", text or "")))
+
+def shingle_count(text: Optional[str]) -> int:
+    """The number of character 5-grams of a normalized text"""
+    return max(0, len(shingle_text(text).encode()) - SHINGLE_BYTES + 1)
+
+def shingles(text: Optional[str]) -> np.ndarray:
+    """
+    The character 5-grams of a normalized text, as integers
+
+    Each 5-byte window of the UTF-8 text is packed into one integer, so
+    shingles are exact (no hashing) and built with a few numpy operations.
+    Repeats are left in: MinHash only takes minimums, so they don't matter.
+    Character shingles survive small edits far better than word shingles
+    on tweet-length texts: a changed word touches a handful of the
+    ~200 shingles rather than most of them.
+    """
+    data = np.frombuffer(shingle_text(text).encode(), dtype=np.uint8).astype(np.uint64)
+    if len(data) < SHINGLE_BYTES:
+        data = np.concatenate([data, np.zeros(SHINGLE_BYTES - len(data), dtype=np.uint64)])
+    windows = len(data) - SHINGLE_BYTES + 1
+    packed = data[:windows].copy()
+    for offset in range(1, SHINGLE_BYTES):
+        packed <<= np.uint64(8)
+        packed |= data[offset:offset + windows]
+    return packed
+
+class MinHasher:
+    """
+    MinHash signatures with multiply-shift hashing
+
+    Each of the `num_perm` hash functions is h(x) = (a*x + b) mod 2^64 >> 32
+    with random odd `a`; the signature keeps the minimum of each over a
+    text's shingles. Two signatures agree in a given position with
+    probability equal to the Jaccard similarity of the shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 60, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: Optional[str]) -> np.ndarray:
+        values = shingles(text)[:, None]
+        hashed = (values * self._a + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+class SimilarityCache:
+    """
+    Bounded cache of values keyed by near-duplicate texts (MinHash LSH)
+
+    A text's MinHash signature is cut into `bands` bands of `num_perm /
+    bands` values; each band is hashed into a bucket table, and a lookup
+    only compares against entries sharing at least one bucket (so it costs
+    the same with a million entries as with ten). Candidates are confirmed
+    with the signature's Jaccard estimate and the best one at or above
+    `threshold` is returned. With 12 bands of 5, texts at 0.8 similarity
+    share a bucket 99% of the time and texts at 0.3 about 3% of the time.
+
+    Texts with fewer than `min_shingles` shingles are neither indexed nor
+    looked up: once links and punctuation are dropped, link-only or
+    emoji-only tweets normalize to (nearly) nothing, and would all match
+    each other with similarity 1.0.
+
+    Entries are also partitioned by a `context` key (anything hashable),
+    and a lookup only matches entries stored with the same context.
+    Entries expire `ttl_seconds` after they are written and the least
+    recently used entry is evicted when the cache is full. Signatures live
+    in a numpy array grown up to max_entries, so memory is bounded by it.
+
+    Args:
+        max_entries: Maximum number of entries kept in memory
+        threshold: Minimum estimated Jaccard similarity for a hit
+        ttl_seconds: Time to live for each entry
+        num_perm: MinHash signature length
+        bands: Number of LSH bands (must divide num_perm)
+        min_shingles: Fewest shingles a text needs to be indexed or matched
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        threshold: float = 0.8,
+        ttl_seconds: float = 3600.0,
+        num_perm: int = 60,
+        bands: int = 12,
+        min_shingles: int = 20,
+    ):
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.bands = bands
+        self.min_shingles = min_shingles
+        self._rows = num_perm // bands
+        self._hasher = MinHasher(num_perm)
+
+        # Per-slot storage, grown by doubling up to max_entries
+        self._signatures = np.zeros((min(self.max_entries, 1024), num_perm), dtype=np.uint32)
+        self._expires_at = np.zeros(len(self._signatures), dtype=np.float64)
+        self._contexts: List[int] = []
+        self._values: List[Any] = []
+        self._free: List[int] = []
+        # Bucket key -> slot, or a list of slots when several entries share a bucket
+        self._buckets: Dict[int, Any] = {}
+        # Live slots, least recently used first
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def indexable(self, text: Optional[str]) -> bool:
+        """Whether a text has enough content to be indexed or matched"""
+        return shingle_count(text) >= self.min_shingles
+
+    def _band_keys(self, signature: np.ndarray, context: int) -> List[int]:
+        rows = self._rows
+        raw = signature.tobytes()
+        width = rows * signature.itemsize
+        return [hash((context, band, raw[band * width:(band + 1) * width])) for band in range(self.bands)]
+
+    def get(self, text: str, context: Hashable = None, default: Any = None) -> Any:
+        """Return the value stored for the most similar text, or default if none is similar enough"""
+        found = self.get_with_similarity(text, context)
+        return default if found is None else found[0]
+
+    def get_with_similarity(self, text: str, context: Hashable = None) -> Optional[Tuple[Any, float]]:
+        """Like get, but return (value, estimated similarity), or None on a miss"""
+        if not self.indexable(text):
+            self.skipped += 1
+            return None
+        signature = self._hasher.signature(text)
+        context_key = hash(context)
+        keys = self._band_keys(signature, context_key)
+        with self._lock:
+            candidates = set()
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    continue
+                if type(bucket) is int:
+                    candidates.add(bucket)
+                else:
+                    candidates.update(bucket)
+            candidates = [slot for slot in candidates if self._contexts[slot] == context_key]
+            if not candidates:
+                self.misses += 1
+                return None
+
+            slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            live = self._expires_at[slots] > time.time()
+            for slot in slots[~live].tolist():
+                self._remove(slot)
+                self.expirations += 1
+            slots = slots[live]
+            if not len(slots):
+                self.misses += 1
+                return None
+
+            similarities = (self._signatures[slots] == signature).mean(axis=1)
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            slot = int(slots[best])
+            self._lru.move_to_end(slot)
+            self.hits += 1
+            return self._values[slot], float(similarities[best])
+
+    def set(self, text: str, value: Any, context: Hashable = None) -> None:
+        """Index a text and store its value, evicting the least recently used entry if full (texts too short to index are ignored)"""
+        if not self.indexable(text):
+            self.skipped += 1
+            return
+        signature = self._hasher.signature(text)
+        context_key = hash(context)
+        with self._lock:
+            while len(self._lru) >= self.max_entries:
+                slot, _ = self._lru.popitem(last=False)
+                self._remove(slot, in_lru=False)
+                self.evictions += 1
+
+            slot = self._allocate()
+            self._signatures[slot] = signature
+            self._expires_at[slot] = time.time() + self.ttl_seconds
+            self._contexts[slot] = context_key
+            self._values[slot] = value
+            self._lru[slot] = None
+            for key in self._band_keys(signature, context_key):
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    self._buckets[key] = slot
+                elif type(bucket) is int:
+                    self._buckets[key] = [bucket, slot]
+                else:
+                    bucket.append(slot)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        slot = len(self._values)
+        if slot == len(self._signatures):
+            capacity = min(self.max_entries, 2 * len(self._signatures))
+            self._signatures = np.resize(self._signatures, (capacity, self._signatures.shape[1]))
+            self._expires_at = np.resize(self._expires_at, capacity)
+        self._contexts.append(0)
+        self._values.append(None)
+        return slot
+
+    def _remove(self, slot: int, in_lru: bool = True) -> None:
+        for key in self._band_keys(self._signatures[slot], self._contexts[slot]):
+            bucket = self._buckets.get(key)
+            if bucket == slot:
+                del self._buckets[key]
+            elif type(bucket) is list:
+                bucket.remove(slot)
+                if len(bucket) == 1:
+                    self._buckets[key] = bucket[0]
+        if in_lru:
+            del self._lru[slot]
+        self._values[slot] = None
+        self._expires_at[slot] = 0.0
+        self._free.append(slot)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._lru.clear()
+            self._contexts.clear()
+            self._values.clear()
+            self._free.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from aapp.utils.scheduler import Priority, current_priority, llm_scheduler
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one in-flight call
+
+    While a call for a key is running, later callers with the same key
+    wait for it and receive the same result (or exception) instead of
+    starting their own. Once it finishes the key is forgotten, so the
+    next call runs again.
+
+    The shared call runs as its own task: a caller that is cancelled
+    stops waiting without cancelling the work the others depend on.
+    The task starts in the context of the caller that started it, so
+    its LLM token usage is attributed to that caller's endpoint
+    (current_endpoint); callers that join it add none and are counted
+    in `saved`. Its LLM calls run at the highest priority among its
+    callers: a caller that joins at a higher priority than the task's
+    (an interactive request joining a prefetch) promotes it.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._priorities: Dict[Hashable, Priority] = {}
+
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Identity of the call
+            fn: Zero-argument coroutine function doing the work
+
+        Returns:
+            The result of the shared call
+        """
+        self.calls += 1
+
+        priority = current_priority.get()
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._priorities[key] = priority
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+            if priority < self._priorities[key]:
+                self._priorities[key] = priority
+                llm_scheduler.promote(task, priority)
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._priorities[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters; `saved` is the number of upstream calls avoided"""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "saved": self.shared,
+            "in_flight": len(self._inflight),
+        }
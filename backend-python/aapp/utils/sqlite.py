@@ -0,0 +1,29 @@
+import os
+import sqlite3
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database for the app's local persistence
+
+    Uses the WAL journal so readers never block the writer (and vice
+    versa), with synchronous=NORMAL: a commit is durable against an
+    application crash and only the last transactions can be lost on power
+    failure, and commits don't wait for an fsync. The connection may be
+    shared across threads; callers serialize access to it.
+
+    Args:
+        path: Database file (its directory is created), or ":memory:"
+
+    Returns:
+        The open connection
+    """
+    if path != ":memory:":
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    connection.execute("PRAGMA foreign_keys=ON")
+    return connection
@@ -0,0 +1,69 @@
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+# Kept apart from scoring.py so code that only parses timestamps
+# (the history store and its routes) does not import numpy
+
+_RELATIVE_TIMESTAMP = re.compile(
+    r"^\s*(\d+)\s*(s|sec|secs|second|seconds|m|min|mins|minute|minutes|h|hr|hrs|hour|hours|d|day|days|w|week|weeks)(\s+ago)?\s*$",
+    re.IGNORECASE,
+)
+
+_UNIT_SECONDS = {
+    "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1,
+    "m": 60, "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+    "h": 3600, "hr": 3600, "hrs": 3600, "hour": 3600, "hours": 3600,
+    "d": 86400, "day": 86400, "days": 86400,
+    "w": 604800, "week": 604800, "weeks": 604800,
+}
+
+def parse_timestamp(timestamp: Any, now: Optional[float] = None) -> Optional[float]:
+    """
+    Normalize a tweet timestamp to epoch seconds
+
+    Accepts epoch numbers, datetimes, ISO-8601 strings (naive values are
+    treated as UTC) and relative strings such as "10 minutes ago", "2h"
+    or "just now". An empty, malformed or unrecognized timestamp gives
+    None: its age is unknown, and treating it as posted now would give it
+    the full recency score and keep it in the store forever.
+
+    Args:
+        timestamp: The timestamp to normalize
+        now: Reference epoch time for relative timestamps (defaults to time.time())
+
+    Returns:
+        The timestamp as epoch seconds, or None if it cannot be parsed
+    """
+    now = time.time() if now is None else now
+
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+
+    text = str(timestamp or "").strip()
+    if not text:
+        return None
+    if text.lower() in ("now", "just now"):
+        return now
+
+    # ISO-8601 dates are the common case at ingestion, so try them first
+    if text[:4].isdigit():
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+    match = _RELATIVE_TIMESTAMP.match(text)
+    if match:
+        return now - int(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()]
+
+    return None
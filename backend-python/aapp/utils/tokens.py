@@ -0,0 +1,143 @@
+import math
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from aapp.config import OPENAI_MODEL
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to a character-based estimate
+    tiktoken = None
+
+# Endpoint the current request is attributed to (set per request in main.py)
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="internal")
+
+# Rough characters-per-token ratio for English text when tiktoken is missing
+_CHARS_PER_TOKEN = 4
+
+_encodings: Dict[str, Any] = {}
+
+class TokenBudgetExceeded(Exception):
+    """Raised before an LLM call whose input would exceed the token budget"""
+
+    def __init__(self, label: str, tokens: int, budget: int):
+        self.label = label
+        self.tokens = tokens
+        self.budget = budget
+        super().__init__(f"{label} is {tokens} tokens, over the budget of {budget}")
+
+def _encoding(model: str):
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+def count_tokens(text: Optional[str], model: str = OPENAI_MODEL) -> int:
+    """
+    Count (or estimate) the tokens in a text
+
+    Uses tiktoken when it is installed, otherwise estimates from the
+    character count.
+    """
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text))
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text: Optional[str], max_tokens: int, model: str = OPENAI_MODEL) -> str:
+    """Trim a text to at most max_tokens tokens"""
+    if not text or count_tokens(text, model) <= max_tokens:
+        return text or ""
+    if tiktoken is not None:
+        encoding = _encoding(model)
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    return text[:max_tokens * _CHARS_PER_TOKEN]
+
+def bound_text(text: Optional[str], max_tokens: int, label: str, mode: str = "trim", model: str = OPENAI_MODEL) -> Optional[str]:
+    """
+    Bound a user-supplied text to max_tokens
+
+    Args:
+        text: The text to bound
+        max_tokens: Maximum number of tokens allowed
+        label: Name of the field, used in the error message
+        mode: "trim" to cut the text down, "reject" to raise TokenBudgetExceeded
+
+    Returns:
+        The text, trimmed if needed
+    """
+    if not text:
+        return text
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+    if mode == "reject":
+        raise TokenBudgetExceeded(label, tokens, max_tokens)
+    return truncate_to_tokens(text, max_tokens, model)
+
+def enforce_budget(tokens: int, budget: int, label: str) -> None:
+    """Raise TokenBudgetExceeded if a prompt is over budget (a budget of 0 disables the check)"""
+    if budget and tokens > budget:
+        raise TokenBudgetExceeded(label, tokens, budget)
+
+class UsageTracker:
+    """
+    Aggregates LLM token usage per endpoint
+
+    Each record is one agent run or one direct completion call. Agent
+    runs also report the number of model round trips and tool calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, int]] = {}
+
+    def record(
+        self,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        llm_requests: int = 1,
+        tool_calls: int = 0,
+        endpoint: Optional[str] = None,
+    ) -> None:
+        endpoint = endpoint or current_endpoint.get()
+        with self._lock:
+            usage = self._endpoints.setdefault(endpoint, {
+                "calls": 0,
+                "llm_requests": 0,
+                "tool_calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+            })
+            usage["calls"] += 1
+            usage["llm_requests"] += llm_requests
+            usage["tool_calls"] += tool_calls
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+            usage["total_tokens"] += prompt_tokens + completion_tokens
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-endpoint totals plus per-call averages"""
+        with self._lock:
+            report = {}
+            for endpoint, usage in self._endpoints.items():
+                calls = usage["calls"] or 1
+                report[endpoint] = {
+                    **usage,
+                    "avg_prompt_tokens": usage["prompt_tokens"] / calls,
+                    "avg_completion_tokens": usage["completion_tokens"] / calls,
+                    "avg_llm_requests": usage["llm_requests"] / calls,
+                }
+            return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+# Process-wide tracker
+usage_tracker = UsageTracker()
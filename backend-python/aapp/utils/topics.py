@@ -0,0 +1,202 @@
+import json
+import string
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from aapp.config import TOPIC_TAXONOMY_PATH
+
+# Topic -> keywords. Keywords match whole words; multi-word keywords match
+# consecutive words. Override with a JSON file at TOPIC_TAXONOMY_PATH.
+DEFAULT_TAXONOMY: Dict[str, List[str]] = {
+    "Technology": [
+        "ai", "tech", "technology", "software", "code", "coding", "programming",
+        "developer", "developers", "machine learning", "open source",
+    ],
+    "Business": [
+        "business", "startup", "startups", "entrepreneur", "entrepreneurs",
+        "funding", "founder", "founders", "venture capital",
+    ],
+}
+
+# Punctuation becomes whitespace before splitting, so "#AI" and "AI," both yield "ai"
+_SEPARATORS = str.maketrans({ch: " " for ch in string.punctuation.replace("_", "") + "\u2018\u2019\u201c\u201d\u2013\u2014\u2026"})
+
+# Bound on cached query classifiers built by matches_any
+_MAX_QUERIES = 256
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase a text and split it into words"""
+    return (text or "").lower().translate(_SEPARATORS).split()
+
+class TopicClassifier:
+    """
+    Keyword topic classifier compiled once from a taxonomy
+
+    Keywords are compiled into a word index: single-word keywords map
+    straight to a bitmask of their topics, multi-word keywords are keyed by
+    their first word and checked against the words that follow. A text is
+    split into words once and intersected with the index, so the cost does
+    not grow with the size of the taxonomy and matching respects word
+    boundaries ("ai" matches "AI" and "#AI" but not "said").
+    """
+
+    def __init__(self, taxonomy: Dict[str, Iterable[str]]):
+        self.taxonomy = {topic: list(keywords) for topic, keywords in taxonomy.items()}
+        self.topics = list(self.taxonomy)
+        self._words: Dict[str, int] = {}
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+        self._keyword_bits: Dict[str, int] = {}
+        self._decoded: Dict[int, List[str]] = {0: []}
+        self._queries: Dict[Tuple[str, ...], "TopicClassifier"] = {}
+
+        for index, keywords in enumerate(self.taxonomy.values()):
+            bit = 1 << index
+            for keyword in keywords:
+                words = tuple(tokenize(keyword))
+                if words:
+                    normalized = " ".join(words)
+                    self._keyword_bits[normalized] = self._keyword_bits.get(normalized, 0) | bit
+                if len(words) == 1:
+                    self._words[words[0]] = self._words.get(words[0], 0) | bit
+                elif words:
+                    self._phrases.setdefault(words[0], []).append((words[1:], bit))
+
+        # Every word that can start a match
+        self._index = frozenset(self._words) | frozenset(self._phrases)
+
+    def mask(self, text: Optional[str]) -> int:
+        """Return the bitmask of topics found in a text (bit i is self.topics[i])"""
+        words = tokenize(text)
+        hits = self._index.intersection(words)
+        if not hits:
+            return 0
+
+        mask = 0
+        for word in hits:
+            mask |= self._words.get(word, 0)
+            if word in self._phrases:
+                mask |= self._phrase_mask(words, word)
+        return mask
+
+    def _phrase_mask(self, words: List[str], first: str) -> int:
+        """Match the multi-word keywords starting with `first` at each of its positions"""
+        mask = 0
+        for i, word in enumerate(words):
+            if word != first:
+                continue
+            for rest, bit in self._phrases[first]:
+                if tuple(words[i + 1:i + 1 + len(rest)]) == rest:
+                    mask |= bit
+        return mask
+
+    def keywords(self, text: Optional[str]) -> Set[str]:
+        """Return the taxonomy keywords found in a text (multi-word ones space-joined)"""
+        words = tokenize(text)
+        hits = self._index.intersection(words)
+        found = {word for word in hits if word in self._words}
+        for first in hits.intersection(self._phrases):
+            for i, word in enumerate(words):
+                if word != first:
+                    continue
+                for rest, _ in self._phrases[first]:
+                    if tuple(words[i + 1:i + 1 + len(rest)]) == rest:
+                        found.add(" ".join((first,) + rest))
+        return found
+
+    def all_keywords(self) -> List[str]:
+        """Every keyword in the taxonomy, normalized as keywords() returns them"""
+        return list(self._keyword_bits)
+
+    def keyword_mask(self, keywords: Iterable[str]) -> int:
+        """Return the topic bitmask of a set of keywords found by keywords()"""
+        mask = 0
+        for keyword in keywords:
+            mask |= self._keyword_bits.get(keyword, 0)
+        return mask
+
+    def resolve(self, terms: Sequence[str]) -> Tuple[int, Set[str], List[str]]:
+        """
+        Split requested topic terms by how they can be answered from an index
+
+        Returns:
+            (bitmask of terms naming a taxonomy topic, terms that are taxonomy
+            keywords, remaining terms that need a text match)
+        """
+        names = {topic.lower(): index for index, topic in enumerate(self.topics)}
+        mask = 0
+        keywords: Set[str] = set()
+        other: List[str] = []
+        for term in terms:
+            if not term or not term.strip():
+                continue
+            normalized = " ".join(tokenize(term))
+            if term.strip().lower() in names:
+                mask |= 1 << names[term.strip().lower()]
+            elif normalized in self._keyword_bits:
+                keywords.add(normalized)
+            else:
+                other.append(term)
+        return mask, keywords, other
+
+    def decode(self, mask: int) -> List[str]:
+        """Turn a topic bitmask into topic names, in taxonomy order"""
+        topics = self._decoded.get(mask)
+        if topics is None:
+            topics = [topic for index, topic in enumerate(self.topics) if mask >> index & 1]
+            self._decoded[mask] = topics
+        return list(topics)
+
+    def classify(self, text: Optional[str]) -> List[str]:
+        """Return the topics of one text"""
+        return self.decode(self.mask(text))
+
+    def classify_many(self, texts: Sequence[Optional[str]]) -> List[List[str]]:
+        """Return the topics of each text"""
+        return [self.decode(mask) for mask in self.masks(texts)]
+
+    def masks(self, texts: Sequence[Optional[str]]) -> List[int]:
+        """Return the topic bitmask of each text"""
+        return [self.mask(text) for text in texts]
+
+    def query(self, topics: Sequence[str]) -> "TopicClassifier":
+        """
+        Build (and cache) a classifier for the topics a client asked for
+
+        A requested topic that names a taxonomy topic (case-insensitively)
+        uses that topic's keywords; anything else is matched as a keyword.
+        """
+        key = tuple(sorted({topic.strip().lower() for topic in topics if topic and topic.strip()}))
+        classifier = self._queries.get(key)
+        if classifier is None:
+            keywords = {topic.lower(): keywords for topic, keywords in self.taxonomy.items()}
+            classifier = TopicClassifier({name: keywords.get(name, [name]) for name in key})
+            if len(self._queries) >= _MAX_QUERIES:
+                self._queries.clear()
+            self._queries[key] = classifier
+        return classifier
+
+    def matches_any(self, texts: Sequence[Optional[str]], topics: Sequence[str]) -> List[bool]:
+        """
+        Return, for each text, whether it matches any of the requested topics
+
+        An empty topic list matches everything.
+        """
+        classifier = self.query(topics)
+        if not classifier.topics:
+            return [True] * len(texts)
+        return [classifier.mask(text) != 0 for text in texts]
+
+def load_taxonomy(path: str = TOPIC_TAXONOMY_PATH) -> Dict[str, List[str]]:
+    """Load a {topic: [keywords]} taxonomy from JSON, or the default one"""
+    if not path:
+        return DEFAULT_TAXONOMY
+    with open(path) as f:
+        return json.load(f)
+
+_classifier: Optional[TopicClassifier] = None
+
+def get_topic_classifier() -> TopicClassifier:
+    """Return the shared classifier, compiling the taxonomy on first use"""
+    global _classifier
+    if _classifier is None:
+        _classifier = TopicClassifier(load_taxonomy())
+    return _classifier
@@ -1,7 +1,10 @@
 import re
-from datetime import datetime, timedelta
+import time
 from typing import List, Dict, Any
 
+from aapp.utils.scoring import normalize_timestamps, score_viral_potential
+from aapp.utils.topics import get_topic_classifier
+
 def calculate_viral_potential(metrics: Dict[str, int], timestamp: str, is_verified: bool = False) -> float:
     """
     Calculate viral potential score for a tweet based on:
@@ -9,33 +12,22 @@ def calculate_viral_potential(metrics: Dict[str, int], timestamp: str, is_verifi
     - Recency (newer tweets have higher potential)
     - Verified status (verified accounts have higher potential)
     
+    Delegates to the vectorized engine in utils/scoring.py; use
+    score_viral_potential directly when scoring many tweets.
+    
     Returns a score between 0 and 1
     """
-    # Get metrics
-    likes = metrics.get('likes', 0)
-    replies = metrics.get('replies', 0)
-    retweets = metrics.get('retweets', 0)
-    views = metrics.get('views', 0) or likes * 100  # Estimate views if not available
-    
-    # Calculate engagement rate (engagement / views)
-    total_engagement = likes + replies * 2 + retweets * 3  # Weight replies and retweets higher
-    engagement_rate = total_engagement / max(views, 1) if views > 0 else 0
-    
-    # Calculate recency (1.0 for very recent, decreasing over time)
-    tweet_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-    now = datetime.now().astimezone()
-    hours_ago = (now - tweet_time).total_seconds() / 3600
-    recency_factor = max(0, 1 - (hours_ago / 72))  # Linear decay over 3 days
-    
-    # Calculate final score
-    base_score = engagement_rate * 0.7 + recency_factor * 0.3
-    
-    # Apply verified bonus
-    if is_verified:
-        base_score *= 1.2
-    
-    # Ensure score is between 0 and 1
-    return min(1.0, base_score)
+    now = time.time()
+    scores = score_viral_potential(
+        likes=[metrics.get('likes', 0)],
+        replies=[metrics.get('replies', 0)],
+        retweets=[metrics.get('retweets', 0)],
+        views=[metrics.get('views', 0)],
+        created_at=normalize_timestamps([timestamp], now),
+        verified=[is_verified],
+        now=now,
+    )
+    return float(scores[0])
 
 def extract_hashtags(content: str) -> List[str]:
     """Extract hashtags from tweet content"""
@@ -47,21 +39,10 @@ def extract_mentions(content: str) -> List[str]:
 
 def get_tweet_topics(content: str) -> List[str]:
     """
-    Return a simple list of possible topics from tweet content
-    This is a simple implementation - in a real system, topic detection
-    would use NLP or could be part of the agent functionality
-    """
-    # Simple keyword matching for demo purposes
-    topics = []
-    
-    # Technology related
-    if any(keyword in content.lower() for keyword in ['ai', 'tech', 'software', 'code', 'programming']):
-        topics.append('Technology')
+    Return the topics of tweet content
     
-    # Business related
-    if any(keyword in content.lower() for keyword in ['business', 'startup', 'entrepreneur', 'funding']):
-        topics.append('Business')
-    
-    # Add more topics as needed
-    
-    return topics 
\ No newline at end of file
+    Uses the shared TopicClassifier (utils/topics.py), which matches the
+    taxonomy's keywords on whole words; use its classify_many to classify
+    many tweets at once.
+    """
+    return get_topic_classifier().classify(content)
@@ -1,22 +1,25 @@
 from typing import List
 from aapp.models import Tweet, Reply
 
+def tweet_fields_valid(tweet_id: str, content: str, author_name: str, author_handle: str) -> bool:
+    """
+    Check the fields validate_tweet requires, given as plain values
+
+    Shared with the columnar tweet pipeline (store/columnar.py) and the
+    CPU worker pool (utils/executor.py), which check plain fields without
+    Tweet models.
+    """
+    return bool(tweet_id and content and author_name and author_handle)
+
 def validate_tweet(tweet: Tweet) -> bool:
     """
     Validate that a tweet has the required fields
     """
-    if not tweet.id or not tweet.content or not tweet.author:
+    if not tweet.author or not tweet.metrics:
         return False
     
-    # Ensure tweet has proper author information
-    if not tweet.author.name or not tweet.author.handle:
-        return False
-    
-    # Ensure metrics are available
-    if not tweet.metrics:
-        return False
-    
-    return True
+    # Ensure tweet has an id, content and proper author information
+    return tweet_fields_valid(tweet.id, tweet.content, tweet.author.name, tweet.author.handle)
 
 def validate_tweets(tweets: List[Tweet]) -> List[Tweet]:
     """
@@ -24,18 +27,21 @@ def validate_tweets(tweets: List[Tweet]) -> List[Tweet]:
     """
     return [tweet for tweet in tweets if validate_tweet(tweet)]
 
-def validate_reply(reply: Reply) -> bool:
+def reply_fields_valid(content: str, estimated_engagement: int) -> bool:
     """
-    Validate that a reply has the required fields
+    Check the fields validate_reply requires, given as plain values
     """
-    if not reply.content:
+    if not content:
         return False
     
     # Replies should have some estimated engagement
-    if reply.estimated_engagement < 0:
-        return False
-    
-    return True
+    return estimated_engagement >= 0
+
+def validate_reply(reply: Reply) -> bool:
+    """
+    Validate that a reply has the required fields
+    """
+    return reply_fields_valid(reply.content, reply.estimated_engagement)
 
 def validate_replies(replies: List[Reply]) -> List[Reply]:
     """
@@ -0,0 +1,4 @@
+# Offline benchmarks for the Reply Guy backend
+#
+# Run from the backend-python directory, e.g.:
+#   python -m benchmarks.bench_llm_client
@@ -0,0 +1,146 @@
+"""
+Tweet source scans and store ingestion in a thread vs on the CPU worker pool.
+
+Writes N tweets to an NDJSON file and, for each way of running the
+pipeline, times
+  - search:  a TweetSource search (decode, validate, score and filter
+             every record, keep the top 10)
+  - ingest:  loading every tweet into a TweetStore
+together with the longest event loop stall a 1 ms ticker sees meanwhile.
+"thread" is how both ran before the pool: the whole pipeline in
+asyncio.to_thread. The pool rows run it through BulkExecutor with 1, 2,
+4, ... workers up to the CPU count (asearch/abatches; the store inserts
+stay in a thread), started and warmed before they are timed. What stall
+is left during an ingest is mostly the garbage collector's full passes
+over the objects the growing store holds, which no pool moves.
+
+Then times the map() operations on N texts, tweets or replies, inline
+and on the largest pool: lexicon sentiment, reply evaluation, hashtag
+and mention extraction, and tweet and reply validation (the pool's
+results are checked against the plain functions).
+
+Usage:
+    python -m benchmarks.bench_executor [--tweets 200000] [--workers 1,2,4] [--chunk-size 5000]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import tempfile
+import time
+
+from aapp.models import Reply, Tweet, TweetFilterRequest
+from aapp.sources.ndjson import NDJSONTweetSource
+from aapp.store.memory import TweetStore
+from aapp.utils.executor import BulkExecutor
+from aapp.utils.tweet_utils import extract_hashtags, extract_mentions
+from aapp.utils.validation import validate_replies, validate_tweets
+from benchmarks.hot_paths import _reply_dicts, _tweet_dicts
+
+CRITERIA = TweetFilterRequest(topics=["Technology", "Business"], min_engagement=100, min_viral_potential=0, max_results=10)
+
+async def max_stall(call):
+    """Run `call`, returning its result, its wall time and the longest gap between ticks of a 1 ms ticker"""
+    stalls = [0.0]
+    done = False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    result = await call()
+    elapsed = time.perf_counter() - start
+    done = True
+    await task
+    return result, elapsed, max(stalls)
+
+async def ingest_in_thread(path: str, chunk_size: int) -> int:
+    store = TweetStore(max_tweets=10_000_000)
+    return await asyncio.to_thread(store.add_batches, NDJSONTweetSource(path, chunk_size).batches())
+
+async def ingest_on_pool(path: str, chunk_size: int, executor: BulkExecutor) -> int:
+    store = TweetStore(max_tweets=10_000_000)
+    now = time.time()
+    count = 0
+    async for batch, keywords in NDJSONTweetSource(path, chunk_size).abatches(executor, now, with_keywords=True):
+        count += await asyncio.to_thread(store.add_batch, batch, now, keywords)
+    return count
+
+def row(name: str, count: int, results) -> str:
+    cells = "".join(f"{count / elapsed:>12,.0f}/s {stall * 1000:8.1f} ms" for _, elapsed, stall in results)
+    return f"  {name:<12}{cells}"
+
+async def run(count: int, workers_list, chunk_size: int) -> None:
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "tweets.ndjson")
+        tweets = _tweet_dicts(count)
+        with open(path, "w") as f:
+            for tweet in tweets:
+                f.write(json.dumps(tweet) + "\n")
+
+        print(f"{count:,} tweets in chunks of {chunk_size:,}, {os.cpu_count()} CPUs; throughput and longest event loop stall")
+        print(f"  {'':<12}{'search':>26}{'ingest':>26}")
+        search = lambda: asyncio.to_thread(NDJSONTweetSource(path, chunk_size).search, CRITERIA)
+        baseline = [await max_stall(search), await max_stall(lambda: ingest_in_thread(path, chunk_size))]
+        print(row("thread", count, baseline))
+
+        pools = {}
+        for workers in workers_list:
+            executor = BulkExecutor(workers=workers)
+            await executor.run(len, [])
+            search = lambda: NDJSONTweetSource(path, chunk_size).asearch(CRITERIA, executor=executor)
+            results = [await max_stall(search), await max_stall(lambda: ingest_on_pool(path, chunk_size, executor))]
+            assert [tweet.id for tweet in results[0][0]] == [tweet.id for tweet in baseline[0][0]]
+            assert results[1][0] == baseline[1][0]
+            print(row(f"{workers} workers", count, results))
+            pools[workers] = executor
+
+        texts = [tweet["content"] for tweet in tweets]
+        tweet_models = [Tweet.model_validate(tweet) for tweet in tweets]
+        reply_models = [Reply.model_validate(reply) for reply in _reply_dicts(count)]
+        executor = pools[max(pools)]
+        inline = BulkExecutor(workers=0)
+        print(f"map() on {count:,} items, inline vs {max(pools)} workers")
+        for name, call, expected in (
+            ("sentiment", lambda ex: ex.sentiment(texts), None),
+            ("evaluate", lambda ex: ex.evaluate_replies(texts, texts[0]), None),
+            ("hashtags", lambda ex: ex.extract_hashtags(texts), [extract_hashtags(text) for text in texts]),
+            ("mentions", lambda ex: ex.extract_mentions(texts), [extract_mentions(text) for text in texts]),
+            ("val tweets", lambda ex: ex.validate_tweets(tweet_models), validate_tweets(tweet_models)),
+            ("val replies", lambda ex: ex.validate_replies(reply_models), validate_replies(reply_models)),
+        ):
+            # The previous case's garbage is collected here, not during this one's timing
+            gc.collect()
+            inline_result, inline_time, inline_stall = await max_stall(lambda: call(inline))
+            gc.collect()
+            pool_result, pool_time, pool_stall = await max_stall(lambda: call(executor))
+            assert pool_result == inline_result and (expected is None or pool_result == expected)
+            print(
+                f"  {name:<12}inline {inline_time * 1000:8.1f} ms (stall {inline_stall * 1000:7.1f} ms)"
+                f"  pool {pool_time * 1000:8.1f} ms (stall {pool_stall * 1000:7.1f} ms)"
+            )
+
+        for pool in pools.values():
+            pool.shutdown()
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({min(2 ** i, cpus) for i in range(cpus.bit_length() + 1)})
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=200_000)
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="comma-separated pool sizes")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    workers_list = [int(workers) for workers in args.workers.split(",")]
+    asyncio.run(run(args.tweets, workers_list, args.chunk_size))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Writing and exporting the tweet/reply history at 100k rows.
+
+Writes N tweets and N replies, arriving the way requests produce them
+(a search result or a reply set per call), three ways:
+  - commit per row, rollback journal (SQLite's defaults): what a request
+    would wait for if it wrote its own rows; timed on --direct-rows rows
+    because every commit is an fsync
+  - commit per row, WAL with synchronous=NORMAL
+  - HistoryStore: the request only queues its rows and the background
+    writer commits whatever has queued up in one transaction
+
+and reports rows/s plus, for the HistoryStore, how long the calling
+request is held (p50/p99 per call). Then streams the tables back with
+iter_tweets/iter_replies and times an indexed author lookup.
+
+Usage:
+    python -m benchmarks.bench_history [--rows 100000] [--per-call 10] [--direct-rows 2000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from aapp.models import Reply, Tweet, TweetAuthor, TweetMetrics
+from aapp.store.history import _INSERT_REPLY, _SCHEMA, _UPSERT_TWEET, HistoryStore, _tweet_row
+from aapp.utils.sqlite import connect
+
+def make_tweets(count: int, rng: random.Random):
+    now = time.time()
+    return [
+        Tweet(
+            id=str(i),
+            author=TweetAuthor(name=f"User {i % 5000}", handle=f"user{i % 5000}", avatar="", is_verified=i % 7 == 0),
+            content=f"Tweet number {i} about shipping software and the tools we use",
+            timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - rng.randrange(86400 * 3))),
+            metrics=TweetMetrics(likes=rng.randrange(5000), replies=rng.randrange(500), retweets=rng.randrange(1000), views=rng.randrange(10 ** 6)),
+            viral_potential=rng.randrange(101),
+        )
+        for i in range(count)
+    ]
+
+def make_replies(count: int):
+    return [
+        Reply(content=f"Reply {i}: what made you pick that tool?", strengths=["Asks a question"], estimated_engagement=i % 101)
+        for i in range(count)
+    ]
+
+def direct(path: str, tweets, replies, wal: bool) -> float:
+    """Rows/s committing each row on its own"""
+    connection = connect(path) if wal else sqlite3.connect(path)
+    connection.executescript(_SCHEMA)
+    start = time.perf_counter()
+    now = time.time()
+    for tweet in tweets:
+        with connection:
+            connection.execute(_UPSERT_TWEET, _tweet_row(tweet, now))
+    for i, reply in enumerate(replies):
+        with connection:
+            connection.execute(_INSERT_REPLY, (str(i), "author", reply.content, '["x"]', reply.estimated_engagement, "fast", now))
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return (len(tweets) + len(replies)) / elapsed
+
+def batched(path: str, tweets, replies, per_call: int):
+    # Room for the whole burst: this measures writing, not shedding load
+    history = HistoryStore(path, max_pending=2 * len(tweets) // per_call + 1)
+    calls = []
+    start = time.perf_counter()
+    for i in range(0, len(tweets), per_call):
+        call = time.perf_counter()
+        history.add_tweets(tweets[i:i + per_call])
+        calls.append(time.perf_counter() - call)
+    for i in range(0, len(replies), per_call):
+        call = time.perf_counter()
+        history.add_replies(str(i), f"user{i % 5000}", replies[i:i + per_call], "fast")
+        calls.append(time.perf_counter() - call)
+    queued = time.perf_counter() - start
+    history.flush()
+    elapsed = time.perf_counter() - start
+    return history, calls, queued, elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--per-call", type=int, default=10)
+    parser.add_argument("--direct-rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    tweets = make_tweets(args.rows, rng)
+    replies = make_replies(args.rows)
+    sample = args.direct_rows // 2
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{args.rows:,} tweets + {args.rows:,} replies, {args.per_call} rows per call")
+        rate = direct(os.path.join(directory, "journal.sqlite3"), tweets[:sample], replies[:sample], wal=False)
+        print(f"  commit per row, rollback journal  {rate:9,.0f} rows/s  ({2 * sample:,} rows)")
+        rate = direct(os.path.join(directory, "wal.sqlite3"), tweets[:sample], replies[:sample], wal=True)
+        print(f"  commit per row, WAL               {rate:9,.0f} rows/s  ({2 * sample:,} rows)")
+
+        history, calls, queued, elapsed = batched(os.path.join(directory, "history.sqlite3"), tweets, replies, args.per_call)
+        calls.sort()
+        stats = history.stats()
+        print(
+            f"  HistoryStore background writer   {2 * args.rows / elapsed:9,.0f} rows/s  "
+            f"({stats['batches']} transactions, {stats['dropped']} dropped)"
+        )
+        print(
+            f"    held per call: p50 {statistics.median(calls) * 1e6:5.1f} us  p99 {calls[int(len(calls) * 0.99)] * 1e6:5.1f} us  "
+            f"(all {len(calls):,} calls queued in {queued:.2f}s, written after {elapsed:.2f}s)"
+        )
+
+        for name, iterate in (("tweets", history.iter_tweets), ("replies", history.iter_replies)):
+            start = time.perf_counter()
+            count = sum(1 for _ in iterate())
+            elapsed = time.perf_counter() - start
+            # tracemalloc slows allocation down, so memory is traced on a separate pass
+            tracemalloc.start()
+            for _ in iterate():
+                pass
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"  export {name:<8} {count:9,} rows in {elapsed:5.2f}s  {count / elapsed:9,.0f} rows/s  peak {peak / 1e6:5.1f} MB")
+
+        start = time.perf_counter()
+        count = sum(1 for _ in history.iter_tweets(author="user42"))
+        print(f"  tweets by one author (index): {count} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
+        history.close()
+
+if __name__ == "__main__":
+    main()
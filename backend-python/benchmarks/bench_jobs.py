@@ -0,0 +1,187 @@
+"""
+Load test of the job API against a stand-in LLM.
+
+Submits --jobs concurrent jobs of --items reply requests each (fast mode,
+one model call per item) to POST /api/jobs through the ASGI app, polls
+GET /api/jobs/{id} until all of them complete, and reports:
+  - submit latency (the request returns before any item has run; the
+    app, its workers and the stand-in share one event loop, so this
+    includes waiting behind the workers of the jobs already submitted)
+  - poll latency while the jobs run and partial results grow
+  - item throughput against the ceiling of --workers concurrent calls at
+    the stand-in's latency
+
+then checks restarts: a job is interrupted halfway by stopping its
+manager, and a new manager over the same SQLite file finishes it,
+running only the items that had no stored result. Last, a job with a
+search the stand-in cannot answer (it plays the reply agent, so the
+TweetFinder agent's run fails) must count that item as failed, with its
+error, rather than as a search that found nothing.
+
+The LLM scheduler is unlimited here so the workers, not the rate limits,
+bound throughput; the reply caches are off so every item makes its call.
+
+Usage:
+    python -m benchmarks.bench_jobs [--jobs 4] [--items 100] [--workers 8] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+SCRATCH = tempfile.mkdtemp(prefix="bench_jobs_")
+# Before aapp is imported, so the app's job store lives in the scratch directory
+os.environ["JOB_DB_PATH"] = os.path.join(SCRATCH, "jobs.sqlite3")
+
+import httpx
+from agents import set_default_openai_api, set_tracing_disabled
+
+from aapp.aagents import runner
+from aapp.config import JOB_PAGE_SIZE
+from aapp.dependencies import get_job_manager, get_reply_generator, get_tweet_finder
+from aapp.jobs import JobManager, JobStore
+from aapp.main import app
+from aapp.utils import openai_utils
+from aapp.utils.llm_client import create_openai_client, set_openai_client, close_openai_client
+from aapp.utils.scheduler import LLMScheduler
+from benchmarks.bench_reply_modes import responder
+from benchmarks.standin import FakeLLMServer
+
+def job_body(job: int, items: int):
+    return {
+        "replies": [
+            {
+                "tweet_id": f"{job}-{i}",
+                "tweet_content": f"Shipping a new build system this week, job {job} take {i}",
+                "tweet_author": "builder",
+                "num_replies": 3,
+                "mode": "fast",
+            }
+            for i in range(items)
+        ]
+    }
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:7.1f} ms"
+
+async def wait_for(client: httpx.AsyncClient, job_id: str, poll_timings, until=lambda job: job["status"] == "completed"):
+    while True:
+        start = time.perf_counter()
+        response = await client.get(f"/api/jobs/{job_id}")
+        poll_timings.append(time.perf_counter() - start)
+        job = response.json()
+        if until(job):
+            return job
+        await asyncio.sleep(0.05)
+
+async def load_test(client: httpx.AsyncClient, server: FakeLLMServer, jobs: int, items: int, workers: int, latency: float) -> None:
+    before = server.requests
+    started = time.perf_counter()
+    submit_timings = []
+
+    async def submit(job: int) -> str:
+        start = time.perf_counter()
+        response = await client.post("/api/jobs", json=job_body(job, items))
+        submit_timings.append(time.perf_counter() - start)
+        assert response.status_code == 202, response.text
+        return response.json()["id"]
+
+    job_ids = await asyncio.gather(*(submit(job) for job in range(jobs)))
+    poll_timings = []
+    finished = await asyncio.gather(*(wait_for(client, job_id, poll_timings) for job_id in job_ids))
+    elapsed = time.perf_counter() - started
+
+    total = jobs * items
+    succeeded = sum(job["succeeded"] for job in finished)
+    assert all(len(job["results"]) == min(items, JOB_PAGE_SIZE) for job in finished)
+    ceiling = workers / latency
+    print(f"{jobs} jobs x {items} items, {workers} workers, {latency * 1000:.0f} ms per LLM call")
+    print(f"  submit  p50 {ms(statistics.median(submit_timings))}  max {ms(max(submit_timings))}")
+    print(f"  poll    p50 {ms(statistics.median(poll_timings))}  max {ms(max(poll_timings))}  ({len(poll_timings)} polls)")
+    print(
+        f"  {succeeded}/{total} items succeeded in {elapsed:.1f}s: {total / elapsed:5.1f} items/s "
+        f"(ceiling {ceiling:.0f}/s), {server.requests - before} LLM calls"
+    )
+
+    start = time.perf_counter()
+    response = await client.get(f"/api/jobs/{job_ids[0]}")
+    print(f"  reading a completed {items}-item job ({JOB_PAGE_SIZE} results per page): {ms(time.perf_counter() - start)}, {len(response.content) / 1024:.0f} kB")
+
+async def restart(client: httpx.AsyncClient, server: FakeLLMServer, items: int, workers: int) -> JobManager:
+    manager = get_job_manager()
+    response = await client.post("/api/jobs", json=job_body(-1, items))
+    job_id = response.json()["id"]
+    await wait_for(client, job_id, [], until=lambda job: job["succeeded"] >= items // 2)
+    await manager.stop()
+    manager.store.close()
+
+    # A new process would build a fresh manager over the same database
+    before = server.requests
+    restarted = JobManager(JobStore(manager.store.path), get_tweet_finder, get_reply_generator, workers=workers)
+    app.dependency_overrides[get_job_manager] = lambda: restarted
+    done_before = (await restarted.get(job_id)).succeeded
+    await restarted.start()
+    job = await wait_for(client, job_id, [])
+    print(
+        f"restart after {done_before}/{items} items: finished with {job['succeeded']} succeeded, "
+        f"{len(job['results'])} results, {server.requests - before} LLM calls after the restart"
+    )
+    return restarted
+
+async def failing_search(client: httpx.AsyncClient) -> None:
+    search = {"topics": ["Technology"], "max_results": 5}
+    body = {"searches": [search], "replies": job_body(-2, 1)["replies"]}
+    response = await client.post("/api/jobs", json=body)
+    job = await wait_for(client, response.json()["id"], [])
+    search_result, reply_result = job["results"]
+    assert job["failed"] == 1 and job["succeeded"] == 1, job
+    assert search_result["error"] and not search_result["tweets"], search_result
+    assert reply_result["error"] is None, reply_result
+    print(f"failing search: counted as failed, error {search_result['error'][:60]!r}")
+
+async def run(jobs: int, items: int, workers: int, latency: float) -> None:
+    # The stand-in only speaks chat completions, and traces have nowhere to go
+    set_default_openai_api("chat_completions")
+    set_tracing_disabled(True)
+    unlimited = LLMScheduler(max_queue=jobs * items)
+    openai_utils.llm_scheduler = unlimited
+    runner.llm_scheduler = unlimited
+
+    with FakeLLMServer(latency=latency, responder=responder) as server:
+        # Set before the first agent is built, so it never looks for an API key
+        set_openai_client(create_openai_client(api_key="stand-in", base_url=server.base_url))
+        reply_generator = get_reply_generator()
+        reply_generator.cache = None
+        reply_generator.similar = None
+        get_job_manager().workers = workers
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            await load_test(client, server, jobs, items, workers, latency)
+            manager = await restart(client, server, items, workers)
+            await failing_search(client)
+        await manager.stop()
+        manager.store.close()
+        await close_openai_client()
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("replyguy").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args.jobs, args.items, args.workers, args.latency))
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
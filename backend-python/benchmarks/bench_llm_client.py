@@ -0,0 +1,74 @@
+"""
+Concurrency benchmark for the shared async LLM client.
+
+Fires N completions at a local stand-in with simulated latency and
+compares:
+  - blocking: the old pattern, a sync OpenAI client inside an async function
+  - serial:   the shared async client, one request after another
+  - pooled:   the shared async client, N requests gathered concurrently
+
+With the pooled client N requests should finish in about the time of one.
+
+Usage:
+    python -m benchmarks.bench_llm_client [--requests 20] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from openai import OpenAI
+
+from aapp.utils import openai_utils
+from aapp.utils.llm_client import create_openai_client, set_openai_client, close_openai_client
+from aapp.utils.openai_utils import generate_completion
+from aapp.utils.scheduler import LLMScheduler
+from benchmarks.standin import FakeLLMServer
+
+async def _blocking(base_url: str, n: int) -> None:
+    client = OpenAI(api_key="stand-in", base_url=base_url)
+
+    async def call():
+        client.chat.completions.create(model="stand-in", messages=[{"role": "user", "content": "hi"}])
+
+    await asyncio.gather(*(call() for _ in range(n)))
+
+async def _serial(n: int) -> None:
+    for _ in range(n):
+        await generate_completion("hi", model="stand-in")
+
+async def _pooled(n: int) -> None:
+    await asyncio.gather(*(generate_completion("hi", model="stand-in") for _ in range(n)))
+
+async def run(n: int, latency: float) -> None:
+    with FakeLLMServer(latency=latency) as server:
+        set_openai_client(create_openai_client(api_key="stand-in", base_url=server.base_url))
+        # Measure the client, not the rate limits (see bench_llm_scheduler for those)
+        openai_utils.llm_scheduler = LLMScheduler()
+
+        # Warm the pool so connection setup is not counted
+        await generate_completion("warmup", model="stand-in")
+
+        print(f"{n} requests, {latency * 1000:.0f} ms simulated latency")
+        for name, coro in (
+            ("blocking", lambda: _blocking(server.base_url, n)),
+            ("serial", lambda: _serial(n)),
+            ("pooled", lambda: _pooled(n)),
+        ):
+            start = time.perf_counter()
+            await coro()
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<9} {elapsed:7.3f}s  ({elapsed / latency:5.1f}x one request)")
+
+        await close_openai_client()
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+if __name__ == "__main__":
+    main()
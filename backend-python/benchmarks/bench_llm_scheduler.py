@@ -0,0 +1,106 @@
+"""
+A burst of LLM calls against a rate limited provider, with and without the scheduler.
+
+Sends N concurrent completions (generate_completion) to a local stand-in
+that accepts --provider-rps requests per second and answers the rest with
+a 429 and Retry-After, the way a provider does past its rate limit:
+  - unpaced:    no limits and no retries, i.e. every call goes straight
+                out and a 429 fails the call (what used to come back as
+                an empty result)
+  - retry only: no limits, 429s retried with jittered backoff
+  - scheduled:  requests paced by the token bucket to 90% of the
+                provider's rate (leaving headroom, as the configured
+                limits should), retries on
+
+then a mixed burst through the scheduled configuration: batch calls
+first, interactive calls a moment later, to show interactive calls
+overtaking the queued batch work.
+
+Usage:
+    python -m benchmarks.bench_llm_scheduler [--calls 60] [--provider-rps 10] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from aapp.utils import openai_utils
+from aapp.utils.llm_client import create_openai_client, set_openai_client, close_openai_client
+from aapp.utils.scheduler import LLMScheduler, LLMUnavailable, Priority, llm_priority
+from benchmarks.standin import FakeLLMServer
+
+async def timed_call(i: int, priority: Priority):
+    start = time.perf_counter()
+    try:
+        with llm_priority(priority):
+            await openai_utils.generate_completion(f"Say hello to caller {i}", max_tokens=50)
+        ok = True
+    except LLMUnavailable:
+        ok = False
+    return ok, time.perf_counter() - start, priority
+
+async def burst(server: FakeLLMServer, scheduler: LLMScheduler, calls, stagger: float = 0.0):
+    """Run calls (a list of priorities) concurrently; interactive ones start after `stagger` seconds"""
+    openai_utils.llm_scheduler = scheduler
+    # Let the provider's window from the previous burst refill
+    await asyncio.sleep(1.0)
+    before = server.rate_limited
+
+    async def start(i: int, priority: Priority):
+        if priority == Priority.INTERACTIVE:
+            await asyncio.sleep(stagger)
+        return await timed_call(i, priority)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(start(i, priority) for i, priority in enumerate(calls)))
+    return results, time.perf_counter() - started, server.rate_limited - before
+
+def paced(provider_rps: int, calls: int) -> LLMScheduler:
+    return LLMScheduler(requests_per_minute=provider_rps * 60 * 0.9, burst_seconds=1, max_retries=8, max_queue=calls)
+
+def p50_ms(timings):
+    return statistics.median(timings) * 1000 if timings else 0.0
+
+async def run(calls: int, provider_rps: int, latency: float) -> None:
+    with FakeLLMServer(latency=latency, rate_limit=provider_rps) as server:
+        set_openai_client(create_openai_client(api_key="stand-in", base_url=server.base_url))
+
+        print(f"{calls} concurrent calls, provider accepts {provider_rps}/s, {latency * 1000:.0f} ms latency")
+        variants = [
+            ("unpaced", LLMScheduler(max_retries=0, max_queue=calls)),
+            ("retry only", LLMScheduler(max_retries=8, backoff_base=0.5, max_queue=calls)),
+            ("scheduled", paced(provider_rps, calls)),
+        ]
+        for name, scheduler in variants:
+            results, elapsed, limited = await burst(server, scheduler, [Priority.INTERACTIVE] * calls)
+            timings = [seconds for ok, seconds, _ in results if ok]
+            failed = sum(1 for ok, _, _ in results if not ok)
+            print(
+                f"  {name:<11} failed {failed:3d}/{calls}  429s {limited:4d}  "
+                f"p50 {p50_ms(timings):7.0f} ms  max {max(timings, default=0) * 1000:7.0f} ms  all done in {elapsed:5.1f}s"
+            )
+
+        # Batch work queued first, interactive calls arriving while it waits
+        scheduler = paced(provider_rps, calls)
+        mix = [Priority.BATCH] * (calls - calls // 4) + [Priority.INTERACTIVE] * (calls // 4)
+        results, elapsed, limited = await burst(server, scheduler, mix, stagger=0.05)
+        print(f"mixed burst through the scheduler ({calls // 4} interactive calls arrive behind {calls - calls // 4} batch calls):")
+        for priority in (Priority.INTERACTIVE, Priority.BATCH):
+            timings = [seconds for ok, seconds, p in results if ok and p == priority]
+            print(f"  {priority.name.lower():<11} p50 {p50_ms(timings):7.0f} ms  max {max(timings) * 1000:7.0f} ms")
+
+        await close_openai_client()
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("replyguy").setLevel(logging.ERROR)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--provider-rps", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.provider_rps, args.latency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Keeping a viral ranking current as scores decay.
+
+Builds a DecayingRanking over N synthetic tweets spread across the 72h
+recency window, then replays a stream of top-K queries while the clock
+advances and a share of tweets receive new metrics between queries.
+Each query is compared with rescoring every tweet (vectorized) and
+selecting the top K, which is both the baseline and the correctness
+check: the lazy ranking must return the same tweets, with scores equal
+to within the decay of one time bucket.
+
+Usage:
+    python -m benchmarks.bench_ranking [--tweets 200000] [--queries 200] [--top 10]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from aapp.store.ranking import DecayingRanking
+from aapp.utils.scoring import RECENCY_WEIGHT, RECENCY_WINDOW_HOURS, combine_terms, engagement_term, recency_term
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--updates", type=int, default=500, help="metric updates between queries")
+    parser.add_argument("--step", type=float, default=15.0, help="seconds the clock advances per query")
+    parser.add_argument("--bucket", type=float, default=60.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    n = args.tweets
+    now = time.time()
+    created_at = now - rng.uniform(0, RECENCY_WINDOW_HOURS * 3600, n)
+    verified = rng.random(n) < 0.2
+    views = rng.integers(1_000, 2_000_000, n)
+    likes = (views * rng.uniform(0.001, 0.05, n)).astype(np.int64)
+    terms = engagement_term(likes, likes // 10, likes // 5, views)
+
+    ranking = DecayingRanking(bucket_seconds=args.bucket)
+    start = time.perf_counter()
+    for key, (term, ts, flag) in enumerate(zip(terms.tolist(), created_at.tolist(), verified.tolist())):
+        ranking.update(key, term, ts, flag, now)
+    print(f"{n} tweets ranked in {time.perf_counter() - start:.2f}s")
+
+    tolerance = args.bucket / (RECENCY_WINDOW_HOURS * 3600) * RECENCY_WEIGHT * 1.2 + 1e-12
+    lazy_times, full_times, update_times = [], [], []
+    for _ in range(args.queries):
+        now += args.step
+
+        # New likes and retweets for a random batch of tweets
+        keys = rng.integers(0, n, args.updates)
+        likes[keys] += rng.integers(1, 500, args.updates)
+        terms[keys] = engagement_term(likes[keys], likes[keys] // 10, likes[keys] // 5, views[keys])
+        start = time.perf_counter()
+        for key, term in zip(keys.tolist(), terms[keys].tolist()):
+            ranking.update(key, term, float(created_at[key]), bool(verified[key]), now)
+        update_times.append((time.perf_counter() - start) / args.updates)
+
+        start = time.perf_counter()
+        lazy = ranking.top(args.top, now)
+        lazy_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        scores = combine_terms(terms, recency_term(created_at, now), verified)
+        best = np.argpartition(-scores, args.top - 1)[:args.top]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        full_times.append(time.perf_counter() - start)
+
+        lazy_scores = np.array([score for _, score in lazy])
+        assert np.allclose(lazy_scores, scores[best], rtol=0, atol=tolerance), "lazy and full scores disagree"
+        # Tweets may only swap places where their scores are within the tolerance
+        boundary = scores[best[-1]] - tolerance
+        assert all(scores[key] >= boundary for key, _ in lazy), "lazy ranking returned a tweet outside the top K"
+
+    ms = lambda values: statistics.median(values) * 1000
+    print(f"  {'top-K lazy':<18} p50 {ms(lazy_times):8.3f}ms")
+    print(f"  {'top-K full rescore':<18} p50 {ms(full_times):8.3f}ms")
+    print(f"  {'metric update':<18} p50 {ms(update_times) * 1000:8.2f}us")
+    stats = ranking.stats()
+    per_query = stats["rescored"] / args.queries
+    print(f"  rescored per query: {per_query:,.0f} of {n:,} ({per_query / n:.2%})  counters: {stats}")
+
+if __name__ == "__main__":
+    main()
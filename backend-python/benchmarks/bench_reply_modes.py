@@ -0,0 +1,139 @@
+"""
+Agent, fast and rerank modes for reply generation.
+
+Generates replies against a local stand-in with simulated latency. The
+stand-in plays the model: in agent mode it calls analyze_tweet, then
+evaluate_reply once per reply, then returns the final list (three model
+turns, like a well-behaved real run); in fast and rerank modes it answers
+the single structured-output call with as many texts as the prompt asks
+for, drawn from a pool of varied replies and near-duplicate rewordings.
+Reports model round trips, latency and the mean local engagement score of
+the returned replies per request.
+
+Usage:
+    python -m benchmarks.bench_reply_modes [--requests 5] [--latency 0.3] [--replies 3]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import statistics
+import time
+from typing import Any, Dict
+
+from agents import set_default_openai_api, set_tracing_disabled
+
+from aapp.aagents.reply_generator import ReplyGeneratorAgent
+from aapp.models import ReplyRequest
+from aapp.utils.llm_client import create_openai_client, set_openai_client, close_openai_client
+from benchmarks.standin import FakeLLMServer
+
+REPLY_TEXTS = [
+    "What made you change your mind on this? I've seen teams go the other way.",
+    "In my experience the hard part is keeping it simple once it works.",
+    "Consider the cost of maintaining it a year from now, does that change the answer?",
+    "Love this. Which tool did you end up using?",
+    "Hot take, but I think the defaults are the real problem here.",
+    "What made you change your mind on this one? I've seen teams go the other way too.",
+    "Shipping a new build system is brave. How long did the migration take your team?",
+    "Shipping a new build system is brave. How long did the migration take the team?",
+    "Which part of the build got faster first, and was it worth the week?",
+    "Nice.",
+    "Congrats on shipping!",
+    "This is great, love the new build system this week.",
+]
+
+def _tool_call(index: int, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": f"call_{index}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)},
+    }
+
+def responder(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Play the model for both modes, based on the tools offered and the turns so far"""
+    tools = {tool["function"]["name"] for tool in body.get("tools", [])}
+    prompt = " ".join(str(message.get("content") or "") for message in body.get("messages", []))
+    match = re.search(r"(?:Write|Generate) (\d+)", prompt)
+    num_replies = int(match.group(1)) if match else 3
+
+    # Fast mode: one forced structured-output tool call
+    if "generate_structured_output" in tools:
+        arguments = {"replies": [REPLY_TEXTS[i % len(REPLY_TEXTS)] for i in range(num_replies)]}
+        return {"role": "assistant", "content": None, "tool_calls": [_tool_call(0, "generate_structured_output", arguments)]}
+
+    # Agent mode: analyze the tweet, evaluate each reply, then answer
+    called = [
+        call["function"]["name"]
+        for message in body.get("messages", [])
+        for call in message.get("tool_calls") or []
+    ]
+    if "analyze_tweet" not in called:
+        arguments = {"tweet_content": "tweet", "author": "author"}
+        return {"role": "assistant", "content": None, "tool_calls": [_tool_call(0, "analyze_tweet", arguments)]}
+    if "evaluate_reply" not in called:
+        calls = [
+            _tool_call(i, "evaluate_reply", {"reply_content": text, "original_tweet": "tweet"})
+            for i, text in enumerate(REPLY_TEXTS[:num_replies])
+        ]
+        return {"role": "assistant", "content": None, "tool_calls": calls}
+
+    replies = [
+        {"content": text, "strengths": ["Concise and direct"], "estimated_engagement": 70}
+        for text in REPLY_TEXTS[:num_replies]
+    ]
+    return {"role": "assistant", "content": json.dumps({"response": replies})}
+
+async def run(n: int, latency: float, num_replies: int) -> None:
+    # The stand-in only speaks chat completions, and traces have nowhere to go
+    set_default_openai_api("chat_completions")
+    set_tracing_disabled(True)
+
+    with FakeLLMServer(latency=latency, responder=responder) as server:
+        set_openai_client(create_openai_client(api_key="stand-in", base_url=server.base_url))
+        generator = ReplyGeneratorAgent()
+        # Measure the LLM path, not cache hits
+        generator.cache = None
+        generator.similar = None
+
+        print(f"{n} requests per mode, {num_replies} replies each, {latency * 1000:.0f} ms simulated latency")
+        results = {}
+        for mode in ("agent", "fast", "rerank"):
+            timings, scores = [], []
+            before = server.requests
+            for i in range(n):
+                request = ReplyRequest(
+                    tweet_id=str(i),
+                    tweet_content=f"Shipping a new build system this week, take {i}",
+                    tweet_author="builder",
+                    num_replies=num_replies,
+                    mode=mode,
+                )
+                start = time.perf_counter()
+                replies = await generator.generate_replies(request)
+                timings.append(time.perf_counter() - start)
+                assert len(replies) == num_replies, f"{mode} mode returned {len(replies)} replies"
+                scores.extend(reply.estimated_engagement for reply in replies)
+            turns = (server.requests - before) / n
+            results[mode] = statistics.mean(timings)
+            print(
+                f"  {mode:<6} {turns:4.1f} model turns/request  "
+                f"mean {results[mode] * 1000:7.1f} ms  max {max(timings) * 1000:7.1f} ms  "
+                f"mean engagement {statistics.mean(scores):5.1f}"
+            )
+
+        print(f"  fast mode is {results['agent'] / results['fast']:.1f}x faster per request")
+        await close_openai_client()
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--replies", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency, args.replies))
+
+if __name__ == "__main__":
+    main()
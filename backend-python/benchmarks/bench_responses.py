@@ -0,0 +1,98 @@
+"""
+Latency and size of a 1k-tweet search response.
+
+Calls the search route in-process (httpx over ASGI, through the app's
+middleware) with the tweet finder overridden by one that returns N ready
+Tweets, so only the response path is measured:
+  - fastapi 0.105: the steps the pinned FastAPI version takes for a
+               route with response_model, replayed: dump the returned
+               model, validate the dump, serialize it to JSON-safe data
+               and json.dumps that
+  - baseline:  the route as it was, returning TweetResponse with
+               response_model, on the installed FastAPI (newer versions
+               revalidate more cheaply and serialize in pydantic-core)
+  - json:      the app's route (model_response)
+  - msgpack:   the same route with "Accept: application/msgpack"
+               (skipped unless msgpack is installed)
+
+Usage:
+    python -m benchmarks.bench_responses [--tweets 1000] [--requests 200]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+
+import fastapi
+import httpx
+from fastapi import Depends
+from fastapi.responses import JSONResponse
+
+from aapp.dependencies import get_tweet_finder
+from aapp.main import app
+from aapp.models import Tweet, TweetFilterRequest, TweetResponse
+from aapp.utils import serialization
+from benchmarks.hot_paths import _tweet_dicts
+
+async def baseline_search(filters: TweetFilterRequest, tweet_finder=Depends(get_tweet_finder)):
+    """The search route as it was: return the model and let FastAPI validate and serialize it"""
+    return TweetResponse(tweets=await tweet_finder.find_tweets(filters))
+
+async def pinned_fastapi_search(filters: TweetFilterRequest, tweet_finder=Depends(get_tweet_finder)):
+    """The route as it was, with the response handling of FastAPI 0.105 spelled out"""
+    response = TweetResponse(tweets=await tweet_finder.find_tweets(filters))
+    validated = TweetResponse.model_validate(response.model_dump(by_alias=True))
+    return JSONResponse(TweetResponse.__pydantic_serializer__.to_python(validated, mode="json", by_alias=True))
+
+async def run(path: str, requests: int, accept: str):
+    timings = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.post(path, json={}, headers={"Accept": accept})
+            timings.append(time.perf_counter() - start)
+            response.raise_for_status()
+    return response, timings
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    tweets = [Tweet.model_validate(t) for t in _tweet_dicts(args.tweets)]
+
+    async def find_tweets(filters):
+        return tweets
+
+    app.dependency_overrides[get_tweet_finder] = lambda: SimpleNamespace(find_tweets=find_tweets)
+    app.add_api_route("/bench/baseline-search", baseline_search, methods=["POST"], response_model=TweetResponse)
+    app.add_api_route("/bench/pinned-fastapi-search", pinned_fastapi_search, methods=["POST"])
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    variants = [
+        ("fastapi 0.105", "/bench/pinned-fastapi-search", "application/json"),
+        ("baseline", "/bench/baseline-search", "application/json"),
+        ("json", "/api/tweets/search", "application/json"),
+    ]
+    if serialization.msgpack is not None:
+        variants.append(("msgpack", "/api/tweets/search", "application/msgpack"))
+    else:
+        print("msgpack is not installed; skipping the MessagePack variant")
+    print(f"FastAPI {fastapi.__version__} installed")
+
+    print(f"{args.tweets} tweets per response, {args.requests} requests")
+    first_p50 = None
+    for name, path, accept in variants:
+        response, timings = await run(path, args.requests, accept)
+        p50 = statistics.median(timings)
+        first_p50 = first_p50 or p50
+        print(
+            f"  {name:<14} p50 {p50 * 1000:7.2f}ms  {len(response.content) / 1e3:7.1f} kB"
+            f"  {response.headers['content-type']:<20} {first_p50 / p50:5.1f}x"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Bulk viral-potential scoring: vectorized engine vs the per-tweet loop.
+
+  - per-tweet: calculate_viral_potential called once per tweet dict
+    (parses the timestamp and reads the clock on every call)
+  - ingest:    normalizing all timestamps to epoch seconds once
+  - vectorized: one score_viral_potential pass over the columns
+
+Usage:
+    python -m benchmarks.bench_scoring [--tweets 100000] [--loop-sample 20000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from aapp.utils.scoring import normalize_timestamps, score_viral_potential
+from aapp.utils.tweet_utils import calculate_viral_potential
+
+def make_tweets(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    tweets = []
+    for _ in range(count):
+        likes = rng.randint(0, 50_000)
+        tweets.append({
+            "likes": likes,
+            "replies": rng.randint(0, likes // 10 + 1),
+            "retweets": rng.randint(0, likes // 5 + 1),
+            "views": rng.choice([0, likes * rng.randint(20, 200)]),
+            "timestamp": (now - timedelta(minutes=rng.randint(0, 60 * 96))).isoformat(),
+            "is_verified": rng.random() < 0.2,
+        })
+    return tweets
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=100_000)
+    parser.add_argument("--loop-sample", type=int, default=20_000, help="tweets timed with the per-tweet loop")
+    args = parser.parse_args()
+
+    tweets = make_tweets(args.tweets)
+    sample = tweets[:min(args.loop_sample, len(tweets))]
+
+    start = time.perf_counter()
+    loop_scores = [calculate_viral_potential(t, t["timestamp"], t["is_verified"]) for t in sample]
+    loop_per_tweet = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    columns = {
+        "likes": np.fromiter((t["likes"] for t in tweets), dtype=np.int64, count=len(tweets)),
+        "replies": np.fromiter((t["replies"] for t in tweets), dtype=np.int64, count=len(tweets)),
+        "retweets": np.fromiter((t["retweets"] for t in tweets), dtype=np.int64, count=len(tweets)),
+        "views": np.fromiter((t["views"] for t in tweets), dtype=np.int64, count=len(tweets)),
+        "verified": np.fromiter((t["is_verified"] for t in tweets), dtype=bool, count=len(tweets)),
+        "created_at": normalize_timestamps(t["timestamp"] for t in tweets),
+    }
+    ingest = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = score_viral_potential(**columns)
+    vectorized = time.perf_counter() - start
+
+    max_diff = float(np.max(np.abs(scores[:len(sample)] - np.asarray(loop_scores))))
+
+    print(f"{len(tweets):,} tweets")
+    print(f"  per-tweet loop  {loop_per_tweet * len(tweets):8.3f}s  (extrapolated from {len(sample):,}, {loop_per_tweet * 1e6:.1f} us/tweet)")
+    print(f"  ingest          {ingest:8.3f}s  (timestamps normalized once)")
+    print(f"  vectorized      {vectorized:8.3f}s  ({vectorized / len(tweets) * 1e9:.1f} ns/tweet, "
+          f"{loop_per_tweet * len(tweets) / vectorized:,.0f}x faster than the loop)")
+    print(f"  max |loop - vectorized| = {max_diff:.2e}")
+
+if __name__ == "__main__":
+    main()
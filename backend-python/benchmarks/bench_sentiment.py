@@ -0,0 +1,96 @@
+"""
+Sentiment of a feed: one LLM call per text vs batched calls vs the lexicon.
+
+Scores --feed tweets against a stand-in LLM with --latency per call:
+  - per text:  analyze_sentiment for each tweet in turn (the old way to
+               score a feed)
+  - batched:   analyze_sentiment_batch(mode="llm"), up to
+               SENTIMENT_BATCH_SIZE tweets per structured call, the calls
+               running concurrently
+  - lexicon:   analyze_sentiment_batch(mode="lexicon"), no LLM call
+
+and reports wall time and LLM calls. The stand-in answers each numbered
+text with the lexicon's scores but leaves one text out of every batch,
+so the fallback for missing results is exercised too. Then times the
+lexicon alone on --lexicon-texts texts.
+
+The LLM scheduler is unlimited here so the calls, not the rate limits,
+set the pace.
+
+Usage:
+    python -m benchmarks.bench_sentiment [--feed 50] [--latency 0.3] [--lexicon-texts 100000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Any, Dict
+
+from aapp.utils import openai_utils
+from aapp.utils.llm_client import create_openai_client, set_openai_client, close_openai_client
+from aapp.utils.scheduler import LLMScheduler
+from aapp.utils.sentiment import get_sentiment_lexicon
+from benchmarks.hot_paths import _tweet_dicts
+from benchmarks.standin import FakeLLMServer
+
+_NUMBERED = re.compile(r"^\[(\d+)\] (.*)$", re.MULTILINE)
+
+def responder(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Score each numbered text (or the single text) with the lexicon, dropping one from each batch"""
+    prompt = body["messages"][-1]["content"]
+    lexicon = get_sentiment_lexicon()
+    numbered = _NUMBERED.findall(prompt)
+    if numbered:
+        results = [{"index": int(number), **lexicon.score(json.loads(text))} for number, text in numbered]
+        arguments = {"results": results[:-1] if len(results) > 1 else results}
+    else:
+        arguments = lexicon.score(prompt.split(": ", 1)[-1])
+    call = {"id": "call_0", "type": "function", "function": {"name": "generate_structured_output", "arguments": json.dumps(arguments)}}
+    return {"role": "assistant", "content": None, "tool_calls": [call]}
+
+async def run(feed: int, latency: float, lexicon_texts: int) -> None:
+    unlimited = LLMScheduler(max_queue=10 * feed)
+    openai_utils.llm_scheduler = unlimited
+    texts = [tweet["content"] for tweet in _tweet_dicts(feed)]
+
+    with FakeLLMServer(latency=latency, responder=responder) as server:
+        set_openai_client(create_openai_client(api_key="stand-in", base_url=server.base_url))
+        print(f"{feed} tweets, {latency * 1000:.0f} ms per LLM call")
+
+        async def per_text():
+            return [await openai_utils.analyze_sentiment(text) for text in texts]
+
+        variants = [
+            ("per text", per_text),
+            ("batched", lambda: openai_utils.analyze_sentiment_batch(texts, mode="llm")),
+            ("lexicon", lambda: openai_utils.analyze_sentiment_batch(texts, mode="lexicon")),
+        ]
+        for name, call in variants:
+            before = server.requests
+            start = time.perf_counter()
+            results = await call()
+            elapsed = time.perf_counter() - start
+            assert len(results) == feed and all(set(result) == {"positive", "negative", "neutral"} for result in results)
+            print(f"  {name:<9} {elapsed * 1000:9.1f} ms  {server.requests - before:4} LLM calls")
+        await close_openai_client()
+
+    lexicon = get_sentiment_lexicon()
+    sample = [tweet["content"] for tweet in _tweet_dicts(lexicon_texts)]
+    start = time.perf_counter()
+    lexicon.score_many(sample)
+    elapsed = time.perf_counter() - start
+    print(f"lexicon alone: {lexicon_texts:,} texts in {elapsed:.2f}s ({elapsed / lexicon_texts * 1e6:.1f} us/text)")
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feed", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--lexicon-texts", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.feed, args.latency, args.lexicon_texts))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Near-duplicate lookups in the MinHash LSH reply cache.
+
+Indexes N synthetic tweet texts (words drawn from a 20k-word vocabulary)
+in a SimilarityCache, then times lookups for:
+  - near-duplicates: indexed texts lightly edited the way copies are
+               (a quote prefix, a changed or dropped word, a new link)
+  - unrelated: fresh texts that were never indexed
+
+and reports latency percentiles, how many near-duplicates were found
+(and how many unrelated texts wrongly were), and the growth in resident
+memory per indexed entry.
+
+Usage:
+    python -m benchmarks.bench_similarity_cache [--entries 1000000] [--lookups 2000]
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+
+from aapp.utils.similarity import SimilarityCache
+from benchmarks.bench_tweet_memory import resident_bytes
+
+def vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(size)]
+
+def texts(count: int, words, rng: random.Random):
+    for _ in range(count):
+        yield " ".join(rng.choices(words, k=rng.randint(12, 35)))
+
+def near_duplicate(text: str, words, rng: random.Random) -> str:
+    tokens = text.split()
+    edit = rng.randrange(4)
+    if edit == 0:
+        return "This! " + text
+    if edit == 1:
+        tokens[rng.randrange(len(tokens))] = rng.choice(words)
+    elif edit == 2:
+        del tokens[rng.randrange(len(tokens))]
+    else:
+        tokens.append(f"https://t.co/{rng.randrange(10 ** 9)}")
+    return " ".join(tokens)
+
+def time_lookups(cache: SimilarityCache, queries):
+    timings, found = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        value = cache.get(query)
+        timings.append(time.perf_counter() - start)
+        found += value is not None
+    timings.sort()
+    return timings, found
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    words = vocabulary(20_000, rng)
+    sample_every = max(1, args.entries // args.lookups)
+    samples = []
+
+    gc.collect()
+    before = resident_bytes()
+    cache = SimilarityCache(max_entries=args.entries, threshold=args.threshold, ttl_seconds=86400)
+    start = time.perf_counter()
+    for i, text in enumerate(texts(args.entries, words, rng)):
+        cache.set(text, i)
+        if i % sample_every == 0:
+            samples.append(text)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    held = resident_bytes() - before - sum(len(text) + 49 for text in samples)
+
+    print(f"{args.entries:,} entries indexed in {elapsed:.1f}s ({elapsed / args.entries * 1e6:.0f} us/entry)")
+    print(f"  memory    {held / 1e6:9,.0f} MB  {held / args.entries:7,.0f} bytes/entry")
+
+    cases = [
+        ("near-duplicate", [near_duplicate(text, words, rng) for text in samples]),
+        ("unrelated", list(texts(len(samples), words, rng))),
+    ]
+    for name, queries in cases:
+        timings, found = time_lookups(cache, queries)
+        print(
+            f"  {name:<15} p50 {statistics.median(timings) * 1e6:6.0f} us  "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1e6:6.0f} us  "
+            f"found {found / len(queries):6.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Cold start: import time, startup and the first requests, in fresh processes.
+
+Each run starts a new interpreter (no OPENAI_API_KEY, job and history
+databases in a scratch directory) that measures:
+  - import:        `import aapp.main`
+  - startup:       the app's lifespan startup (job store opened, workers
+                   started, agents built if PRELOAD_AGENTS is set)
+  - first stats:   the first GET /api/stats through the ASGI app
+  - first agent:   building the ReplyGenerator agent on first use, which
+                   imports the Agents SDK and creates the OpenAI client
+  - process:       wall time from spawning the interpreter to its exit
+
+and the medians over --runs runs are reported, once with the agents
+built on first use (the default) and once with PRELOAD_AGENTS=True.
+Modules that are imported lazily and should stay out of `import
+aapp.main` are listed if they got loaded anyway.
+
+With --budget-ms, exits with status 1 when import + startup of the
+default configuration takes longer than the budget (median), so the
+benchmark can gate changes that slow the cold start down.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--budget-ms 1000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Heavy dependencies that `import aapp.main` should no longer pull in
+DEFERRED_MODULES = ("agents", "openai", "numpy", "uvicorn")
+
+async def _measure() -> dict:
+    timings = {}
+    start = time.perf_counter()
+    from aapp.main import app
+    timings["import"] = time.perf_counter() - start
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+
+    import httpx
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["startup"] = time.perf_counter() - start
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            start = time.perf_counter()
+            response = await client.get("/api/stats")
+            timings["first_stats"] = time.perf_counter() - start
+            response.raise_for_status()
+
+        from aapp.dependencies import get_reply_generator
+        from aapp.utils.llm_client import create_openai_client, set_openai_client
+
+        start = time.perf_counter()
+        if not os.getenv("OPENAI_API_KEY"):
+            set_openai_client(create_openai_client(api_key="stand-in"))
+        get_reply_generator()
+        timings["first_agent"] = time.perf_counter() - start
+    return {"timings": timings, "loaded": loaded}
+
+def child() -> None:
+    import asyncio
+
+    print(json.dumps(asyncio.run(_measure())))
+
+def spawn(scratch: str, preload: bool) -> dict:
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    env.update(
+        JOB_DB_PATH=os.path.join(scratch, "jobs.sqlite3"),
+        HISTORY_DB_PATH=os.path.join(scratch, "history.sqlite3"),
+        PRELOAD_AGENTS=str(preload),
+        LOG_FORMAT="text",
+    )
+    if preload:
+        # Building the agents creates the OpenAI client, which needs a key (no request is made)
+        env["OPENAI_API_KEY"] = "stand-in"
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["timings"]["process"] = time.perf_counter() - start
+    return result
+
+def report(name: str, results) -> float:
+    medians = {
+        key: statistics.median(result["timings"][key] for result in results)
+        for key in ("import", "startup", "first_stats", "first_agent", "process")
+    }
+    print(f"{name}")
+    for key, label in (
+        ("import", "import aapp.main"),
+        ("startup", "lifespan startup"),
+        ("first_stats", "first /api/stats"),
+        ("first_agent", "first agent build"),
+        ("process", "process"),
+    ):
+        print(f"  {label:<18} {medians[key] * 1000:8.1f} ms")
+    loaded = sorted({name for result in results for name in result["loaded"]})
+    if loaded:
+        print(f"  imported by aapp.main: {', '.join(loaded)}")
+    return medians["import"] + medians["startup"]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail when import + startup (median) exceeds this")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    print(f"median of {args.runs} fresh processes, Python {sys.version.split()[0]}")
+    cold = None
+    for name, preload in (("agents built on first use", False), ("PRELOAD_AGENTS=True", True)):
+        with tempfile.TemporaryDirectory() as scratch:
+            results = [spawn(scratch, preload) for _ in range(args.runs)]
+        total = report(name, results)
+        if cold is None:
+            cold = total
+
+    if args.budget_ms is not None:
+        verdict = "within" if cold * 1000 <= args.budget_ms else "over"
+        print(f"import + startup {cold * 1000:.1f} ms: {verdict} the {args.budget_ms:.0f} ms budget")
+        if verdict == "over":
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
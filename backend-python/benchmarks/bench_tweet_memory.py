@@ -0,0 +1,94 @@
+"""
+Memory held per tweet: Pydantic models vs the compact columnar store.
+
+Loads N synthetic tweets (about 1,000 distinct authors) two ways, each in
+a fresh subprocess so the numbers don't interfere:
+  - models:  a list of validated Tweet models (Tweet -> TweetAuthor +
+             TweetMetrics), the representation bulk paths used to hold
+  - store:   a TweetStore, i.e. compact TweetRows, interned authors and
+             numpy columns, plus its topic/keyword indexes and ranking heap
+
+and reports the growth in resident memory after loading, per tweet.
+Inputs are generated a chunk at a time so they don't count.
+
+Usage:
+    python -m benchmarks.bench_tweet_memory [--tweets 1000000]
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from aapp.models import Tweet
+from aapp.store import TweetBatch, TweetStore
+from benchmarks.hot_paths import _tweet_dicts
+
+CHUNK = 10_000
+
+def resident_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def chunks(count: int):
+    for start in range(0, count, CHUNK):
+        dicts = _tweet_dicts(min(CHUNK, count - start), seed=start)
+        for i, tweet in enumerate(dicts):
+            tweet["id"] = str(start + i)
+        yield dicts
+
+def measure(variant: str, count: int) -> dict:
+    gc.collect()
+    before = resident_bytes()
+    start = time.perf_counter()
+
+    if variant == "models":
+        held = []
+        for dicts in chunks(count):
+            held.extend(Tweet.model_validate(tweet) for tweet in dicts)
+    else:
+        held = TweetStore(max_tweets=count)
+        now = time.time()
+        for dicts in chunks(count):
+            held.add_batch(TweetBatch.from_dicts(dicts, now), now)
+
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    assert len(held) == count
+    return {"bytes": resident_bytes() - before, "seconds": elapsed}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=1_000_000)
+    parser.add_argument("--variant", choices=["models", "store"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.tweets)))
+        return
+
+    print(f"{args.tweets:,} tweets")
+    results = {}
+    for variant in ("models", "store"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_tweet_memory", "--variant", variant, "--tweets", str(args.tweets)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[variant] = json.loads(output.strip().splitlines()[-1])
+        held = results[variant]["bytes"]
+        print(
+            f"  {variant:<7} {held / 1e6:9,.0f} MB  {held / args.tweets:7,.0f} bytes/tweet"
+            f"  (loaded in {results[variant]['seconds']:.1f}s)"
+        )
+    print(f"  store holds {results['store']['bytes'] / results['models']['bytes']:.0%} of the models' memory")
+
+if __name__ == "__main__":
+    main()
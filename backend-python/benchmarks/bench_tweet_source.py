@@ -0,0 +1,78 @@
+"""
+Throughput of the NDJSON tweet source pipeline.
+
+Writes N synthetic tweets to a temporary NDJSON file (half in the Tweet
+shape, half as flat Twitter API records) and measures, on one core:
+  - parse:   records -> validated columnar TweetBatches
+  - stream:  parse + vectorized scoring, no filters, every tweet as a Tweet model
+  - filter:  parse + scoring + engagement/verified/viral/topic filters
+  - search:  top-10 of the filtered tweets (only those 10 become Tweet models)
+
+Usage:
+    python -m benchmarks.bench_tweet_source [--tweets 100000] [--chunk-size 1000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from aapp.models import TweetFilterRequest
+from aapp.sources import NDJSONTweetSource
+from benchmarks.hot_paths import _tweet_dicts
+
+def _flat(tweet):
+    """The same tweet as a Twitter API style record"""
+    return {
+        "id_str": tweet["id"],
+        "text": tweet["content"],
+        "created_at": tweet["timestamp"],
+        "user": {"name": tweet["author"]["name"], "screen_name": tweet["author"]["handle"], "verified": tweet["author"]["is_verified"]},
+        "favorite_count": tweet["metrics"]["likes"],
+        "reply_count": tweet["metrics"]["replies"],
+        "retweet_count": tweet["metrics"]["retweets"],
+        "impression_count": tweet["metrics"]["views"],
+        "in_reply_to_status_id": None if int(tweet["id"]) % 7 else "1",
+    }
+
+def write_ndjson(path: str, count: int) -> None:
+    with open(path, "w") as f:
+        for i, tweet in enumerate(_tweet_dicts(count)):
+            f.write(json.dumps(tweet if i % 2 else _flat(tweet)) + "\n")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    criteria = TweetFilterRequest(
+        min_engagement=500,
+        topics=["Technology", "design"],
+        exclude_replies=True,
+        min_viral_potential=10,
+        max_results=10,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tweets.ndjson")
+        write_ndjson(path, args.tweets)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.tweets} tweets, {size_mb:.1f} MB NDJSON, chunk size {args.chunk_size}")
+
+        source = NDJSONTweetSource(path, chunk_size=args.chunk_size)
+        for name, run in (
+            ("parse", lambda: sum(len(batch) for batch in source.batches())),
+            ("stream", lambda: sum(1 for _ in source.stream())),
+            ("filter", lambda: sum(1 for _ in source.stream(criteria))),
+            ("search", lambda: len(source.search(criteria))),
+        ):
+            start = time.perf_counter()
+            count = run()
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<7} {elapsed:7.3f}s  {args.tweets / elapsed:10,.0f} tweets/s  ({count} out)")
+
+        print(f"  counters: {source.stats()}")
+
+if __name__ == "__main__":
+    main()
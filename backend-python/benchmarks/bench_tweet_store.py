@@ -0,0 +1,81 @@
+"""
+Query latency of the in-memory TweetStore.
+
+Loads N synthetic tweets into a TweetStore and times top-K searches for
+a few typical TweetFilterRequests, against a linear scan over the same
+tweets (score and filter every Tweet, then sort) as the baseline. Both
+rank by the viral score as of one fixed query time.
+
+Usage:
+    python -m benchmarks.bench_tweet_store [--tweets 100000] [--queries 200]
+"""
+import argparse
+import statistics
+import time
+
+from aapp.models import Tweet, TweetFilterRequest
+from aapp.store import TweetStore
+from aapp.utils.scoring import score_viral_potential, tweet_columns
+from aapp.utils.topics import get_topic_classifier
+from benchmarks.hot_paths import _tweet_dicts
+
+QUERIES = {
+    "default": TweetFilterRequest(),
+    "top overall": TweetFilterRequest(min_viral_potential=0, max_results=10),
+    "verified+topic": TweetFilterRequest(only_verified=True, topics=["Technology"], max_results=10),
+    "keyword": TweetFilterRequest(topics=["AI", "funding"], min_viral_potential=0, max_results=10),
+    "selective": TweetFilterRequest(min_engagement=15_000, exclude_replies=True, min_viral_potential=60),
+    "free text": TweetFilterRequest(topics=["design"], only_verified=True, min_viral_potential=0),
+}
+
+def linear_scan(tweets, filters: TweetFilterRequest, now: float):
+    classifier = get_topic_classifier()
+    scores = score_viral_potential(**tweet_columns(tweets, now), now=now).tolist()
+    matches = [
+        (score, t) for t, score in zip(tweets, scores)
+        if (not filters.only_verified or t.author.is_verified)
+        and (not filters.exclude_replies or not t.is_reply)
+        and t.metrics.likes + t.metrics.replies + t.metrics.retweets >= (filters.min_engagement or 0)
+        and round(score * 100) >= (filters.min_viral_potential or 0)
+    ]
+    if filters.topics:
+        found = classifier.matches_any([t.content for _, t in matches], filters.topics)
+        matches = [m for m, ok in zip(matches, found) if ok]
+    matches.sort(key=lambda m: m[0], reverse=True)
+    return [t for _, t in matches[:filters.max_results]]
+
+def _time(run, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return result, statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    tweets = [Tweet.model_validate(t) for t in _tweet_dicts(args.tweets)]
+    for i, tweet in enumerate(tweets):
+        tweet.is_reply = i % 7 == 0
+
+    now = time.time()
+    store = TweetStore(max_tweets=args.tweets)
+    start = time.perf_counter()
+    store.add_many(tweets, now)
+    elapsed = time.perf_counter() - start
+    print(f"{len(store)} tweets ingested in {elapsed:.2f}s ({len(store) / elapsed:,.0f} tweets/s)")
+
+    print(f"  {'query':<15} {'store p50':>10} {'store p99':>10} {'scan p50':>10}  results")
+    for name, filters in QUERIES.items():
+        found, p50, p99 = _time(lambda: store.query(filters, now=now), args.queries)
+        expected, scan_p50, _ = _time(lambda: linear_scan(tweets, filters, now), max(3, args.queries // 50))
+        assert [t.id for t in found] == [t.id for t in expected], f"{name}: store and scan disagree"
+        print(f"  {name:<15} {p50 * 1000:8.3f}ms {p99 * 1000:8.3f}ms {scan_p50 * 1000:8.1f}ms  {len(found)}")
+
+if __name__ == "__main__":
+    main()
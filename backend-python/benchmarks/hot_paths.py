@@ -0,0 +1,227 @@
+"""
+Micro-benchmark suite for the backend's pure-Python hot paths.
+
+Runs without network access. Each case is timed at several input sizes
+and reported per item. Results can be saved as a JSON baseline and later
+runs compared against it; the comparison exits non-zero when any case is
+slower than the baseline by more than the threshold.
+
+Usage:
+    python -m benchmarks.hot_paths                               # run and print
+    python -m benchmarks.hot_paths --save benchmarks/baseline.json
+    python -m benchmarks.hot_paths --compare benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.hot_paths --sizes 10 1000 --filter topics
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from aapp.models import Reply, ReplyResponse, Tweet, TweetResponse
+from aapp.utils.reply_utils import evaluate_replies, evaluate_reply, select_diverse_replies
+from aapp.utils.topics import get_topic_classifier
+from aapp.utils.tweet_utils import calculate_viral_potential, extract_hashtags, extract_mentions, get_tweet_topics
+from aapp.utils.validation import validate_replies, validate_tweets
+
+DEFAULT_SIZES = [10, 1_000, 100_000]
+
+# Each run is repeated until it has taken at least this long in total
+MIN_CASE_SECONDS = 0.2
+MAX_REPEATS = 10_000
+
+_WORDS = (
+    "ai startup funding code shipping product launch growth founders tech software "
+    "machine learning model data open source programming market users feedback "
+    "business entrepreneur said certain maintain design team remote hiring"
+).split()
+
+def _tweet_dicts(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    tweets = []
+    for i in range(count):
+        words = rng.choices(_WORDS, k=rng.randint(8, 30))
+        if rng.random() < 0.5:
+            words.append(f"#{rng.choice(_WORDS)}")
+        if rng.random() < 0.3:
+            words.append(f"@user{rng.randint(1, 500)}")
+        likes = rng.randint(0, 20_000)
+        tweets.append({
+            "id": str(i),
+            "author": {
+                "name": f"User {i % 997}",
+                "handle": f"user{i % 997}",
+                "avatar": f"https://unavatar.io/x/user{i % 997}",
+                "is_verified": rng.random() < 0.2,
+            },
+            "content": " ".join(words),
+            "timestamp": (now - timedelta(minutes=rng.randint(0, 4000))).isoformat(),
+            "metrics": {
+                "likes": likes,
+                "replies": rng.randint(0, likes // 10 + 1),
+                "retweets": rng.randint(0, likes // 5 + 1),
+                "views": likes * rng.randint(10, 200),
+            },
+            "viral_potential": rng.randint(0, 100),
+        })
+    return tweets
+
+def _reply_dicts(count: int, seed: int = 2) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    replies = []
+    for _ in range(count):
+        content = " ".join(rng.choices(_WORDS, k=rng.randint(4, 40)))
+        if rng.random() < 0.4:
+            content += "?"
+        replies.append({
+            "content": content,
+            "strengths": ["Concise and direct"],
+            "estimated_engagement": rng.randint(0, 100),
+        })
+    return replies
+
+# name -> (setup(size) -> data, run(data))
+CASES: Dict[str, Tuple[Callable[[int], Any], Callable[[Any], Any]]] = {
+    "calculate_viral_potential": (
+        _tweet_dicts,
+        lambda tweets: [
+            calculate_viral_potential(t["metrics"], t["timestamp"], t["author"]["is_verified"]) for t in tweets
+        ],
+    ),
+    "get_tweet_topics": (
+        lambda n: [t["content"] for t in _tweet_dicts(n)],
+        lambda texts: [get_tweet_topics(text) for text in texts],
+    ),
+    "classify_topics_batch": (
+        lambda n: [t["content"] for t in _tweet_dicts(n)],
+        lambda texts: get_topic_classifier().classify_many(texts),
+    ),
+    "match_topics_batch": (
+        lambda n: [t["content"] for t in _tweet_dicts(n)],
+        lambda texts: get_topic_classifier().matches_any(texts, ["Technology", "design"]),
+    ),
+    "extract_hashtags_mentions": (
+        lambda n: [t["content"] for t in _tweet_dicts(n)],
+        lambda texts: [(extract_hashtags(text), extract_mentions(text)) for text in texts],
+    ),
+    "validate_tweets": (
+        lambda n: [Tweet.model_validate(t) for t in _tweet_dicts(n)],
+        validate_tweets,
+    ),
+    "validate_replies": (
+        lambda n: [Reply.model_validate(r) for r in _reply_dicts(n)],
+        validate_replies,
+    ),
+    "evaluate_reply": (
+        lambda n: list(zip((r["content"] for r in _reply_dicts(n)), (t["content"] for t in _tweet_dicts(n)))),
+        lambda pairs: [evaluate_reply(reply, tweet) for reply, tweet in pairs],
+    ),
+    "evaluate_replies_batch": (
+        lambda n: ([r["content"] for r in _reply_dicts(n)], _tweet_dicts(1)[0]["content"]),
+        lambda candidates: evaluate_replies(*candidates),
+    ),
+    "rerank_replies": (
+        lambda n: ([r["content"] for r in _reply_dicts(n)], _tweet_dicts(1)[0]["content"]),
+        lambda candidates: select_diverse_replies(
+            candidates[0],
+            [e["estimated_engagement"] for e in evaluate_replies(*candidates)],
+            5,
+            0.6,
+        ),
+    ),
+    "build_tweet_models": (
+        _tweet_dicts,
+        lambda tweets: [Tweet.model_validate(t) for t in tweets],
+    ),
+    "serialize_tweet_response": (
+        lambda n: TweetResponse(tweets=[Tweet.model_validate(t) for t in _tweet_dicts(n)]),
+        lambda response: response.model_dump_json(),
+    ),
+    "build_reply_response": (
+        _reply_dicts,
+        lambda replies: ReplyResponse(replies=[Reply.model_validate(r) for r in replies], tweet_id="1"),
+    ),
+    "serialize_reply_response": (
+        lambda n: ReplyResponse(replies=[Reply.model_validate(r) for r in _reply_dicts(n)], tweet_id="1"),
+        lambda response: response.model_dump_json(),
+    ),
+}
+
+def time_case(run: Callable[[Any], Any], data: Any) -> Dict[str, Any]:
+    """Time run(data), repeating until MIN_CASE_SECONDS have elapsed, and keep the best run"""
+    timings = []
+    total = 0.0
+    while total < MIN_CASE_SECONDS and len(timings) < MAX_REPEATS:
+        start = time.perf_counter()
+        run(data)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+    return {"seconds": min(timings), "repeats": len(timings)}
+
+def run_suite(sizes: List[int], name_filter: str = "") -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name, (setup, run) in CASES.items():
+        if name_filter and name_filter not in name:
+            continue
+        for size in sizes:
+            data = setup(size)
+            timing = time_case(run, data)
+            key = f"{name}@{size}"
+            results[key] = {**timing, "items": size, "per_item_ns": timing["seconds"] / size * 1e9}
+            print(f"  {key:<38} {timing['seconds'] * 1000:10.3f} ms  {results[key]['per_item_ns']:12.1f} ns/item")
+            sys.stdout.flush()
+    return results
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return the keys whose per-item time regressed by more than threshold"""
+    regressions = []
+    print(f"\nComparison against baseline (threshold {threshold:.0%}):")
+    for key, result in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            print(f"  {key:<38} new")
+            continue
+        change = result["per_item_ns"] / previous["per_item_ns"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        if flag:
+            regressions.append(key)
+        print(f"  {key:<38} {change:+8.1%}  {flag}")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--save", help="write results to this JSON baseline")
+    parser.add_argument("--compare", help="compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    print(f"Python {platform.python_version()} on {platform.platform()}")
+    results = run_suite(args.sizes, args.filter)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "created": datetime.now(timezone.utc).isoformat(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
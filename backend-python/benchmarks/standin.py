@@ -0,0 +1,145 @@
+"""
+Local stand-in for the OpenAI API with simulated latency.
+
+Serves /v1/chat/completions from a uvicorn server on 127.0.0.1 so the
+benchmarks exercise the real HTTP client and connection pool without
+network access or an API key.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import uvicorn
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def default_responder(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a minimal chat completion message for a request body"""
+    return {"role": "assistant", "content": "ok"}
+
+def validate_request(body: Dict[str, Any]) -> Optional[str]:
+    """Return the error OpenAI would answer a request body with (400), if any"""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_object":
+        text = " ".join(str(message.get("content") or "") for message in body.get("messages", []))
+        if "json" not in text.lower():
+            return "'messages' must contain the word 'json' in some form, to use 'response_format' of type 'json_object'."
+    return None
+
+async def _send_error(send, status: int, message: str, error_type: str, code: Optional[str] = None, headers=()) -> None:
+    error = json.dumps({"error": {"message": message, "type": error_type, "param": None, "code": code}}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), *headers],
+    })
+    await send({"type": "http.response.body", "body": error})
+
+class FakeLLMServer:
+    """
+    Context manager running a fake chat completions endpoint
+
+    Args:
+        latency: Seconds to sleep before answering each request
+        responder: Callable building the assistant message from the request body
+        rate_limit: Requests accepted per second (a token bucket holding one
+            second's worth); beyond that requests get a 429 with
+            Retry-After, like a rate limited provider (0 for none)
+
+    Requests OpenAI would refuse (see validate_request) get the same 400
+    error it sends, and are counted in `rejected`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        responder: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        rate_limit: int = 0,
+    ):
+        self.latency = latency
+        self.responder = responder or default_responder
+        self.rate_limit = rate_limit
+        self.port = _free_port()
+        self.requests = 0
+        self.rate_limited = 0
+        self.rejected = 0
+        self._allowance = float(rate_limit)
+        self._allowance_at = time.monotonic()
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def _app(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        self.requests += 1
+        if self.rate_limit:
+            now = time.monotonic()
+            self._allowance = min(self.rate_limit, self._allowance + (now - self._allowance_at) * self.rate_limit)
+            self._allowance_at = now
+            if self._allowance < 1:
+                self.rate_limited += 1
+                retry_after = (1 - self._allowance) / self.rate_limit
+                await _send_error(send, 429, "Rate limit reached", "requests", "rate_limit_exceeded",
+                                  [(b"retry-after-ms", str(int(retry_after * 1000)).encode())])
+                return
+            self._allowance -= 1
+
+        await asyncio.sleep(self.latency)
+
+        request = json.loads(body or b"{}")
+        error = validate_request(request)
+        if error:
+            self.rejected += 1
+            await _send_error(send, 400, error, "invalid_request_error")
+            return
+        payload = {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stand-in"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": self.responder(request),
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+        data = json.dumps(payload).encode()
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    def __enter__(self) -> "FakeLLMServer":
+        config = uvicorn.Config(self._app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="off", interface="asgi3")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)